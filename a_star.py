@@ -1,6 +1,10 @@
 """A*搜索算法，用于CBS的底层搜索"""
 from entity import *
+from focal_list import FocalList
+from map_loader import CompiledMap
+from collections import deque, OrderedDict
 import heapq
+import time
 
 """Step类（存储路径节点的信息）"""
 class Step():
@@ -9,6 +13,7 @@ class Step():
         self.y = y # y坐标
         self.parent = parent  # 父节点
         self.time = time # 当前时间
+        self.conflicts = 0 # 路径上与其他智能体的冲突数（ECBS焦点搜索）
 
     # 设置优先级
     def set_priority(self, g, h):
@@ -20,62 +25,188 @@ class Step():
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y and self.time == other.time
     def __hash__(self):
-        return hash(str(self.x) + str(self.y) + str(self.time))
-    def __lt__(self, other):
-        return self.priority < other.priority
+        return hash(self.get_state())
+    def __lt__(self, other): # f相同时g大者优先（更接近终点）
+        return (self.priority, -self.g) < (other.priority, -other.g)
+
+    # 获取状态键(x, y, t)
+    def get_state(self):
+        return (self.x, self.y, self.time)
+
+"""启发函数缓存类（按地图和终点缓存反向BFS真实距离表，以及地图栅格，可在同一进程的多个实例间共享）"""
+class HeuristicCache:
+    tables = {} # 地图标识 -> {终点: 距离表}
+    grids = {} # 地图标识 -> 地图栅格（只读）
+
+    # 获取地图标识（编译后的地图为(尺寸, 内容哈希)，障碍物列表为(尺寸, 障碍物集合)）
+    @staticmethod
+    def get_map_key(size, obstacles):
+        if isinstance(obstacles, CompiledMap):
+            return (tuple(size), obstacles.key)
+        return (tuple(size), frozenset(tuple(obstacle) for obstacle in obstacles))
+
+    # 获取某地图的全部距离表（同一地图的A*共享同一字典）
+    @classmethod
+    def get_map_tables(cls, size, obstacles, map_key=None):
+        return cls.tables.setdefault(map_key or cls.get_map_key(size, obstacles), {})
+
+    # 获取某地图的栅格（map[x][y]为1表示障碍物；同一地图只构建一次，大地图不再每个实例重建）
+    @classmethod
+    def get_map_grid(cls, size, obstacles, map_key=None):
+        map_key = map_key or cls.get_map_key(size, obstacles)
+        grid = cls.grids.get(map_key)
+        if grid is None:
+            if isinstance(obstacles, CompiledMap): # 由栅格数组整体转换（嵌套列表的逐格索引比数组快）
+                grid = obstacles.grid.tolist()
+            else:
+                grid = [[0] * size[1] for i in range(size[0])]
+                for obstacle in obstacles:
+                    grid[obstacle[0]][obstacle[1]] = 1 # 障碍物
+            cls.grids[map_key] = grid
+        return grid
+
+    # 清空缓存
+    @classmethod
+    def clear(cls):
+        cls.tables.clear()
+        cls.grids.clear()
+
+    # 反向BFS：计算地图上所有格子到终点的最短距离（不可达为inf）
+    @staticmethod
+    def compute_distance_table(grid, size, goal):
+        table = [[float('inf') for j in range(size[1])] for i in range(size[0])]
+        table[goal[0]][goal[1]] = 0
+        queue = deque([(goal[0], goal[1])])
+        while queue:
+            x, y = queue.popleft()
+            distance = table[x][y] + 1
+            for nx, ny in ((x-1, y), (x+1, y), (x, y-1), (x, y+1)):
+                if 0 <= nx < size[0] and 0 <= ny < size[1] and grid[nx][ny] == 0 and table[nx][ny] > distance:
+                    table[nx][ny] = distance
+                    queue.append((nx, ny))
+        return table
+
+"""路径缓存类（LRU）
+以(智能体ID, 该智能体的约束键集合)为键缓存A*结果（含无解），不同CT分支在相同约束下重新规划同一智能体时直接返回；
+可选的复用规则：未命中时若某缓存项的约束集是新约束集的子集且新增约束不影响其路径，则该路径在新约束下仍最优，直接复用"""
+class PathCache:
+    def __init__(self, size=4096, reuse=False):
+        self.size = size # 最大缓存项数（超出时淘汰最久未使用的项）
+        self.reuse = reuse # 是否启用复用规则
+        self.entries = OrderedDict() # (智能体ID, 约束键集合) -> 路径（无解为None），按使用先后排序
+        self.agent_entries = {} # 智能体ID -> {约束键集合: None}（复用规则只扫描同一智能体的缓存项）
+        self.hits = 0 # 命中次数
+        self.misses = 0 # 未命中次数
+        self.reuses = 0 # 未命中但复用已缓存路径的次数
+        self.evictions = 0 # 淘汰次数
+
+    # 查找缓存，返回(是否命中, 路径)
+    def get(self, agent_id, constraint_keys):
+        key = (agent_id, constraint_keys)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, self.entries[key]
+        self.misses += 1
+        return False, None
+
+    # 添加缓存项
+    def put(self, agent_id, constraint_keys, path):
+        key = (agent_id, constraint_keys)
+        self.entries[key] = path
+        self.entries.move_to_end(key)
+        self.agent_entries.setdefault(agent_id, {})[constraint_keys] = None
+        while len(self.entries) > self.size:
+            (old_agent_id, old_keys), old_path = self.entries.popitem(last=False)
+            del self.agent_entries[old_agent_id][old_keys]
+            self.evictions += 1
+
+    # 复用规则：查找约束集为子集、且路径不受新增约束影响的缓存路径（最近加入的优先）
+    def find_reusable(self, agent_id, constraint_keys, constraints):
+        for cached_keys in reversed(list(self.agent_entries.get(agent_id, ()))):
+            path = self.entries[(agent_id, cached_keys)]
+            if path is None or not cached_keys < constraint_keys:
+                continue
+            table = ConstraintTable([c for c in constraints if c.get_key() not in cached_keys]) # 新增约束
+            locations = path.locations
+            finish = len(locations) - 1
+            if table.get_goal_time(locations[-1]) > finish: # 到达终点的时间须不早于最晚的顶点约束（及不在终点的正约束）
+                continue
+            if not any(table.is_constrained(locations[t-1], locations[t], t) for t in range(1, len(locations))):
+                self.reuses += 1
+                return path
+        return None
+
+    # 获取命中率
+    def get_hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    # 获取统计信息
+    def get_stats(self):
+        return {"path_cache_hits": self.hits, "path_cache_misses": self.misses,
+                "path_cache_reuses": self.reuses, "path_cache_evictions": self.evictions}
+
+"""底层搜索超时（超过规划器的截止时刻），由设置截止时刻的调用方捕获"""
+class SearchTimeout(Exception):
+    pass
+
+"""底层搜索生成的状态数超过上限（联合搜索），与超时同样视为预算耗尽；调用方可单独捕获（如放弃本次合并）"""
+class SearchLimitExceeded(SearchTimeout):
+    pass
 
 """A*搜索算法类"""
 class A_Star():
     begin = [-1,-1] # 起点
     end = [-1,-1] # 终点
     step_cost = 1 # 每一步的代价
-    vertex_constraints = [] # 顶点约束集
-    edge_constraints = [] # 边约束集
+    constraint_table = ConstraintTable() # 约束表
     agent_id = None # 智能体ID
+    h_table = None # 当前终点的距离表
+    deadline = None # 搜索截止时刻（time.perf_counter()，None为不限时；超过后抛出SearchTimeout）
+    DEADLINE_CHECK_INTERVAL = 1024 # 每扩展多少个节点检查一次截止时刻
 
     # 初始化
-    def __init__(self, size, obstacles):
+    def __init__(self, size, obstacles, path_cache=None):
         self.size = size # 地图大小
+        self.path_cache = path_cache # 路径缓存（None为不缓存）
         self.obstacles = obstacles # 障碍物
-        # 初始化地图
-        self.map = [[ 0 for j in range(self.size[1])] for i in range(self.size[0])]
-        for obstacle in self.obstacles:
-            self.map[obstacle[0]][obstacle[1]] = 1 # 障碍物
+        # 初始化地图（同一地图的实例共享栅格与距离表缓存）
+        map_key = HeuristicCache.get_map_key(size, obstacles)
+        self.map = HeuristicCache.get_map_grid(size, obstacles, map_key) # 地图栅格（只读）
+        self.heuristic_tables = HeuristicCache.get_map_tables(size, obstacles, map_key) # 本地图的距离表缓存
     
-    # h(n)启发函数：曼哈顿距离
+    # 获取到终点的距离表（首次使用时计算并缓存）
+    def get_heuristic_table(self, goal):
+        goal = tuple(goal)
+        table = self.heuristic_tables.get(goal)
+        if table is None:
+            table = HeuristicCache.compute_distance_table(self.map, self.size, goal)
+            self.heuristic_tables[goal] = table
+        return table
+
+    # h(n)启发函数：到终点的真实距离（忽略其他智能体和约束）
     def h(self, step):
-        return abs(self.end[0] - step.x) + abs(self.end[1] - step.y)
+        return self.h_table[step.x][step.y]
     
     # 检查当前约束
     def check_constraints(self, current, target, time):
-        # 顶点约束
-        for constraint in self.vertex_constraints:
-            if(constraint.time == time):
-                if(list(constraint.location) == list(target)):
-                    return False
-
-        # 边约束
-        for constraint in self.edge_constraints:
-            if(constraint.time == time):
-                if(list(constraint.begin) == list(current) and list(constraint.end) == list(target)):
-                    return False
-        return True
+        return not self.constraint_table.is_constrained(current, target, time)
 
     # 检查当前时刻是否存在约束
     def check_current_having_constraints(self, time):
-        for constraint in self.vertex_constraints:
-            if(constraint.time == time):
-                return True
-        for constraint in self.edge_constraints:
-            if(constraint.time == time):
-                return True
-        return False
+        return self.constraint_table.has_constraints(time)
+
+    # 检查是否超过截止时刻（超过时抛出SearchTimeout，不缓存未完成的搜索）
+    def check_deadline(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
 
     # 构建完整路径
     def build_complete_path(self, current_step):
         path = [] # 路径数组
         while current_step:
-            path.append([current_step.x, current_step.y])
+            path.append((current_step.x, current_step.y))
             current_step = current_step.parent
         return path[::-1] # 反转
     
@@ -87,57 +218,86 @@ class A_Star():
         time = current_step.time+1
 
         # 左
-        if(x-1 >= 0 and self.map[x-1][y] == 0 and self.check_constraints([x,y],[x-1, y],time)):
+        if(x-1 >= 0 and self.map[x-1][y] == 0 and self.check_constraints((x,y),(x-1,y),time)):
             neighbors.append(Step(x-1, y, current_step, time))
         # 右
-        if(x+1 < self.size[0] and self.map[x+1][y] == 0 and self.check_constraints([x,y],[x+1, y],time)):
+        if(x+1 < self.size[0] and self.map[x+1][y] == 0 and self.check_constraints((x,y),(x+1,y),time)):
             neighbors.append(Step(x+1, y, current_step, time))
         # 上
-        if(y-1 >= 0 and self.map[x][y-1] == 0 and self.check_constraints([x,y],[x, y-1],time)):
+        if(y-1 >= 0 and self.map[x][y-1] == 0 and self.check_constraints((x,y),(x,y-1),time)):
             neighbors.append(Step(x, y-1, current_step, time))
         # 下
-        if(y+1 < self.size[1] and self.map[x][y+1] == 0 and self.check_constraints([x,y],[x, y+1],time)):
+        if(y+1 < self.size[1] and self.map[x][y+1] == 0 and self.check_constraints((x,y),(x,y+1),time)):
             neighbors.append(Step(x, y+1, current_step, time))
 
         # 等待（待思考：该时刻无约束是否应该等待？）
-        if(self.check_constraints([x,y],[x,y],time)):
+        if(self.check_constraints((x,y),(x,y),time)):
             neighbors.append(Step(x, y, current_step, time))
 
         return neighbors
 
-    # A*搜索
+    # A*搜索（启用路径缓存时先查缓存）
     def search(self, agent, constraints):
+        if self.path_cache is None:
+            return self.search_uncached(agent, constraints)
+        constraint_keys = frozenset(constraint.get_key() for constraint in constraints)
+        found, path = self.path_cache.get(agent.id, constraint_keys)
+        if found:
+            return path
+        path = None
+        if self.path_cache.reuse:
+            path = self.path_cache.find_reusable(agent.id, constraint_keys, constraints)
+        if path is None:
+            path = self.search_uncached(agent, constraints)
+        self.path_cache.put(agent.id, constraint_keys, path)
+        return path
+
+    # A*搜索（不使用缓存，时间扩展图上逐步搜索；子类可替换为其他底层规划算法）
+    def search_uncached(self, agent, constraints):
+        return self.search_table(agent, ConstraintTable(constraints))
+
+    # 在给定约束表下搜索（约束表可由调用方增量维护，如优先级规划的预留表）
+    def search_table(self, agent, constraint_table):
+        self.check_deadline()
         self.agent_id = agent.id
         self.begin = agent.start
         self.end = agent.goal
-        open_list = [] # 待遍历节点
-        close_list = set() # 已遍历节点
-        self.vertex_constraints = [] # 清空顶点约束集
-        self.edge_constraints = [] # 清空边约束集
-        max_t = 0 # 最大时间(用于到达终点后仍被碰撞)
-
-        # 初始化约束
-        for constraint in constraints:
-            if(isinstance(constraint, VertexConstraint)): # 顶点约束
-                max_t = max(max_t, constraint.time)
-                self.vertex_constraints.append(constraint)
-            elif(isinstance(constraint, EdgeConstraint)): # 边约束
-                self.edge_constraints.append(constraint)
-                
+        open_list = [] # 待遍历节点（堆元素为(f, -g, 入堆序号, Step)，f相同时g大者优先）
+        best_g = {} # 状态(x, y, min(t, static_time)) -> 已发现的最优g值
+        close_list = set() # 已遍历状态(x, y, min(t, static_time))
+
+        self.h_table = self.get_heuristic_table(self.end)
+        if self.h_table[self.begin[0]][self.begin[1]] == float('inf'): # 终点不可达
+            return None
+
+        self.constraint_table = constraint_table
+        max_t = self.constraint_table.get_goal_time(self.end) # 最大时间(用于到达终点后仍被碰撞，含不在终点的正约束)
+        if max_t == float('inf'): # 终点被永久占用
+            return None
+        static_time = self.constraint_table.get_static_time() # 之后约束不再变化，同一位置只保留最早到达的状态（保证无解时搜索终止）
+
         # 初始化起点
         start = Step(self.begin[0],self.begin[1], None, 0)
         start.set_priority(0, 0) # 设置优先级为最高0
-        heapq.heappush(open_list, start)
+        best_g[start.get_state()] = 0
+        push_count = 0 # 入堆序号（保证出堆顺序确定）
+        heapq.heappush(open_list, (start.priority, -start.g, push_count, start))
 
         # 开始搜索
         count = 0
         while open_list:
             count += 1
+            if count % self.DEADLINE_CHECK_INTERVAL == 0:
+                self.check_deadline()
             if(count > 999999999):
                 print("A*搜索超时,结束")
                 return None
             
-            current_step = heapq.heappop(open_list) # 最高优先级节点
+            current_step = heapq.heappop(open_list)[3] # 最高优先级节点
+            state = (current_step.x, current_step.y, min(current_step.time, static_time))
+            # 惰性删除：已遍历或已被更优g值替代的过期堆元素
+            if state in close_list or current_step.g > best_g[state]:
+                continue
             # 到达终点
             if current_step.x == self.end[0] and current_step.y == self.end[1] and current_step.time >= max_t:
                 # 构建路径
@@ -147,14 +307,216 @@ class A_Star():
 
             # 未到达终点
             else:
-                close_list.add(current_step)
+                close_list.add(state)
                 neighbors = self.get_neighbors(current_step) # 获取可用邻居节点
                 for neighbor in neighbors:
+                    neighbor_state = (neighbor.x, neighbor.y, min(neighbor.time, static_time))
                     # 遍历过
-                    if neighbor in close_list:
+                    if neighbor_state in close_list:
+                        continue
+                    # 未发现或找到更优g值
+                    g = current_step.g + self.step_cost
+                    if g < best_g.get(neighbor_state, float('inf')):
+                        best_g[neighbor_state] = g
+                        neighbor.set_priority(g, self.h(neighbor))
+                        push_count += 1
+                        heapq.heappush(open_list, (neighbor.priority, -g, push_count, neighbor))
+        return None
+
+    # 焦点搜索（ECBS底层）：在 f <= w * f_min 的节点中优先扩展与其他智能体冲突最少的节点
+    # conflict_index为其他智能体当前路径的冲突索引，返回(路径, 最优代价下界)
+    def focal_search(self, agent, constraints, w, conflict_index, agent_index):
+        self.check_deadline()
+        self.agent_id = agent.id
+        self.begin = agent.start
+        self.end = agent.goal
+        best_conflicts = {} # 状态(x, y, t) -> 已发现的最少冲突数
+        close_list = set() # 已遍历状态(x, y, t)
+
+        self.h_table = self.get_heuristic_table(self.end)
+        if self.h_table[self.begin[0]][self.begin[1]] == float('inf'): # 终点不可达
+            return None, float('inf')
+
+        # 初始化约束表（每次搜索只构建一次）
+        self.constraint_table = ConstraintTable(constraints)
+        max_t = self.constraint_table.get_goal_time(self.end) # 最大时间(用于到达终点后仍被碰撞，含不在终点的正约束)
+
+        # 初始化起点（焦点键为(冲突数, f, -g)）
+        focal = FocalList(w, lambda step: step.get_state() in close_list)
+        start = Step(self.begin[0],self.begin[1], None, 0)
+        start.set_priority(0, self.h(start))
+        best_conflicts[start.get_state()] = 0
+        focal.push(start, start.priority, (0, start.priority, 0))
+
+        # 开始搜索
+        count = 0
+        while True:
+            current_step = focal.pop()
+            if current_step is None:
+                return None, float('inf')
+            count += 1
+            if count % self.DEADLINE_CHECK_INTERVAL == 0:
+                self.check_deadline()
+            if(count > 999999999):
+                print("A*搜索超时,结束")
+                return None, float('inf')
+
+            state = current_step.get_state()
+            # 惰性删除：已遍历或已被冲突更少的节点替代
+            if state in close_list or current_step.conflicts > best_conflicts[state]:
+                continue
+            # 到达终点
+            if current_step.x == self.end[0] and current_step.y == self.end[1] and current_step.time >= max_t:
+                path = Path(agent)
+                path.set_locations(self.build_complete_path(current_step))
+                return path, focal.get_f_min()
+
+            close_list.add(state)
+            for neighbor in self.get_neighbors(current_step):
+                neighbor_state = neighbor.get_state()
+                if neighbor_state in close_list:
+                    continue
+                neighbor.conflicts = current_step.conflicts + conflict_index.count_move_conflicts(
+                    agent_index, (current_step.x, current_step.y), (neighbor.x, neighbor.y), neighbor.time)
+                if neighbor.conflicts < best_conflicts.get(neighbor_state, float('inf')):
+                    best_conflicts[neighbor_state] = neighbor.conflicts
+                    neighbor.set_priority(current_step.g + self.step_cost, self.h(neighbor))
+                    focal.push(neighbor, neighbor.priority, (neighbor.conflicts, neighbor.priority, -neighbor.g))
+
+    # 最早到达时刻（走廊推理）：在约束下从start出发最早何时可到达target，blocked中的位置不可经过，不可达返回inf
+    def get_earliest_arrival(self, start, target, constraints, blocked=()):
+        table = ConstraintTable(constraints)
+        end_time = max(table.times, default=0) # 之后约束不再变化，同一位置只需记录最早到达
+        h_table = self.get_heuristic_table(target) # 忽略blocked的距离，仍是可采纳的下界
+        start = (start[0], start[1])
+        target = (target[0], target[1])
+        if h_table[start[0]][start[1]] == float('inf'):
+            return float('inf')
+        open_list = [(h_table[start[0]][start[1]], 0, start)] # 堆元素为(f, t, 位置)
+        close_list = set() # 已遍历状态(x, y, min(t, end_time + 1))
+        while open_list:
+            f, t, (x, y) = heapq.heappop(open_list)
+            if (x, y) == target:
+                return t
+            state = (x, y, min(t, end_time + 1))
+            if state in close_list:
+                continue
+            close_list.add(state)
+            for nx, ny in ((x-1, y), (x+1, y), (x, y-1), (x, y+1), (x, y)):
+                if nx < 0 or nx >= self.size[0] or ny < 0 or ny >= self.size[1] or self.map[nx][ny] == 1 or (nx, ny) in blocked:
+                    continue
+                if h_table[nx][ny] == float('inf') or table.is_constrained((x, y), (nx, ny), t + 1):
+                    continue
+                heapq.heappush(open_list, (t + 1 + h_table[nx][ny], t + 1, (nx, ny)))
+        return float('inf')
+
+    # 联合A*搜索（MA-CBS元智能体的底层）：在全部成员位置组成的联合状态上搜索，成员之间不发生冲突
+    # 使用算子分解（每次只为一个成员选择动作），分支数为5而非5^成员数
+    # constraints_list[k]为第k个成员的约束，返回每个成员的路径列表（代价之和最优），无解返回None
+    # state_limit为生成状态数（完整状态与中间状态）的上限，超过时抛出SearchLimitExceeded（None为不限）
+    def joint_search(self, agents, constraints_list, state_limit=None):
+        self.check_deadline()
+        n = len(agents)
+        tables = [ConstraintTable(constraints) for constraints in constraints_list]
+        max_ts = [tables[k].get_goal_time(agents[k].goal) for k in range(n)] # 每个成员的最大约束时间（到达终点的时间不早于此）
+        h_tables = [self.get_heuristic_table(agent.goal) for agent in agents]
+        starts = tuple((agent.start[0], agent.start[1]) for agent in agents)
+        goals = tuple((agent.goal[0], agent.goal[1]) for agent in agents)
+        if any(h_tables[k][starts[k][0]][starts[k][1]] == float('inf') for k in range(n)): # 终点不可达
+            return None
+        end_time = max(max_ts + [max(table.times, default=0) for table in tables]) # 所有成员的约束（含边约束与正约束）都已结束的时刻
+
+        # 完整状态为(各成员位置, 时间, 各成员的代价)，已停在终点的成员代价为max(到达时刻, max_t)，否则为None（代价随时间增长）
+        # 状态唯一确定代价；成员k的代价估计 = 已停在终点时的代价，否则max(t + 到终点距离, max_t)
+        def estimate(k, position, t, cost):
+            if cost is not None:
+                return cost
+            return max(t + h_tables[k][position[0]][position[1]], max_ts[k])
+
+        # 成员k由position移动到new_position（t+1时刻到达）后的代价
+        def arrive(k, position, new_position, t, cost):
+            if new_position != goals[k]:
+                return None
+            if position == goals[k] and cost is not None: # 一直停在终点
+                return cost
+            return max(t + 1, max_ts[k])
+
+        start_finished = tuple(max_ts[k] if starts[k] == goals[k] else None for k in range(n))
+        start = (starts, 0, start_finished)
+        parents = {start: None} # 完整状态 -> 父状态（同时作为已生成状态集合）
+        # 约束结束后问题与时间无关：同一位置组合下，更早到达且各成员代价都不更大的状态支配之后的状态（保证无解时搜索终止）
+        static_states = {} # (各成员位置, 各成员是否停在终点) -> [(时间, 各成员代价), ...]
+        intermediate_states = set() # 已生成的中间状态(各成员位置, 时间, 已选择的新位置, 各成员代价)
+        f = sum(estimate(k, starts[k], 0, start_finished[k]) for k in range(n))
+        # 堆元素为(f, -t, -已选择动作的成员数, 入堆序号, (完整状态, 已选择的新位置))，f相同时优先更深的节点
+        open_list = [(f, 0, 0, 0, (start, ()))]
+        push_count = 0
+        count = 0
+        while open_list:
+            count += 1
+            if count % self.DEADLINE_CHECK_INTERVAL == 0:
+                self.check_deadline()
+            if(count > 999999999):
+                print("联合A*搜索超时,结束")
+                return None
+            if state_limit is not None and len(parents) + len(intermediate_states) > state_limit:
+                raise SearchLimitExceeded()
+            state, prefix = heapq.heappop(open_list)[4]
+            positions, t, finished = state
+            # 全部成员停在终点且约束均已结束
+            if not prefix and t >= end_time and all(cost is not None for cost in finished):
+                states = []
+                while state is not None:
+                    states.append(state[0])
+                    state = parents[state]
+                states.reverse()
+                paths = []
+                for k in range(n):
+                    path = Path(agents[k])
+                    path.set_locations([locations[k] for locations in states[:finished[k] + 1]])
+                    paths.append(path)
+                return paths
+
+            # 为第k个成员选择动作（左、右、上、下、等待）
+            k = len(prefix)
+            x, y = positions[k]
+            for nx, ny in ((x-1, y), (x+1, y), (x, y-1), (x, y+1), (x, y)):
+                if nx < 0 or nx >= self.size[0] or ny < 0 or ny >= self.size[1] or self.map[nx][ny] == 1:
+                    continue
+                if tables[k].is_constrained((x, y), (nx, ny), t + 1):
+                    continue
+                target = (nx, ny)
+                if target in prefix: # 与已选择动作的成员的顶点冲突
+                    continue
+                if target != (x, y) and any(prefix[j] == (x, y) and positions[j] == target for j in range(k)): # 边冲突
+                    continue
+                new_prefix = prefix + (target,)
+                if k + 1 < n: # 中间状态：前k+1个成员已在t+1时刻，其余成员仍在t时刻
+                    # 已选择动作的成员的代价在移动后确定，此前代价不同的完整状态可能生成同一中间状态
+                    costs = tuple(arrive(j, positions[j], new_prefix[j], t, finished[j]) for j in range(k + 1)) + finished[k + 1:]
+                    intermediate_state = (positions, t, new_prefix, costs)
+                    if intermediate_state in intermediate_states:
+                        continue
+                    intermediate_states.add(intermediate_state)
+                    f = sum(estimate(j, new_prefix[j], t + 1, costs[j]) for j in range(k + 1)) \
+                        + sum(estimate(j, positions[j], t, finished[j]) for j in range(k + 1, n))
+                    push_count += 1
+                    heapq.heappush(open_list, (f, -t, -(k + 1), push_count, (state, new_prefix)))
+                    continue
+
+                new_finished = tuple(arrive(j, positions[j], new_prefix[j], t, finished[j]) for j in range(n))
+                new_state = (new_prefix, t + 1, new_finished)
+                if new_state in parents:
+                    continue
+                if t + 1 > end_time:
+                    static_key = (new_prefix, tuple(cost is None for cost in new_finished))
+                    seen = static_states.setdefault(static_key, [])
+                    if any(seen_t <= t + 1 and all(seen_cost is None or seen_cost <= cost for seen_cost, cost in zip(seen_finished, new_finished))
+                           for seen_t, seen_finished in seen):
                         continue
-                    # 未遍历
-                    if neighbor not in open_list:
-                        neighbor.set_priority(current_step.g + 1, self.h(neighbor))
-                        heapq.heappush(open_list, neighbor)
+                    seen.append((t + 1, new_finished))
+                parents[new_state] = state
+                f = sum(estimate(j, new_prefix[j], t + 1, new_finished[j]) for j in range(n))
+                push_count += 1
+                heapq.heappush(open_list, (f, -(t + 1), 0, push_count, (new_state, ())))
         return None
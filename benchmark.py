@@ -0,0 +1,127 @@
+"""基准测试：在map/下的实例上比较不同求解配置的代价、扩展节点数与耗时"""
+from cbs import cbs_main, PLANNERS
+from pbs import pp_main, pbs_main
+from lns import lns_main
+from entity import Agent, VertexConstraint
+from map_loader import CompiledMap, compile_obstacles, load_movingai
+
+import argparse
+import contextlib
+import glob
+import io
+import random
+import time
+import yaml
+
+# 求解配置（名称 -> cbs_main参数；含solver时改用优先级规划/PBS求解器，只传入其支持的参数）
+CONFIGS = {
+    "cbs": {},
+    "mdd": {"use_mdd": True},
+    "wdg": {"use_mdd": True, "heuristic": "WDG"},
+    "ecbs1.2": {"w": 1.2},
+    "bypass": {"bypass": True},
+    "disjoint": {"disjoint": True},
+    "bypass+disjoint": {"bypass": True, "disjoint": True},
+    "symmetry": {"symmetry": True},
+    "sipp": {"planner": "sipp"},
+    "pp": {"solver": "pp", "restarts": 10},
+    "pbs": {"solver": "pbs"},
+    "lns": {"solver": "lns"},
+}
+
+"""读取实例（YAML文件，或MovingAI场景文件.scen，取前agent_count个智能体）"""
+def load_instance(file_name, agent_count=None):
+    if file_name.endswith(".scen"):
+        param = load_movingai(file_name, count=agent_count)
+    else:
+        with open(file_name, 'r') as param_file:
+            param = yaml.load(param_file, Loader=yaml.FullLoader)
+    agents = [Agent(agent_param['name'], agent_param['start'], agent_param['goal']) for agent_param in param['agents']]
+    obstacles = param["map"]["obstacles"]
+    if not isinstance(obstacles, CompiledMap): # 编译一次，之后各求解器以栅格哈希标识地图
+        obstacles = compile_obstacles(param["map"]["dimensions"], obstacles)
+    return agents, param["map"]["dimensions"], obstacles
+
+"""运行一次求解，返回(代价, 统计, 耗时)"""
+def run(file_name, options, agent_count=None):
+    agents, dimension, obstacles = load_instance(file_name, agent_count)
+    options = dict(options)
+    solver = options.pop("solver", "cbs")
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # 屏蔽进度输出
+        if solver == "pp":
+            node = pp_main(agents, dimension, obstacles, restarts=options.get("restarts", 0), time_limit=options.get("time_limit"))
+        elif solver == "lns":
+            node = lns_main(agents, dimension, obstacles, time_limit=options.get("time_limit"))
+        elif solver == "pbs":
+            node = pbs_main(agents, dimension, obstacles, time_limit=options.get("time_limit"))
+        else:
+            node = cbs_main(agents, dimension, obstacles, **options)
+    elapsed = time.perf_counter() - begin
+    if node is None:
+        return None, {}, elapsed
+    return node.cost, node.stats or {}, elapsed
+
+"""底层规划器对比：为实例中的每个智能体随机生成约束（地图上随机的顶点约束，以及到达终点之后其他智能体经过其终点的顶点约束），
+分别用A*与SIPP求解，返回规划器名称 -> (总代价, 耗时)；两者的代价相同，只比较耗时。
+约束时刻远大于路径长度（终点在到达后仍被占用，需要长时间等待）时SIPP按安全区间搜索明显更快，约束稀疏、时刻接近路径长度时A*更快"""
+def run_planners(file_name, agent_count=None, constraint_count=50, seed=0):
+    agents, dimension, obstacles = load_instance(file_name, agent_count)
+    rng = random.Random(seed)
+    free = [(x, y) for x in range(dimension[0]) for y in range(dimension[1]) if (x, y) not in obstacles]
+    horizon = 2 * (dimension[0] + dimension[1]) # 约束时刻的上限
+    constraints = []
+    for agent in agents:
+        agent_constraints = [VertexConstraint(agent.id, rng.choice(free), rng.randint(1, horizon)) for i in range(constraint_count)]
+        agent_constraints.append(VertexConstraint(agent.id, tuple(agent.goal), rng.randint(horizon // 2, horizon)))
+        constraints.append(agent_constraints)
+    results = {}
+    for planner in PLANNERS:
+        a_star = PLANNERS[planner](dimension, obstacles)
+        for agent in agents: # 距离表预先计算，只比较搜索本身
+            a_star.get_heuristic_table(agent.goal)
+        cost = 0
+        begin = time.perf_counter()
+        for agent, agent_constraints in zip(agents, constraints):
+            path = a_star.search_uncached(agent, agent_constraints)
+            cost += path.get_cost() if path is not None else 0
+        results[planner] = (cost, time.perf_counter() - begin)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--maps", default = "map/**/*.yaml", help = "实例文件匹配模式（YAML或MovingAI场景文件.scen）")
+    parser.add_argument("--agents", type = int, default = None, help = "MovingAI场景取的智能体数（缺省为全部）")
+    parser.add_argument("--configs", nargs = "+", default = ["cbs"], choices = list(CONFIGS), help = "求解配置")
+    parser.add_argument("--workers", type = int, nargs = "+", default = [1], help = "并行CBS的进程数（可指定多个以测试扩展性）")
+    parser.add_argument("--expand-k", type = int, default = 1, help = "并行CBS每次投机扩展的CT节点数")
+    parser.add_argument("--time-limit", type = float, default = None, help = "每次求解的时间预算（秒，缺省不限；LNS为改进的时间）")
+    parser.add_argument("--trace", default = None, help = "代价随时间变化的记录文件（CSV，每行为 实例,配置,耗时,代价；只有LNS记录）")
+    parser.add_argument("--planners", action = "store_true", help = "只比较底层规划器（A*与SIPP）在随机约束下的单次搜索耗时，不运行求解配置")
+    parser.add_argument("--constraints", type = int, default = 50, help = "--planners时每个智能体的随机顶点约束数")
+    args = parser.parse_args()
+
+    if args.planners:
+        print("实例\t规划器\t总代价\t耗时(s)")
+        for file_name in sorted(glob.glob(args.maps, recursive=True)):
+            for planner, (cost, elapsed) in run_planners(file_name, args.agents, args.constraints).items():
+                print("\t".join([file_name, planner, str(cost), format(elapsed, ".2f")]))
+        return
+
+    trace_file = open(args.trace, 'w') if args.trace else None
+    print("实例\t配置\t进程数\t代价\t状态\t扩展节点\t生成节点\t冲突绕行\t耗时(s)")
+    for file_name in sorted(glob.glob(args.maps, recursive=True)):
+        for config in args.configs:
+            for workers in args.workers:
+                options = dict(CONFIGS[config], workers=workers, expand_k=args.expand_k, time_limit=args.time_limit)
+                cost, stats, elapsed = run(file_name, options, args.agents)
+                print("\t".join([file_name, config, str(workers), str(cost), str(stats.get("status", "-")), str(stats.get("expanded", "-")),
+                                 str(stats.get("generated", "-")), str(stats.get("bypasses", "-")), format(elapsed, ".2f")]))
+                if trace_file is not None:
+                    for trace_time, trace_cost in stats.get("trace", []):
+                        trace_file.write(",".join([file_name, config, format(trace_time, ".3f"), str(trace_cost)]) + "\n")
+    if trace_file is not None:
+        trace_file.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,91 @@
 """基于冲突的搜索（Conflict-Based Search）算法"""
-from a_star import A_Star
+from a_star import A_Star, PathCache, SearchTimeout, SearchLimitExceeded
+from sipp import SIPP
 from entity import *
 from ct_node import CTNode
+from conflict_index import ConflictIndex
+from mdd import MDD
+from heuristics import HighLevelHeuristic
+from symmetry import SymmetryReasoning
+from focal_list import FocalList
+from prioritized import prioritized_main
 
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
 import heapq
 import sys
+import time
+
+worker_a_star = None # 工作进程内的底层规划器（每个进程只初始化一次，地图与启发式缓存保持可用）
+PLANNERS = {"astar": A_Star, "sipp": SIPP} # 可选的底层规划器
+
+"""工作进程初始化"""
+def init_worker(size, obstacles, path_cache_size=0, reuse_paths=False, planner="astar"):
+    global worker_a_star
+    worker_a_star = PLANNERS[planner](size, obstacles, PathCache(path_cache_size, reuse_paths) if path_cache_size > 0 else None)
+
+"""在工作进程中执行底层规划（只返回路径点以减少进程间传输；deadline为主进程的搜索截止时刻，超过时抛出SearchTimeout）"""
+def plan_in_worker(agent, constraints, deadline=None):
+    worker_a_star.deadline = deadline
+    path = worker_a_star.search(agent, constraints)
+    if path is None:
+        return None
+    return path.locations
 
 """CBS类"""
 class CBS:
-    def __init__(self, agents, size, obstacles):
+    CARDINAL = 0 # 基数冲突：两个智能体绕开冲突都会增加代价
+    SEMI_CARDINAL = 1 # 半基数冲突：只有一个智能体绕开冲突会增加代价
+    NON_CARDINAL = 2 # 非基数冲突：两个智能体都可以不增加代价地绕开冲突
+
+    OPTIMAL = "optimal" # 求解状态：最优解
+    BOUNDED = "bounded" # 求解状态：有界次优解（ECBS，或预算耗尽时open_list中的无冲突节点），次优界为 代价 / 下界
+    FALLBACK = "fallback" # 求解状态：优先级规划类的解（预算耗尽时的回退解或PP/PBS求解器的解，无冲突，代价不保证有界，仍报告已证明的下界）
+    INCUMBENT_SCAN_LIMIT = 256 # 预算耗尽时检查是否无冲突的open_list节点数上限（按代价从小到大）
+    FALLBACK_SHARE = 0.2 # 有时间预算时为回退的优先级规划预留的时间比例（搜索在其余时间内结束）
+
+    PATH_CACHE_SIZE = 4096 # 默认路径缓存项数
+    MAX_META_AGENT_SIZE = 3 # 默认元智能体的最大成员数（合并后超过时不合并，按普通方式分裂）
+    JOINT_STATE_LIMIT = 100000 # 默认每次联合搜索生成状态数的上限
+
+    def __init__(self, agents, size, obstacles, use_mdd=False, heuristic=None, w=None, workers=None,
+                 path_cache_size=PATH_CACHE_SIZE, reuse_paths=False, planner="astar", merge_threshold=None,
+                 bypass=False, disjoint=False, symmetry=False, max_meta_agent_size=MAX_META_AGENT_SIZE,
+                 joint_state_limit=JOINT_STATE_LIMIT):
+        if planner not in PLANNERS:
+            raise ValueError("未知的底层规划器: " + str(planner))
         self.agents = agents # 智能体列表
+        self.agent_index = {agent.id: i for i, agent in enumerate(agents)} # 智能体ID -> 序号
         self.size = size # 地图大小
         self.obstacles = obstacles # 障碍物
-        self.a_star = A_Star(size, obstacles) # 初始化底层规划器（A*算法）
+        self.path_cache = PathCache(path_cache_size, reuse_paths) if path_cache_size > 0 else None # 底层路径缓存（0为不缓存）
+        self.planner = planner # 底层规划器名称
+        self.a_star = PLANNERS[planner](size, obstacles, self.path_cache) # 初始化底层规划器（A*或SIPP；ECBS的焦点搜索均使用A*）
         self.open_list = [] # 待扩展（检查）节点列表
-        self.closed_list = [] # 已扩展（检查）节点列表
+        self.node_table = set() # 已生成节点的标识（两个约束集哈希与元智能体划分，不保存节点本身）
+        self.duplicate_hits = 0 # 重复节点数（已剪枝）
+        self.duplicate_misses = 0 # 非重复节点数
+        self.use_mdd = use_mdd # 是否使用MDD对冲突分类（优先分裂基数冲突）
+        self.generated_count = 0 # 生成的CT节点数
+        self.heuristic = HighLevelHeuristic(self, heuristic) if heuristic else None # 高层启发式（CG/DG/WDG）
+        self.w = w # ECBS次优因子（None为最优CBS）
+        self.focal = FocalList(w) if w is not None else None # ECBS高层焦点列表（按冲突数选择CT节点）
+        self.expanded_count = 0 # 扩展的CT节点数
+        self.conflict_index = None # 冲突索引（随检查的CT节点增量更新）
+        self.merge_threshold = merge_threshold # MA-CBS合并阈值：两智能体之间分裂的冲突数超过该值时合并为元智能体（None为不合并）
+        self.pair_conflicts = {} # (智能体序号i, j) -> 整个CT搜索中在二者之间分裂的冲突数
+        self.merge_count = 0 # 合并次数
+        self.max_meta_agent_size = max_meta_agent_size # 元智能体的最大成员数（None为不限）
+        self.joint_state_limit = joint_state_limit # 合并时联合搜索生成状态数的上限（None为不限），超过时放弃合并
+        self.replan_state_limit = None # 已有元智能体重新规划时联合搜索的状态上限（有CT节点数预算时为joint_state_limit，超过视为预算耗尽；否则不限）
+        self.declined_merges = set() # 因联合搜索超过状态上限而放弃的合并（合并后的成员元组，之后不再尝试）
+        self.bypass = bypass # 是否启用冲突绕行（子节点代价不变且冲突更少时父节点直接采用其路径，不再分裂）
+        self.bypass_count = 0 # 冲突绕行次数
+        self.disjoint = disjoint # 是否使用不相交分裂（一个子节点加正约束，另一个子节点加相同的负约束）
+        self.symmetry = SymmetryReasoning(self) if symmetry else None # 对称推理（矩形与走廊冲突，None为不启用）
+        # 并行模式：底层规划分发到进程池，每个工作进程保持自己的地图与启发式缓存
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                            initargs=(size, obstacles, path_cache_size, reuse_paths, planner)) \
+            if workers is not None and workers > 1 else None
 
     # 检查问题合理性（是否有起点重复、终点重复、起点终点与障碍物冲突）
     def check_problem(self):
@@ -44,55 +114,356 @@ class CBS:
                 return False
         return True
 
+    """添加CT节点（ECBS模式下open_list按代价下界排序，代价不超过 w * 最小下界 的节点进入焦点列表并按冲突数排序；
+    generated为False时是冲突绕行后重新入队的节点，不计入生成数）"""
+    def push_node(self, ctNode, generated=True):
+        if generated:
+            self.generated_count += 1
+        if self.w is None:
+            heapq.heappush(self.open_list, ctNode)
+        elif ctNode.solution is not None:
+            conflict_count = self.get_conflict_index(ctNode).get_conflict_count()
+            self.focal.push(ctNode, ctNode.lower_bound, (conflict_count, ctNode.cost), ctNode.cost)
+
+    """取出下一个待扩展的CT节点"""
+    def pop_node(self):
+        if self.w is None:
+            return heapq.heappop(self.open_list) if self.open_list else None
+        return self.focal.pop()
+
+    """获取求解统计"""
+    def get_stats(self):
+        stats = {"expanded": self.expanded_count, "generated": self.generated_count,
+                 "duplicate_hits": self.duplicate_hits, "duplicate_misses": self.duplicate_misses, "merges": self.merge_count,
+                 "bypasses": self.bypass_count}
+        if self.symmetry is not None:
+            stats["rectangles"] = self.symmetry.rectangle_count
+            stats["corridors"] = self.symmetry.corridor_count
+        if self.path_cache is not None: # 并行模式下只统计主进程中的底层规划
+            stats.update(self.path_cache.get_stats())
+        return stats
+
+    """获取open_list中的全部节点（ECBS为焦点列表中未出列的节点）"""
+    def get_open_nodes(self):
+        if self.w is None:
+            return list(self.open_list)
+        return self.focal.get_items()
+
+    """预算耗尽时的结果：下界为open_list中的最小f（ECBS为最小代价下界；根节点未求解完时为各智能体到终点的距离之和）；
+    open_list中代价最小的无冲突节点为有界次优解，否则用优先级规划得到无冲突的回退解（fallback为False时不使用），均失败时返回None；
+    deadline为time.perf_counter()的截止时刻，检查open_list与优先级规划都不超过该时刻"""
+    def get_budget_result(self, fallback=True, deadline=None):
+        open_nodes = [node for node in self.get_open_nodes() if node.solution is not None]
+        if open_nodes:
+            lower_bound = min(node.lower_bound if self.w is not None else node.get_f() for node in open_nodes)
+        else:
+            lower_bound = self.get_distance_bound()
+
+        result = None
+        for node in sorted(open_nodes, key=lambda node: node.cost)[:self.INCUMBENT_SCAN_LIMIT]:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if self.get_conflict_index(node).get_conflict_count() == 0:
+                result = node
+                result.status = self.BOUNDED
+                print("返回open_list中的无冲突节点", end="")
+                break
+        if result is None:
+            if not fallback:
+                print("open_list中没有无冲突的节点")
+                return None
+            solution = prioritized_main(self.a_star, self.agents, deadline=deadline)
+            if solution is None:
+                print("优先级规划未找到无冲突的回退解")
+                return None
+            result = CTNode([], None)
+            result.set_solution(solution)
+            result.status = self.FALLBACK
+            print("返回优先级规划的回退解", end="")
+        result.lower_bound = min(lower_bound, result.cost)
+        if result.cost == result.lower_bound: # 代价达到下界，已证明最优
+            result.status = self.OPTIMAL
+        result.suboptimality = result.cost / result.lower_bound if result.lower_bound > 0 else 1.0
+        print("（"+result.status+"），代价为 "+str(result.cost)+"，最优代价下界为 "+str(result.lower_bound)
+              +"，次优界为 "+format(result.suboptimality, ".3f"))
+        return result
+
+    """各智能体到终点的距离之和（忽略冲突的代价下界）"""
+    def get_distance_bound(self):
+        return sum(self.a_star.get_heuristic_table(agent.goal)[agent.start[0]][agent.start[1]] for agent in self.agents)
+
+    """剔除约束集与已生成节点相同的重复节点（在底层规划之前，重复节点不再求解）"""
+    def remove_duplicates(self, nodes):
+        unique_nodes = []
+        for node in nodes:
+            identity = node.get_identity()
+            if identity in self.node_table:
+                self.duplicate_hits += 1
+                continue
+            self.duplicate_misses += 1
+            self.node_table.add(identity)
+            unique_nodes.append(node)
+        return unique_nodes
+
+    """从已生成节点表中移除节点的标识"""
+    def forget_node(self, node):
+        self.node_table.discard(node.get_identity())
+
+    """关闭进程池"""
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    """投机地取出至多k个有冲突的待扩展节点（遇到无冲突节点时将其放回并停止，保证只在其成为最优节点时才作为解返回；
+    计算启发值时底层搜索超时则将已取出的节点全部放回）"""
+    def pop_batch(self, k):
+        batch = []
+        while len(batch) < k and self.open_list:
+            node = heapq.heappop(self.open_list)
+            if node.solution is None: # 无解节点
+                continue
+            if self.heuristic is not None and not node.h_computed:
+                try:
+                    node.h = self.heuristic.compute(node)
+                except SearchTimeout:
+                    for popped in [node] + [batch_node for batch_node, batch_conflict in batch]:
+                        heapq.heappush(self.open_list, popped)
+                    raise
+                node.h_computed = True
+                if node.h == float('inf'):
+                    continue
+                if node.h > 0:
+                    heapq.heappush(self.open_list, node)
+                    break
+            conflict = self.search_first_conflict(node)
+            if conflict is None:
+                heapq.heappush(self.open_list, node)
+                break
+            batch.append((node, conflict))
+        return batch
+
     """冲突检测(第一个冲突)"""
-    def search_first_conflict(self,solution):
-        if solution is None:
+    def search_first_conflict(self, ctNode):
+        if ctNode.solution is None:
             return 404 # 无解的解决方案
 
-        paths = solution.paths
-        # 检查顶点冲突
-        for i in range(len(paths)):
-            for j in range(i+1, len(paths)):
-                max_t = max(len(paths[i].locations),len(paths[j].locations))
-                for t in range(max_t):
-                    # 注：到达终点后仍可能被碰撞
-                    if t>=len(paths[j].locations):
-                        if paths[i].locations[t] == paths[j].locations[len(paths[j].locations)-1]:
-                            return VertexConflict(self.agents[i], self.agents[j], paths[i].locations[t], t)                        
-                    elif t>=len(paths[i].locations):
-                        if paths[j].locations[t] == paths[i].locations[len(paths[i].locations)-1]:
-                            return VertexConflict(self.agents[i], self.agents[j], paths[j].locations[t], t)  
-                    else: # 智能体i和j在t时刻到达同一位置
-                        if paths[i].locations[t] == paths[j].locations[t]:
-                            return VertexConflict(self.agents[i], self.agents[j], paths[i].locations[t], t)
-        # 检查边冲突
-        for i in range(len(paths)):
-            for j in range(i+1, len(paths)):
-                # 智能体i和j在t时刻交换位置
-                for t in range(len(paths[i].locations)-1):
-                    if t>=len(paths[j].locations)-1:
-                        break
-                    if(paths[i].locations[t] == paths[j].locations[t+1] and paths[i].locations[t+1] == paths[j].locations[t]):
-                        return EdgeConflict(self.agents[i], self.agents[j], paths[i].locations[t], paths[j].locations[t], t+1)
+        conflict_index = self.get_conflict_index(ctNode)
+        if self.use_mdd:
+            conflict = self.choose_conflict(ctNode, conflict_index)
+        else:
+            conflict = conflict_index.get_first_conflict()
+        if conflict is None:
+            return None
+        conflict = ConflictIndex.to_conflict(conflict, self.agents)
+        if self.symmetry is not None: # 矩形/走廊冲突用一次对称分裂解决
+            return self.symmetry.find(ctNode, conflict) or conflict
+        return conflict
+
+    """获取CT节点的冲突索引（全局只保留一份索引，只替换与该节点路径不同的智能体，CT节点本身不保存索引）"""
+    def get_conflict_index(self, ctNode):
+        conflict_index = self.conflict_index
+        if conflict_index is None:
+            self.conflict_index = ConflictIndex.build(ctNode.solution.paths)
+            return self.conflict_index
+        for i in range(len(ctNode.solution.paths)):
+            locations = ctNode.solution.paths[i].locations
+            if conflict_index.paths.get(i) is not locations: # 路径共享（写时复制），未改变的路径为同一对象
+                conflict_index.replace_path(i, locations)
+        return conflict_index
+
+    """按优先级选择冲突（基数 > 半基数 > 非基数，同类冲突按冲突顺序）"""
+    def choose_conflict(self, ctNode, conflict_index):
+        best_conflict = None
+        best_type = None
+        for conflict in sorted(conflict_index.conflicts):
+            conflict_type = self.classify_conflict(ctNode, conflict)
+            if best_conflict is None or conflict_type < best_type:
+                best_conflict = conflict
+                best_type = conflict_type
+                if best_type == self.CARDINAL:
+                    break
+        return best_conflict
+
+    """冲突分类（根据两个智能体的MDD在冲突时刻是否只有唯一位置）"""
+    def classify_conflict(self, ctNode, conflict):
+        i, j, t = conflict[1], conflict[2], conflict[3]
+        mdd_i = self.get_mdd(ctNode, i)
+        mdd_j = self.get_mdd(ctNode, j)
+        if conflict[0] == ConflictIndex.VERTEX:
+            location = (conflict[4], conflict[5])
+            cardinal_i = mdd_i.is_singleton(location, t)
+            cardinal_j = mdd_j.is_singleton(location, t)
+        else: # 边冲突：智能体i由begin移动到end，智能体j反向移动
+            begin = (conflict[4], conflict[5])
+            end = (conflict[6], conflict[7])
+            cardinal_i = mdd_i.is_singleton(begin, t-1) and mdd_i.is_singleton(end, t)
+            cardinal_j = mdd_j.is_singleton(end, t-1) and mdd_j.is_singleton(begin, t)
+        if cardinal_i and cardinal_j:
+            return self.CARDINAL
+        elif cardinal_i or cardinal_j:
+            return self.SEMI_CARDINAL
+        return self.NON_CARDINAL
+
+    """获取CT节点中智能体的MDD（未被重新规划的智能体沿用祖先节点缓存的MDD）"""
+    def get_mdd(self, ctNode, i):
+        agent = self.agents[i]
+        node = ctNode
+        while (node.mdds is None or i not in node.mdds) and node.parent is not None and not self.is_replanned(node, i):
+            node = node.parent
+        if node.mdds is None:
+            node.mdds = {}
+        if i not in node.mdds: # 该智能体的路径在node及其后代中未改变，代价与当前节点相同
+            node.mdds[i] = MDD(self.a_star, agent, node.get_agent_constraints(agent), ctNode.solution.paths[i].get_cost())
+        if ctNode.mdds is None:
+            ctNode.mdds = {}
+        ctNode.mdds[i] = node.mdds[i]
+        return ctNode.mdds[i]
+
+    """检查智能体i的路径是否在CT节点中被重新规划（新增了该智能体或其元智能体成员的约束，或在该节点合并）"""
+    def is_replanned(self, ctNode, i):
+        meta_agent = ctNode.get_meta_agent(i)
+        if ctNode.parent is not None and meta_agent != ctNode.parent.get_meta_agent(i): # 在该节点合并
+            return True
+        return any(ctNode.has_agent_constraints(self.agents[k].id) for k in meta_agent)
+
+    """两智能体子问题的最优代价（用于WDG启发式），超过节点上限时返回已证明的下界
+    直接在两智能体的约束列表上做最佳优先搜索（复用本CBS的底层规划器、路径缓存与距离表，不构建新的CBS）"""
+    def solve_pair(self, i, j, constraints_i, constraints_j, node_limit):
+        agents = (self.agents[i], self.agents[j])
+        paths = (self.a_star.search(agents[0], constraints_i), self.a_star.search(agents[1], constraints_j))
+        if paths[0] is None or paths[1] is None:
+            return float('inf')
+        # 堆元素为(代价, 入堆序号, (i的约束, j的约束), (i的路径, j的路径))
+        open_list = [(paths[0].get_cost() + paths[1].get_cost(), 0, (list(constraints_i), list(constraints_j)), paths)]
+        push_count = 0
+        count = 0
+        while open_list:
+            cost, index, constraints, paths = heapq.heappop(open_list)
+            count += 1
+            if count > node_limit:
+                return cost
+            new_constraints = self.get_pair_conflict_constraints(agents, paths[0].locations, paths[1].locations)
+            if new_constraints is None: # 无冲突
+                return cost
+            for k in range(2):
+                path = self.a_star.search(agents[k], constraints[k] + [new_constraints[k]])
+                if path is None:
+                    continue
+                child_constraints = tuple(constraints[m] + [new_constraints[m]] if m == k else constraints[m] for m in range(2))
+                child_paths = tuple(path if m == k else paths[m] for m in range(2))
+                push_count += 1
+                heapq.heappush(open_list, (child_paths[0].get_cost() + child_paths[1].get_cost(), push_count, child_constraints, child_paths))
+        return float('inf')
+
+    """两条路径的第一个冲突（到达终点后停在终点），返回分别施加给两个智能体的约束，无冲突时返回None"""
+    @staticmethod
+    def get_pair_conflict_constraints(agents, locations1, locations2):
+        for t in range(max(len(locations1), len(locations2))):
+            location1 = locations1[min(t, len(locations1) - 1)]
+            location2 = locations2[min(t, len(locations2) - 1)]
+            if location1 == location2:
+                return (VertexConstraint(agents[0].id, location1, t), VertexConstraint(agents[1].id, location2, t))
+            if t > 0:
+                previous1 = locations1[min(t - 1, len(locations1) - 1)]
+                previous2 = locations2[min(t - 1, len(locations2) - 1)]
+                if previous1 == location2 and previous2 == location1:
+                    return (EdgeConstraint(agents[0].id, previous1, location1, t), EdgeConstraint(agents[1].id, previous2, location2, t))
         return None
 
     """冲突解决"""
     def resolve_conflict(self, best_node, conflict):
+        # MA-CBS：两智能体之间分裂的冲突数超过阈值时合并为元智能体，生成一个合并子节点代替分裂
+        children = None
+        if self.merge_threshold is not None and self.count_pair_conflict(best_node, conflict) > self.merge_threshold \
+                and self.can_merge(best_node, conflict):
+            children = self.remove_duplicates([self.generate_merged_child(best_node, conflict)])
+            try:
+                self.solve_nodes(children)
+            except SearchLimitExceeded: # 联合搜索超过状态上限：放弃合并，按普通方式分裂
+                meta_agent1 = best_node.get_meta_agent(self.agent_index[conflict.agent1.id])
+                meta_agent2 = best_node.get_meta_agent(self.agent_index[conflict.agent2.id])
+                self.declined_merges.add(tuple(sorted(meta_agent1 + meta_agent2)))
+                self.forget_node(children[0])
+                children = None
+            else:
+                if children:
+                    self.merge_count += 1
+        if children is None:
+            children = self.remove_duplicates(self.generate_children(best_node, conflict))
+            # 求解子节点的解决方案（含计算总成本）
+            self.solve_nodes(children)
+        # 添加子节点进open_list
+        self.push_children(best_node, children)
+        return None
+
+    """添加已求解的子节点进open_list（启用冲突绕行且绕行成功时，父节点重新入队，子节点丢弃）"""
+    def push_children(self, best_node, children):
+        if self.bypass and self.try_bypass(best_node, children):
+            return
+        best_node.drop_solution() # 子节点已共享其路径
+        for child in children:
+            self.push_node(child)
+
+    """冲突绕行：若某子节点的代价与父节点相同且冲突数更少，父节点采用该子节点的路径（约束不变，新路径同样满足父节点的约束）"""
+    def try_bypass(self, best_node, children):
+        conflict_count = self.get_conflict_index(best_node).get_conflict_count()
+        best_child = None
+        for child in children:
+            if child.solution is None or child.cost != best_node.cost:
+                continue
+            child_conflict_count = self.get_conflict_index(child).get_conflict_count()
+            if child_conflict_count < conflict_count: # 选择冲突最少的子节点
+                best_child = child
+                conflict_count = child_conflict_count
+        if best_child is None:
+            return False
+        best_node.set_solution(best_child.solution)
+        for child in children: # 丢弃的子节点未被扩展，不参与之后的重复检测
+            self.forget_node(child)
+        self.bypass_count += 1
+        self.push_node(best_node, generated=False)
+        return True
+
+    """统计两冲突智能体所在元智能体之间分裂的冲突数（含本次）"""
+    def count_pair_conflict(self, ctNode, conflict):
+        meta_agent1 = ctNode.get_meta_agent(self.agent_index[conflict.agent1.id])
+        meta_agent2 = ctNode.get_meta_agent(self.agent_index[conflict.agent2.id])
+        count = 0
+        for i in meta_agent1:
+            for j in meta_agent2:
+                count += self.pair_conflicts.get((min(i, j), max(i, j)), 0)
+        i, j = self.agent_index[conflict.agent1.id], self.agent_index[conflict.agent2.id]
+        self.pair_conflicts[(min(i, j), max(i, j))] = self.pair_conflicts.get((min(i, j), max(i, j)), 0) + 1
+        return count + 1
+
+    """检查两冲突智能体所在的元智能体能否合并（合并后不超过最大成员数，且之前未因联合搜索超过状态上限而放弃）"""
+    def can_merge(self, ctNode, conflict):
+        meta_agent1 = ctNode.get_meta_agent(self.agent_index[conflict.agent1.id])
+        meta_agent2 = ctNode.get_meta_agent(self.agent_index[conflict.agent2.id])
+        if self.max_meta_agent_size is not None and len(meta_agent1) + len(meta_agent2) > self.max_meta_agent_size:
+            return False
+        return tuple(sorted(meta_agent1 + meta_agent2)) not in self.declined_merges
+
+    """生成合并子节点（约束不变，两冲突智能体所在的元智能体合并，尚未求解）"""
+    def generate_merged_child(self, best_node, conflict):
+        meta_agent1 = best_node.get_meta_agent(self.agent_index[conflict.agent1.id])
+        meta_agent2 = best_node.get_meta_agent(self.agent_index[conflict.agent2.id])
+        child = best_node.create_child([])
+        child.meta_agents = best_node.merge_meta_agents(meta_agent1, meta_agent2)
+        return child
+
+    """生成CT子节点（由冲突生成约束，尚未求解）"""
+    def generate_children(self, best_node, conflict):
+        if(isinstance(conflict, SymmetryConflict)): # 对称冲突：屏障约束或时间段约束
+            return [best_node.create_child(conflict.constraints1), best_node.create_child(conflict.constraints2)]
+        if self.disjoint:
+            return self.generate_disjoint_children(best_node, conflict)
         # 顶点冲突
         if(isinstance(conflict, VertexConflict)):
             # 生成约束
             constraint1 = VertexConstraint(conflict.agent1.id, conflict.location, conflict.time)
             constraint2 = VertexConstraint(conflict.agent2.id, conflict.location, conflict.time)
-            
-            # 生成CT子节点,并求解决方案（含计算总成本）
-            best_node.set_left_child([constraint1]) 
-            best_node.set_right_child([constraint2])
-            best_node.left_child.set_solution(self.get_solution(best_node.left_child))
-            best_node.right_child.set_solution(self.get_solution(best_node.right_child))
-            
-            # 添加子节点进open_list
-            heapq.heappush(self.open_list, best_node.left_child)
-            heapq.heappush(self.open_list, best_node.right_child)
 
         # 边冲突
         elif(isinstance(conflict, EdgeConflict)):
@@ -100,39 +471,139 @@ class CBS:
             constraint1 = EdgeConstraint(conflict.agent1.id, conflict.begin, conflict.end, conflict.time)
             #### 注意：agent2的begin和end是相反的
             constraint2 = EdgeConstraint(conflict.agent2.id, conflict.end, conflict.begin, conflict.time)
-            
-            # 生成CT子节点,并求解决方案（含计算总成本）
-            best_node.set_left_child([constraint1]) 
-            best_node.set_right_child([constraint2])
-            best_node.left_child.set_solution(self.get_solution(best_node.left_child))
-            best_node.right_child.set_solution(self.get_solution(best_node.right_child))
-            
-            # 添加子节点进open_list
-            heapq.heappush(self.open_list, best_node.left_child)
-            heapq.heappush(self.open_list, best_node.right_child)
-        return None
+
+        # 生成CT子节点
+        return [best_node.create_child([constraint1]), best_node.create_child([constraint2])]
+
+    """不相交分裂：对冲突中的第一个智能体，一个子节点要求其经过冲突位置（正约束），另一个子节点禁止其经过（负约束），两子节点的解空间不相交"""
+    def generate_disjoint_children(self, best_node, conflict):
+        if(isinstance(conflict, VertexConflict)):
+            positive = PositiveVertexConstraint(conflict.agent1.id, conflict.location, conflict.time)
+            negative = VertexConstraint(conflict.agent1.id, conflict.location, conflict.time)
+        elif(isinstance(conflict, EdgeConflict)):
+            positive = PositiveEdgeConstraint(conflict.agent1.id, conflict.begin, conflict.end, conflict.time)
+            negative = EdgeConstraint(conflict.agent1.id, conflict.begin, conflict.end, conflict.time)
+        positive_constraints = [positive] + self.get_implied_constraints(best_node, positive)
+        return [best_node.create_child(positive_constraints), best_node.create_child([negative])]
+
+    """正约束隐含的其他智能体的负约束（只为当前路径违反的智能体添加，这些智能体在正约束子节点中重新规划）"""
+    def get_implied_constraints(self, ctNode, positive):
+        conflict_index = self.get_conflict_index(ctNode)
+        meta_agent = ctNode.get_meta_agent(self.agent_index[positive.agent_id]) # 元智能体成员之间无冲突
+        if(isinstance(positive, PositiveVertexConstraint)):
+            occupied = [(positive.location, positive.time)]
+        else: # 正边约束：time-1时刻位于起点，time时刻位于终点，且其他智能体不能反向经过该边
+            occupied = [(positive.begin, positive.time - 1), (positive.end, positive.time)]
+        constraints = []
+        for location, t in occupied:
+            for other in conflict_index.get_agents_at(location, t):
+                if other not in meta_agent:
+                    constraints.append(VertexConstraint(self.agents[other].id, location, t))
+        if(isinstance(positive, PositiveEdgeConstraint)):
+            end, begin = positive.end, positive.begin
+            for other in conflict_index.edge_table.get((positive.time, end[0], end[1], begin[0], begin[1]), ()):
+                if other not in meta_agent:
+                    constraints.append(EdgeConstraint(self.agents[other].id, end, begin, positive.time))
+        return constraints
+
+    """求解多个CT节点的解决方案（并行模式下所有底层规划任务同时分发到进程池）"""
+    def solve_nodes(self, nodes):
+        if self.executor is None or self.w is not None or self.merge_threshold is not None: # 串行（ECBS的焦点搜索依赖冲突索引，元智能体的联合搜索不分发）
+            for node in nodes:
+                node.set_solution(self.get_solution(node))
+            return
+
+        # 分发底层规划任务：根节点规划全部智能体，子节点只规划新增约束的智能体
+        tasks = [] # 每个节点的(智能体序号, 任务)列表
+        for node in nodes:
+            if node.parent is None:
+                replanned = range(len(self.agents))
+            else:
+                replanned = sorted(self.agent_index[agent_id] for agent_id, chain in node.agent_constraints)
+            node_tasks = []
+            for i in replanned:
+                agent_constraints = node.get_agent_constraints(self.agents[i])
+                node_tasks.append((i, self.executor.submit(plan_in_worker, self.agents[i], agent_constraints, self.a_star.deadline)))
+            tasks.append(node_tasks)
+
+        # 按提交顺序收集结果（保证结果确定）
+        for node, node_tasks in zip(nodes, tasks):
+            if node.parent is None:
+                solution = Solution()
+                solution.paths = [None] * len(self.agents)
+            else:
+                solution = node.parent.solution.copy() # 共享父节点未改变的路径
+            for i, future in node_tasks:
+                locations = future.result()
+                if locations is None: # 无解
+                    print(str(self.agents[i].id)+"在当前节点约束下无解决方案")
+                    solution = None
+                    break
+                path = Path(self.agents[i])
+                path.locations = locations
+                solution.paths[i] = path
+            node.set_solution(solution)
+
+    """调用底层规划求解（ECBS模式下使用焦点搜索，并记录该智能体的代价下界）"""
+    def plan_path(self, agent, agent_index, constraints, solution, conflict_index):
+        if self.w is None:
+            return self.a_star.search(agent, constraints)
+        path, lower_bound = self.a_star.focal_search(agent, constraints, self.w, conflict_index, agent_index)
+        if path is not None:
+            if agent_index < len(solution.lower_bounds): # 约束只增不减，下界不低于父节点的下界
+                solution.lower_bounds[agent_index] = max(solution.lower_bounds[agent_index], lower_bound)
+            else:
+                solution.lower_bounds.append(lower_bound)
+        return path
+
+    """元智能体的联合规划（各成员在当前节点下的约束，成员之间无冲突，代价之和最优），返回成员路径列表；
+    state_limit为联合搜索的状态上限，超过时抛出SearchLimitExceeded"""
+    def plan_meta_agent(self, ctNode, meta_agent, solution, state_limit=None):
+        agents = [self.agents[k] for k in meta_agent]
+        paths = self.a_star.joint_search(agents, [ctNode.get_agent_constraints(agent) for agent in agents], state_limit)
+        if paths is not None and self.w is not None: # 联合搜索最优，代价即下界
+            for k, path in zip(meta_agent, paths):
+                while len(solution.lower_bounds) <= k:
+                    solution.lower_bounds.append(0)
+                solution.lower_bounds[k] = max(solution.lower_bounds[k], path.get_cost())
+        return paths
 
     """获取解决方案"""
     def get_solution(self, ctNode): 
-        all_constraints = ctNode.get_all_constraints() # 获取完整约束（从根节点到当前节点）
         solution = Solution() # 初始化解决方案
 
         # 根节点: 初始化所有解决方案
         if(ctNode.parent is None): 
-            for agent in self.agents:
+            conflict_index = ConflictIndex() # 已规划智能体的冲突索引（ECBS底层焦点搜索使用）
+            for i in range(len(self.agents)):
+                agent = self.agents[i]
                 # 获取待求解智能体的全部约束
-                agent_constraints = ctNode.get_agent_constraints(agent, all_constraints)
+                agent_constraints = ctNode.get_agent_constraints(agent)
                 # 调用底层规划求解
-                path = self.a_star.search(agent, agent_constraints)
+                path = self.plan_path(agent, i, agent_constraints, solution, conflict_index)
                 
                 if path is None: # 无解
                     print(str(agent.id)+"在当前节点约束下无解决方案")
                     return None
                 solution.add_path(path)
+                if self.w is not None:
+                    conflict_index.add_path(i, path.locations)
+            if self.w is not None:
+                self.conflict_index = conflict_index
 
         # 非根节点: 更新新增约束的智能体的解决方案，继承父节点其他解决方案
         else:
-            solution = deepcopy(ctNode.parent.solution)
+            solution = ctNode.parent.solution.copy() # 共享父节点未改变的路径
+            conflict_index = self.get_conflict_index(ctNode.parent) if self.w is not None else None # 父节点的冲突索引
+            # 合并子节点：联合规划新合并的元智能体
+            for meta_agent in ctNode.meta_agents:
+                if meta_agent not in ctNode.parent.meta_agents:
+                    paths = self.plan_meta_agent(ctNode, meta_agent, solution, self.joint_state_limit)
+                    if paths is None:
+                        print("元智能体"+str([self.agents[k].id for k in meta_agent])+"无解决方案")
+                        return None
+                    for k, path in zip(meta_agent, paths):
+                        solution.paths[k] = path
             for constraint in ctNode.constraints:
                 # 获取待求解智能体的信息
                 current_agent_id = constraint.agent_id
@@ -147,12 +618,21 @@ class CBS:
                 if(current_agent is None):
                     print("agent"+str(current_agent_id)+"不存在")
                     return None
+                # 元智能体成员：联合规划整个元智能体
+                elif len(ctNode.get_meta_agent(current_agent_index)) > 1:
+                    meta_agent = ctNode.get_meta_agent(current_agent_index)
+                    paths = self.plan_meta_agent(ctNode, meta_agent, solution, self.replan_state_limit)
+                    if paths is None:
+                        print("元智能体"+str([self.agents[k].id for k in meta_agent])+"在当前节点约束下无解决方案")
+                        return None
+                    for k, path in zip(meta_agent, paths):
+                        solution.paths[k] = path
                 # 求解    
                 else:
                     # 获取待求解智能体的全部约束
-                    current_agent_constraints = ctNode.get_agent_constraints(current_agent, all_constraints)
+                    current_agent_constraints = ctNode.get_agent_constraints(current_agent)
                     # 调用底层规划求解
-                    path = self.a_star.search(current_agent, current_agent_constraints)
+                    path = self.plan_path(current_agent, current_agent_index, current_agent_constraints, solution, conflict_index)
                     
                     if path is None: # 无解
                         print(str(current_agent_id)+"在当前节点约束下无解决方案")
@@ -162,41 +642,130 @@ class CBS:
         return solution
 
 """CBS主函数"""
-def cbs_main(agents, size, obstacles):
-    cbs = CBS(agents, size, obstacles) # 初始化环境
+def cbs_main(agents, size, obstacles, use_mdd=False, heuristic=None, w=None, workers=None, expand_k=1,
+             path_cache_size=CBS.PATH_CACHE_SIZE, reuse_paths=False, planner="astar", merge_threshold=None,
+             bypass=False, disjoint=False, symmetry=False, time_limit=None, node_limit=None,
+             max_meta_agent_size=CBS.MAX_META_AGENT_SIZE, joint_state_limit=CBS.JOINT_STATE_LIMIT):
+    cbs = CBS(agents, size, obstacles, use_mdd, heuristic, w, workers, path_cache_size, reuse_paths, planner,
+              merge_threshold, bypass, disjoint, symmetry, max_meta_agent_size, joint_state_limit) # 初始化环境
+    try:
+        return cbs_search(cbs, expand_k, time_limit, node_limit)
+    finally:
+        cbs.close() # 关闭进程池
+
+"""CBS主循环（expand_k > 1且为并行模式时，每次投机地同时扩展open_list中前k个节点）
+time_limit为求解时间预算（秒），node_limit为扩展CT节点数预算，均为None时搜索到最优（或ECBS有界次优）解为止；
+预算耗尽时返回已知最好的无冲突解。返回的解节点带有status（OPTIMAL/BOUNDED/FALLBACK）、lower_bound、suboptimality与stats；
+有时间预算时底层搜索（含根节点与子节点的求解）同样受截止时刻限制，搜索在预留FALLBACK_SHARE的时间后结束，剩余时间用于回退的优先级规划；
+有CT节点数预算时，已有元智能体的联合搜索生成的状态数不超过joint_state_limit，超过时同样视为预算耗尽；
+root_constraints为施加在根节点上的约束（如LNS中避让固定路径的预留约束；优先级规划不考虑这些约束，此时预算耗尽不使用回退解，搜索可用完全部预算）"""
+def cbs_search(cbs, expand_k=1, time_limit=None, node_limit=None, root_constraints=()):
     if(not cbs.check_problem()): # 检查问题合理性
         return None
-    root = CTNode([], None) # 根节点
-    heapq.heappush(cbs.open_list, root) # 添加根节点
-    root.set_solution(cbs.get_solution(root))
+    begin_time = time.perf_counter()
+    deadline = begin_time + time_limit if time_limit is not None else None # 整体截止时刻
+    search_deadline = deadline # 搜索的截止时刻
+    if deadline is not None and not root_constraints:
+        search_deadline = deadline - time_limit * cbs.FALLBACK_SHARE
+    cbs.replan_state_limit = cbs.joint_state_limit if node_limit is not None else None # CT节点数预算同样限制单次联合搜索
+    expanding = [] # 正在扩展的节点（已从open_list取出、子节点尚未加入；底层搜索超时时放回open_list）
+    cbs.a_star.deadline = search_deadline
+    try:
+        root = CTNode(root_constraints, None) # 根节点
+        cbs.remove_duplicates([root])
+        cbs.solve_nodes([root])
+        cbs.push_node(root) # 添加根节点
+        return expand_nodes(cbs, expand_k, node_limit, root_constraints, begin_time, search_deadline, deadline, expanding)
+    except SearchTimeout:
+        for node in expanding:
+            cbs.push_node(node, generated=False)
+        return finish_budget(cbs, begin_time, not root_constraints, deadline)
+    finally:
+        cbs.a_star.deadline = None
+
+"""预算耗尽：打印统计并返回已知最好的无冲突解（见CBS.get_budget_result）"""
+def finish_budget(cbs, begin_time, fallback, deadline):
+    print()
+    print("求解预算耗尽，共扩展了 "+str(cbs.expanded_count)+" 个节点，耗时 "+format(time.perf_counter() - begin_time, ".2f")+" 秒")
+    cbs.a_star.deadline = None # 回退的优先级规划使用自己的截止时刻
+    result = cbs.get_budget_result(fallback, deadline)
+    if result is not None:
+        result.stats = cbs.get_stats()
+        result.stats["status"] = result.status
+    return result
 
+"""扩展CT节点直到找到解或预算耗尽（expanding记录正在扩展的节点）"""
+def expand_nodes(cbs, expand_k, node_limit, root_constraints, begin_time, search_deadline, deadline, expanding):
     # 主循环
-    count = 0 # 计数
-    while(cbs.open_list):
-        count+=1
-        if(count>999999999):
-            print("扩展节点数超过999999999，退出")
-            return None
-        sys.stdout.write(f"\r————————————进度: 第{count}个节点————————————")
-        sys.stdout.flush()
+    while(True):
+        # 预算耗尽：返回已知最好的无冲突解
+        if (search_deadline is not None and time.perf_counter() >= search_deadline) \
+                or (node_limit is not None and cbs.expanded_count >= node_limit):
+            return finish_budget(cbs, begin_time, not root_constraints, deadline)
 
-        best_node = heapq.heappop(cbs.open_list) # 最小成本节点(最佳优先搜索)
-        cbs.closed_list.append(best_node) # 添加到已扩展节点列表
+        # 最小成本节点(最佳优先搜索)；ECBS模式下为焦点列表中冲突最少的节点
+        best_node = cbs.pop_node()
+        if best_node is None:
+            break
+        expanding[:] = [best_node]
+
+        # 高层启发式（延迟计算：节点出堆时计算h，h>0则按新的优先级重新入堆；ECBS模式不使用）
+        if cbs.heuristic is not None and cbs.w is None and best_node.solution is not None and not best_node.h_computed:
+            best_node.h = cbs.heuristic.compute(best_node)
+            best_node.h_computed = True
+            if best_node.h == float('inf'): # 子问题无解
+                continue
+            if best_node.h > 0:
+                heapq.heappush(cbs.open_list, best_node)
+                continue
+
+        cbs.expanded_count+=1
+        sys.stdout.write(f"\r————————————进度: 第{cbs.expanded_count}个节点————————————")
+        sys.stdout.flush()
 
         # 冲突检测
-        conflict = cbs.search_first_conflict(best_node.solution) 
+        conflict = cbs.search_first_conflict(best_node) 
 
         # 无解节点
         if conflict == 404: # 无解节点
             # cbs.open_list.remove(best_node) # 从待扩展节点列表中移除
-            # cbs.closed_list.append(best_node) # 添加到已扩展节点列表
             continue
         # 有冲突，解决冲突
         elif(conflict):
-            cbs.resolve_conflict(best_node, conflict) # 冲突解决
+            if expand_k > 1 and cbs.executor is not None and cbs.w is None and cbs.merge_threshold is None:
+                # 投机扩展：与open_list中其他有冲突的最优节点一起生成子节点，底层规划并行执行
+                batch = [(best_node, conflict)] + cbs.pop_batch(expand_k - 1)
+                expanding[:] = [node for node, node_conflict in batch]
+                cbs.expanded_count += len(batch) - 1
+                batch_children = [cbs.remove_duplicates(cbs.generate_children(node, node_conflict)) for node, node_conflict in batch]
+                cbs.solve_nodes([child for children in batch_children for child in children])
+                for (node, node_conflict), children in zip(batch, batch_children):
+                    cbs.push_children(node, children)
+            else:
+                cbs.resolve_conflict(best_node, conflict) # 冲突解决
         # 无冲突，结束
         else:
             print()
-            print("成功找到解决方案，共扩展了 "+str(count)+" 个节点")
+            print("成功找到解决方案，共扩展了 "+str(cbs.expanded_count)+" 个节点，生成了 "+str(cbs.generated_count)+" 个节点")
+            print("重复节点检测：命中 "+str(cbs.duplicate_hits)+" 次，未命中 "+str(cbs.duplicate_misses)+" 次")
+            if cbs.bypass:
+                print("冲突绕行："+str(cbs.bypass_count)+" 次")
+            if cbs.symmetry is not None:
+                print("对称推理：矩形冲突 "+str(cbs.symmetry.rectangle_count)+" 次，走廊冲突 "+str(cbs.symmetry.corridor_count)+" 次")
+            if cbs.path_cache is not None and cbs.path_cache.hits + cbs.path_cache.misses > 0: # 并行模式下底层规划在工作进程中执行
+                print("路径缓存：命中 "+str(cbs.path_cache.hits)+" 次，未命中 "+str(cbs.path_cache.misses)+" 次，命中率 "
+                      +format(cbs.path_cache.get_hit_rate(), ".1%")+"，复用 "+str(cbs.path_cache.reuses)+" 次")
+            if cbs.w is not None: # 已证明的次优界：代价 / 最优代价下界
+                lower_bound = min(cbs.focal.get_f_min(), best_node.lower_bound)
+                best_node.suboptimality = best_node.cost / lower_bound if lower_bound > 0 else 1.0
+                best_node.lower_bound = lower_bound
+                print("ECBS解的代价为 "+str(best_node.cost)+"，最优代价下界为 "+str(lower_bound)+"，次优界为 "+format(best_node.suboptimality, ".3f"))
+            best_node.status = cbs.OPTIMAL if cbs.w is None or best_node.cost == best_node.lower_bound else cbs.BOUNDED
+            best_node.stats = cbs.get_stats()
+            best_node.stats["status"] = best_node.status
+            if cbs.merge_threshold is not None:
+                meta_agents = [[cbs.agents[k].id for k in meta_agent] for meta_agent in best_node.meta_agents]
+                best_node.stats["meta_agents"] = meta_agents
+                print("元智能体合并：共 "+str(cbs.merge_count)+" 次，解中的元智能体: "+str(meta_agents))
             return best_node
     return None
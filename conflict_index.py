@@ -0,0 +1,156 @@
+"""冲突索引（时空占用哈希表），用于CBS的增量式冲突检测"""
+from entity import *
+
+"""冲突索引类
+vertex_table/edge_table记录每个(时间, 位置)/(时间, 边)被哪些智能体占用，
+切换到另一个CT节点时只需删除路径改变的智能体的旧路径并插入新路径，
+同时维护当前全部冲突的集合，冲突元组可直接比较大小（顶点冲突优先，其次按智能体序号和时间）"""
+class ConflictIndex:
+    VERTEX = 0 # 顶点冲突标记
+    EDGE = 1 # 边冲突标记
+
+    def __init__(self):
+        self.vertex_table = {} # (t, x, y) -> 该时刻位于该位置的智能体序号元组
+        self.edge_table = {} # (t, 起点x, 起点y, 终点x, 终点y) -> t时刻经该边到达终点的智能体序号元组
+        self.cell_table = {} # (x, y) -> 经过该位置的(智能体序号, t)元组（用于检测到达终点后仍被碰撞）
+        self.goal_table = {} # (x, y) -> (智能体序号, 到达时间)，智能体到达终点后一直停留
+        self.conflicts = set() # 当前全部冲突
+        self.paths = {} # 智能体序号 -> 已插入的路径点（删除路径时使用，无需保留父节点的解决方案）
+
+    # 由全部路径构建索引
+    @classmethod
+    def build(cls, paths):
+        index = cls()
+        for i in range(len(paths)):
+            index.add_path(i, paths[i].locations)
+        return index
+
+    # 生成顶点冲突元组（智能体序号小者在前）
+    def __vertex_conflict(self, agent1, agent2, t, x, y):
+        if agent1 > agent2:
+            agent1, agent2 = agent2, agent1
+        return (self.VERTEX, agent1, agent2, t, x, y)
+
+    # 生成边冲突元组（begin/end为agent1的移动，序号小者在前）
+    def __edge_conflict(self, agent1, agent2, t, begin, end):
+        if agent1 > agent2:
+            return (self.EDGE, agent2, agent1, t, end[0], end[1], begin[0], begin[1])
+        return (self.EDGE, agent1, agent2, t, begin[0], begin[1], end[0], end[1])
+
+    # 插入智能体路径，并记录其与其他智能体的冲突
+    def add_path(self, agent, locations):
+        self.paths[agent] = locations
+        finish = len(locations) - 1 # 到达终点的时间
+        for t in range(len(locations)):
+            x, y = locations[t][0], locations[t][1]
+            # 顶点冲突：同一时刻位于同一位置
+            key = (t, x, y)
+            others = self.vertex_table.get(key, ())
+            for other in others:
+                self.conflicts.add(self.__vertex_conflict(agent, other, t, x, y))
+            self.vertex_table[key] = others + (agent,)
+            # 顶点冲突：经过已停在终点的智能体
+            parked = self.goal_table.get((x, y))
+            if parked is not None and parked[0] != agent and t > parked[1]:
+                self.conflicts.add(self.__vertex_conflict(agent, parked[0], t, x, y))
+            self.cell_table[(x, y)] = self.cell_table.get((x, y), ()) + ((agent, t),)
+
+            # 边冲突：两智能体交换位置
+            if t > 0:
+                px, py = locations[t-1][0], locations[t-1][1]
+                if (px, py) != (x, y):
+                    for other in self.edge_table.get((t, x, y, px, py), ()):
+                        self.conflicts.add(self.__edge_conflict(agent, other, t, (px, py), (x, y)))
+                    key = (t, px, py, x, y)
+                    self.edge_table[key] = self.edge_table.get(key, ()) + (agent,)
+
+        # 到达终点后停留：与之后经过终点的智能体冲突
+        gx, gy = locations[finish][0], locations[finish][1]
+        self.goal_table[(gx, gy)] = (agent, finish)
+        for other, t in self.cell_table[(gx, gy)]:
+            if other != agent and t > finish:
+                self.conflicts.add(self.__vertex_conflict(agent, other, t, gx, gy))
+
+    # 删除智能体路径及其相关冲突
+    def remove_path(self, agent):
+        locations = self.paths.pop(agent)
+        for t in range(len(locations)):
+            x, y = locations[t][0], locations[t][1]
+            key = (t, x, y)
+            others = tuple(a for a in self.vertex_table[key] if a != agent)
+            if others:
+                self.vertex_table[key] = others
+            else:
+                del self.vertex_table[key]
+            visits = self.cell_table.get((x, y))
+            if visits is not None:
+                visits = tuple(visit for visit in visits if visit[0] != agent)
+                if visits:
+                    self.cell_table[(x, y)] = visits
+                else:
+                    del self.cell_table[(x, y)]
+            if t > 0:
+                px, py = locations[t-1][0], locations[t-1][1]
+                if (px, py) != (x, y):
+                    key = (t, px, py, x, y)
+                    others = tuple(a for a in self.edge_table[key] if a != agent)
+                    if others:
+                        self.edge_table[key] = others
+                    else:
+                        del self.edge_table[key]
+
+        goal = (locations[-1][0], locations[-1][1])
+        if self.goal_table.get(goal, (None,))[0] == agent:
+            del self.goal_table[goal]
+        self.conflicts = {conflict for conflict in self.conflicts if conflict[1] != agent and conflict[2] != agent}
+
+    # 替换智能体路径（子节点重新规划后增量更新）
+    def replace_path(self, agent, new_locations):
+        self.remove_path(agent)
+        self.add_path(agent, new_locations)
+
+    # 获取t时刻位于location的智能体（含已停在该终点的智能体）
+    def get_agents_at(self, location, t):
+        agents = list(self.vertex_table.get((t, location[0], location[1]), ()))
+        parked = self.goal_table.get((location[0], location[1]))
+        if parked is not None and t > parked[1]:
+            agents.append(parked[0])
+        return agents
+
+    # 获取第一个冲突（顶点冲突优先，其次按智能体序号、时间排序）
+    def get_first_conflict(self):
+        if not self.conflicts:
+            return None
+        return min(self.conflicts)
+
+    # 统计智能体由current移动到target（t时刻到达）时与其他智能体的冲突数（用于ECBS底层焦点搜索）
+    def count_move_conflicts(self, agent, current, target, t):
+        count = 0
+        for other in self.vertex_table.get((t, target[0], target[1]), ()):
+            if other != agent:
+                count += 1
+        parked = self.goal_table.get((target[0], target[1]))
+        if parked is not None and parked[0] != agent and t > parked[1]:
+            count += 1
+        if (current[0], current[1]) != (target[0], target[1]):
+            for other in self.edge_table.get((t, target[0], target[1], current[0], current[1]), ()):
+                if other != agent:
+                    count += 1
+        return count
+
+    # 获取冲突总数
+    def get_conflict_count(self):
+        return len(self.conflicts)
+
+    # 获取指定智能体的冲突数
+    def get_agent_conflict_count(self, agent):
+        return sum(1 for conflict in self.conflicts if conflict[1] == agent or conflict[2] == agent)
+
+    # 将冲突元组转换为冲突对象
+    @staticmethod
+    def to_conflict(conflict, agents):
+        agent1 = agents[conflict[1]]
+        agent2 = agents[conflict[2]]
+        if conflict[0] == ConflictIndex.VERTEX:
+            return VertexConflict(agent1, agent2, [conflict[4], conflict[5]], conflict[3])
+        return EdgeConflict(agent1, agent2, [conflict[4], conflict[5]], [conflict[6], conflict[7]], conflict[3])
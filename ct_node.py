@@ -1,20 +1,72 @@
 from entity import *
 
-"""CT节点"""
+"""CT节点
+使用__slots__减少内存；每个智能体的约束以持久化链表(约束, 父链表)保存，子节点只追加新约束并共享父节点的链表；
+节点扩展后释放解决方案（子节点已共享其路径）"""
 class CTNode:
+    __slots__ = ('parent', 'constraints', 'agent_constraints', 'constraint_hash', 'constraint_hash2', 'meta_agents', 'solution', 'cost', 'mdds', 'h', 'h_computed', 'lower_bound', 'suboptimality', 'status', 'stats')
+
     def __init__(self, constraints, parent):
         self.parent = parent # 父节点
-        self.constraints = constraints # 约束列表
-        self.left_child = None # 左子节点
-        self.right_child = None # 右子节点
-        
+        self.constraints = tuple(constraints) # 本节点新增的约束
+        self.agent_constraints = self.__build_agent_constraints() # 本节点新增约束的智能体的约束链表((智能体ID, 链表), ...)
+        self.constraint_hash, self.constraint_hash2 = self.__calculate_constraint_hash() # 完整约束集的两个独立的规范哈希（与约束添加顺序无关，合起来作为节点标识）
+        self.meta_agents = parent.meta_agents if parent is not None else () # 元智能体（MA-CBS合并的智能体序号组，有序元组的有序元组）
+        self.solution = None # 解决方案
+        self.cost = float('inf') # 成本
+        self.mdds = None # 智能体序号 -> MDD（按需构建）
+        self.h = 0 # 高层启发值（代价下界增量）
+        self.h_computed = False # 是否已计算高层启发值
+        self.lower_bound = 0 # 最优代价下界（ECBS）
+        self.suboptimality = 1.0 # 已证明的次优界（解的代价 / 最优代价下界）
+        self.status = None # 求解状态（最优/有界次优/回退解，仅在cbs_main返回的解节点上设置）
+        self.stats = None # 求解统计（仅在cbs_main返回的解节点上设置）
+
     # 设置解决方案
     def set_solution(self, solution):
         self.solution = solution # 路径列表
         if(solution is None):
             self.cost = float('inf') # 设置成本为无穷大
+            self.lower_bound = float('inf')
         else:
             self.cost = self.__calculate_cost(self.solution) # 计算成本
+            self.lower_bound = sum(solution.lower_bounds) if solution.lower_bounds else self.cost
+
+    # 扩展后释放解决方案（子节点已共享其路径，成本保留）
+    def drop_solution(self):
+        self.solution = None
+
+    # 构建新增约束的智能体的约束链表（在父节点链表的基础上追加）
+    def __build_agent_constraints(self):
+        chains = {}
+        for constraint in self.constraints:
+            agent_id = constraint.agent_id
+            if agent_id not in chains:
+                chains[agent_id] = self.parent.get_agent_chain(agent_id) if self.parent is not None else None
+            chains[agent_id] = (constraint, chains[agent_id])
+        return tuple(chains.items())
+
+    # 计算完整约束集的两个哈希（父节点哈希加上新增约束键的哈希，求和与顺序无关；第二个哈希对约束键的文本求哈希，与元组哈希相互独立）
+    def __calculate_constraint_hash(self):
+        if self.parent is not None:
+            constraint_hash, constraint_hash2 = self.parent.constraint_hash, self.parent.constraint_hash2
+        else:
+            constraint_hash, constraint_hash2 = 0, 0
+        for constraint in self.constraints:
+            key = constraint.get_key()
+            constraint_hash = (constraint_hash + hash(key)) & 0xFFFFFFFFFFFFFFFF
+            constraint_hash2 = (constraint_hash2 + hash(repr(key))) & 0xFFFFFFFFFFFFFFFF
+        return constraint_hash, constraint_hash2
+
+    # 获取指定智能体的约束链表（沿父节点向上查找最近一次新增该智能体约束的节点）
+    def get_agent_chain(self, agent_id):
+        node = self
+        while node is not None:
+            for chain_agent_id, chain in node.agent_constraints:
+                if chain_agent_id == agent_id:
+                    return chain
+            node = node.parent
+        return None
 
     # 获取完整约束（从根节点到当前节点）
     def get_all_constraints(self):
@@ -26,13 +78,21 @@ class CTNode:
         return constraints
 
     # 获取指定智能体的全部约束
-    def get_agent_constraints(self, agent, constraints):
+    def get_agent_constraints(self, agent):
         agent_constraints = []
-        for constraint in constraints:
-            if(constraint.agent_id == agent.id):
-                agent_constraints.append(constraint)
+        chain = self.get_agent_chain(agent.id)
+        while chain is not None:
+            agent_constraints.append(chain[0])
+            chain = chain[1]
         return agent_constraints
 
+    # 检查本节点是否新增了指定智能体的约束
+    def has_agent_constraints(self, agent_id):
+        for chain_agent_id, chain in self.agent_constraints:
+            if chain_agent_id == agent_id:
+                return True
+        return False
+
     # 计算成本
     def __calculate_cost(self, solution):
         sum = 0
@@ -44,26 +104,36 @@ class CTNode:
     # 获取父节点
     def get_parent(self):
         return self.parent
-    # 生成左子节点
-    def set_left_child(self, constraints):
-        self.left_child = CTNode(constraints, self)
-        return self.left_child
-    # 生成右子节点
-    def set_right_child(self, constraints):
-        self.right_child = CTNode(constraints, self)
-        return self.right_child
-    # 获取左子节点
-    def get_left_child(self):
-        return self.left_child
-    # 获取右子节点
-    def get_right_child(self):
-        return self.right_child
+    # 生成子节点（子节点引用父节点，父节点不保存子节点，未扩展的分支可被及时回收）
+    def create_child(self, constraints):
+        return CTNode(constraints, self)
+
+    # 获取优先级f = cost + h
+    def get_f(self):
+        return self.cost + self.h
 
     # 小于
     def __lt__(self, other):
-        return self.cost < other.cost
-    # 重写__eq__和__hash__方法
+        return self.get_f() < other.get_f()
+    # 重写__eq__和__hash__方法（按节点标识比较，与约束顺序无关；元智能体划分不同的节点不相同）
     def __eq__(self, other):
-        return self.get_all_constraints() == other.get_all_constraints()
+        return self.get_identity() == other.get_identity()
     def __hash__(self):
-        return hash(str(self.get_all_constraints()))
\ No newline at end of file
+        return hash(self.get_identity())
+
+    # 获取节点标识（两个独立的64位约束集哈希与元智能体划分，大小固定，不需要遍历到根节点）
+    def get_identity(self):
+        return (self.constraint_hash, self.constraint_hash2, self.meta_agents)
+
+    # 获取智能体所在的元智能体（未合并时为只含自身的元组）
+    def get_meta_agent(self, agent_index):
+        for meta_agent in self.meta_agents:
+            if agent_index in meta_agent:
+                return meta_agent
+        return (agent_index,)
+
+    # 获取合并两个元智能体后的划分
+    def merge_meta_agents(self, meta_agent1, meta_agent2):
+        merged = tuple(sorted(meta_agent1 + meta_agent2))
+        others = [meta_agent for meta_agent in self.meta_agents if meta_agent != meta_agent1 and meta_agent != meta_agent2]
+        return tuple(sorted(others + [merged]))
@@ -16,17 +16,19 @@ class Agent:
     def __hash__(self):
         return hash(str(self.id) + str(self.start) + str(self.goal))
 
-"""路径类"""
+"""路径类（路径点为不可变元组，可在多个解决方案间安全共享）"""
 class Path:
+    __slots__ = ('agent', 'locations')
+
     def __init__(self, agent):
         self.agent = agent # 路径所属智能体
-        self.locations = [] # 路径点列表
+        self.locations = () # 路径点元组，每个路径点为(x, y)
     # 添加路径点
     def add_location(self, location):
-        self.locations.append(location)
+        self.locations = self.locations + ((location[0], location[1]),)
     # 设置路径
     def set_locations(self, locations):
-        self.locations = locations
+        self.locations = tuple((location[0], location[1]) for location in locations)
     # 获取路径长度
     def get_length(self):
         return len(self.locations)
@@ -51,6 +53,15 @@ class EdgeConflict:
         self.end = end # 冲突终点（agent2所在位置）
         self.time = time # 冲突时间
 
+"""对称冲突类（矩形冲突或走廊冲突，由对称推理给出两个子节点各自的约束，一次分裂消除全部对称分支）"""
+class SymmetryConflict:
+    def __init__(self, kind, agent1, agent2, constraints1, constraints2):
+        self.kind = kind # 冲突类型（矩形/走廊）
+        self.agent1 = agent1 # 冲突智能体1
+        self.agent2 = agent2 # 冲突智能体2
+        self.constraints1 = constraints1 # 第一个子节点的约束（约束agent1）
+        self.constraints2 = constraints2 # 第二个子节点的约束（约束agent2）
+
 """顶点约束类"""
 class VertexConstraint:
     def __init__(self, agent_id, location, time):
@@ -63,6 +74,9 @@ class VertexConstraint:
         if not isinstance(other, VertexConstraint):
             return False
         return self.agent_id == other.agent_id and self.time == other.time and self.location == other.location
+    # 获取约束键（可哈希，用于约束集的规范化比较）
+    def get_key(self):
+        return (0, self.agent_id, self.time, self.location[0], self.location[1])
     # def __hash__(self):
     #     return hash(str(self.agent_id) + str(self.time) + str(self.location))
 
@@ -80,16 +94,104 @@ class EdgeConstraint:
             return False
         return self.agent_id == other.agent_id and self.time == other.time \
             and self.begin == other.begin and self.end == other.end
+    # 获取约束键（可哈希，用于约束集的规范化比较）
+    def get_key(self):
+        return (1, self.agent_id, self.time, self.begin[0], self.begin[1], self.end[0], self.end[1])
     # def __hash__(self):
     #     return hash(str(self.agent_id) + str(self.time) + str(self.begin) + str(self.end))
 
+"""正顶点约束类（不相交分裂：智能体必须在time时刻位于location）"""
+class PositiveVertexConstraint:
+    def __init__(self, agent_id, location, time):
+        self.agent_id = agent_id # 约束智能体ID
+        self.location = location # 约束位置
+        self.time = time # 约束时间
+
+    # 重载
+    def __eq__(self, other):
+        if not isinstance(other, PositiveVertexConstraint):
+            return False
+        return self.agent_id == other.agent_id and self.time == other.time and self.location == other.location
+    # 获取约束键（可哈希，用于约束集的规范化比较）
+    def get_key(self):
+        return (2, self.agent_id, self.time, self.location[0], self.location[1])
+
+"""正边约束类（不相交分裂：智能体必须在time时刻经begin移动到end）"""
+class PositiveEdgeConstraint:
+    def __init__(self, agent_id, begin, end, time):
+        self.agent_id = agent_id # 约束智能体ID
+        self.begin = begin # 约束起点
+        self.end = end # 约束终点(time到达)
+        self.time = time # 约束时间
+
+    # 重载
+    def __eq__(self, other):
+        if not isinstance(other, PositiveEdgeConstraint):
+            return False
+        return self.agent_id == other.agent_id and self.time == other.time \
+            and self.begin == other.begin and self.end == other.end
+    # 获取约束键（可哈希，用于约束集的规范化比较）
+    def get_key(self):
+        return (3, self.agent_id, self.time, self.begin[0], self.begin[1], self.end[0], self.end[1])
+
+"""屏障约束类（矩形推理：智能体不能按曼哈顿最短时刻经过begin到end的整条直线段，begin处的时刻为time，沿线段每格加1）"""
+class BarrierConstraint:
+    def __init__(self, agent_id, begin, end, time):
+        self.agent_id = agent_id # 约束智能体ID
+        self.begin = begin # 线段起点
+        self.end = end # 线段终点
+        self.time = time # 位于起点的约束时间
+
+    # 重载
+    def __eq__(self, other):
+        if not isinstance(other, BarrierConstraint):
+            return False
+        return self.agent_id == other.agent_id and self.time == other.time \
+            and self.begin == other.begin and self.end == other.end
+    # 获取约束键（可哈希，用于约束集的规范化比较）
+    def get_key(self):
+        return (4, self.agent_id, self.time, self.begin[0], self.begin[1], self.end[0], self.end[1])
+    # 获取线段上的全部(时间, 位置)
+    def get_cells(self):
+        dx = (self.end[0] > self.begin[0]) - (self.end[0] < self.begin[0])
+        dy = (self.end[1] > self.begin[1]) - (self.end[1] < self.begin[1])
+        length = abs(self.end[0] - self.begin[0]) + abs(self.end[1] - self.begin[1])
+        return [(self.time + k, (self.begin[0] + k * dx, self.begin[1] + k * dy)) for k in range(length + 1)]
+
+"""时间段约束类（走廊推理、优先级规划的路径预留：智能体在[time, end_time]内的任何时刻都不能位于location）"""
+class RangeConstraint:
+    def __init__(self, agent_id, location, time, end_time):
+        self.agent_id = agent_id # 约束智能体ID
+        self.location = location # 约束位置
+        self.time = time # 时间段开始
+        self.end_time = end_time # 时间段结束（含）
+
+    # 重载
+    def __eq__(self, other):
+        if not isinstance(other, RangeConstraint):
+            return False
+        return self.agent_id == other.agent_id and self.time == other.time \
+            and self.end_time == other.end_time and self.location == other.location
+    # 获取约束键（可哈希，用于约束集的规范化比较）
+    def get_key(self):
+        return (5, self.agent_id, self.time, self.end_time, self.location[0], self.location[1])
+
 """解决方案类"""
 class Solution:
+    __slots__ = ('paths', 'lower_bounds')
+
     def __init__(self):
         self.paths = [] # 路径列表
+        self.lower_bounds = [] # 每条路径的最优代价下界（ECBS）
     # 设置路径
     def add_path(self, path):
         self.paths.append(path)
+    # 写时复制：新解决方案共享原有路径对象，只需替换被重新规划的路径
+    def copy(self):
+        solution = Solution()
+        solution.paths = list(self.paths)
+        solution.lower_bounds = list(self.lower_bounds)
+        return solution
 
 """约束列表类"""
 class Constraints:
@@ -101,4 +203,89 @@ class Constraints:
         if(isinstance(constraint, VertexConstraint)):
             self.vertex_constraints.append(constraint)
         elif(isinstance(constraint, EdgeConstraint)):
-            self.edge_constraints.append(constraint)
\ No newline at end of file
+            self.edge_constraints.append(constraint)
+
+"""约束表类（按时间与位置建立索引，底层搜索中每次约束检查为O(1)）"""
+class ConstraintTable:
+    CONTRADICTION = None # 同一时刻的正约束要求位于不同位置（该时刻无可行位置）
+
+    def __init__(self, constraints=None):
+        self.vertex_table = set() # 顶点约束表，键为(time, x, y)
+        self.edge_table = set() # 边约束表，键为(time, begin_x, begin_y, end_x, end_y)
+        self.positive_table = {} # 正约束表，time -> 该时刻必须位于的位置(x, y)（正边约束拆分为起点和终点两个时刻）
+        self.cell_max_t = {} # 屏障/时间段约束展开的顶点约束：位置 -> 最晚的约束时间（只有位于终点时影响到达终点的时刻）
+        self.times = set() # 存在约束的时刻
+        self.max_t = 0 # 最晚的顶点约束时间(用于到达终点后仍被碰撞)
+        self.blocked_from = {} # 永久占用：位置 -> 开始时刻（之后一直被占用，如优先级规划中先规划的智能体在终点的停留）
+        if constraints:
+            for constraint in constraints:
+                self.add_constraint(constraint)
+
+    # 添加约束
+    def add_constraint(self, constraint):
+        if(isinstance(constraint, VertexConstraint)):
+            self.vertex_table.add((constraint.time, constraint.location[0], constraint.location[1]))
+            self.max_t = max(self.max_t, constraint.time)
+        elif(isinstance(constraint, EdgeConstraint)):
+            self.edge_table.add((constraint.time, constraint.begin[0], constraint.begin[1], constraint.end[0], constraint.end[1]))
+        elif(isinstance(constraint, PositiveVertexConstraint)):
+            self.__add_positive(constraint.time, constraint.location)
+        elif(isinstance(constraint, PositiveEdgeConstraint)):
+            self.__add_positive(constraint.time - 1, constraint.begin)
+            self.__add_positive(constraint.time, constraint.end)
+            self.times.add(constraint.time - 1)
+        elif(isinstance(constraint, BarrierConstraint)):
+            for time, location in constraint.get_cells():
+                self.__add_cell(time, location)
+        elif(isinstance(constraint, RangeConstraint)):
+            for time in range(constraint.time, constraint.end_time + 1):
+                self.__add_cell(time, constraint.location)
+        self.times.add(constraint.time)
+
+    # 添加屏障/时间段约束展开的单个顶点约束（展开后每次检查仍为O(1)）
+    def __add_cell(self, time, location):
+        self.vertex_table.add((time, location[0], location[1]))
+        self.times.add(time)
+        location = (location[0], location[1])
+        self.cell_max_t[location] = max(self.cell_max_t.get(location, 0), time)
+
+    # 添加永久占用（location从time时刻起一直不可进入，只记录一项）
+    def add_blocked_from(self, time, location):
+        location = (location[0], location[1])
+        self.blocked_from[location] = min(self.blocked_from.get(location, time), time)
+        self.times.add(time)
+
+    # 添加正约束要求的位置
+    def __add_positive(self, time, location):
+        location = (location[0], location[1])
+        if self.positive_table.get(time, location) != location:
+            location = self.CONTRADICTION
+        self.positive_table[time] = location
+
+    # 检查从current移动到target（time时刻到达）是否违反约束
+    def is_constrained(self, current, target, time):
+        if (time, target[0], target[1]) in self.vertex_table:
+            return True
+        if (time, current[0], current[1], target[0], target[1]) in self.edge_table:
+            return True
+        if self.blocked_from and self.blocked_from.get((target[0], target[1]), time + 1) <= time:
+            return True
+        return time in self.positive_table and self.positive_table[time] != (target[0], target[1])
+
+    # 检查time时刻是否存在约束
+    def has_constraints(self, time):
+        return time in self.times
+
+    # 获取到达终点后可一直停留的最早时刻（不早于最晚的顶点约束及终点上的屏障/时间段约束，且之后的正约束都要求位于终点；终点被永久占用时为inf）
+    def get_goal_time(self, goal):
+        if (goal[0], goal[1]) in self.blocked_from:
+            return float('inf')
+        goal_time = max(self.max_t, self.cell_max_t.get((goal[0], goal[1]), 0))
+        for time, location in self.positive_table.items():
+            if location != (goal[0], goal[1]):
+                goal_time = max(goal_time, time)
+        return goal_time
+
+    # 获取约束不再随时间变化的时刻（此后每个时刻的约束都相同，同一位置只需记录最早到达）
+    def get_static_time(self):
+        return max(self.times, default=0) + 1
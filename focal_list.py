@@ -0,0 +1,68 @@
+"""焦点列表（Focal List），用于ECBS的有界次优搜索"""
+import heapq
+
+"""焦点列表类
+open_list按下界f排序，focal_list保存所有 代价 <= w * f_min 的元素并按焦点键（如冲突数）排序，
+每次从focal_list中取出焦点键最小的元素，所得解的代价不超过最优代价的w倍
+（底层搜索中代价即f；高层CT节点的代价为实际代价，与下界分开传入）"""
+class FocalList:
+    def __init__(self, w, is_stale=None):
+        self.w = w # 次优因子
+        self.is_stale = is_stale # 判断元素是否已过期的函数（过期元素不再参与f_min的计算）
+        self.open_list = [] # 堆元素为(f, 序号, 焦点键, 代价, 元素)
+        self.focal_list = [] # 堆元素为(焦点键, 代价, 序号, 元素)
+        self.popped = set() # 已出列元素的序号
+        self.f_min = None # 当前open_list中的最小f
+        self.count = 0 # 入列序号（保证出列顺序确定）
+
+    # 添加元素（cost为判断能否进入focal_list的代价，缺省为f）
+    def push(self, item, f, focal_key, cost=None):
+        if cost is None:
+            cost = f
+        self.count += 1
+        heapq.heappush(self.open_list, (f, self.count, focal_key, cost, item))
+        if self.f_min is not None and cost <= self.w * self.f_min:
+            heapq.heappush(self.focal_list, (focal_key, cost, self.count, item))
+
+    # 清理open_list堆顶已出列或已过期的元素，并更新f_min
+    def __update_f_min(self):
+        while self.open_list:
+            f, index, focal_key, cost, item = self.open_list[0]
+            if index in self.popped or (self.is_stale is not None and self.is_stale(item)):
+                heapq.heappop(self.open_list)
+                continue
+            break
+        if not self.open_list:
+            return False
+        f_min = self.open_list[0][0]
+        # f_min增大后，将新满足 代价 <= w * f_min 的元素加入focal_list
+        if self.f_min is None or f_min > self.f_min:
+            old_bound = None if self.f_min is None else self.w * self.f_min
+            self.f_min = f_min
+            for f, index, focal_key, cost, item in self.open_list:
+                if index not in self.popped and (old_bound is None or cost > old_bound) and cost <= self.w * f_min:
+                    heapq.heappush(self.focal_list, (focal_key, cost, index, item))
+        return True
+
+    # 取出焦点键最小的元素
+    def pop(self):
+        if self.__update_f_min():
+            while self.focal_list:
+                focal_key, cost, index, item = heapq.heappop(self.focal_list)
+                if index in self.popped:
+                    continue
+                self.popped.add(index)
+                return item
+            # focal_list为空时直接取open_list堆顶（f_min本身满足界限）
+            f, index, focal_key, cost, item = heapq.heappop(self.open_list)
+            self.popped.add(index)
+            return item
+        return None
+
+    # 获取全部未出列的元素
+    def get_items(self):
+        return [item for f, index, focal_key, cost, item in self.open_list if index not in self.popped]
+
+    # 获取当前的最小下界
+    def get_f_min(self):
+        return self.f_min
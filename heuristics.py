@@ -0,0 +1,143 @@
+"""CBS高层启发式（CG/DG/WDG），为CT节点提供可采纳的代价下界"""
+
+"""高层启发式类
+CG：冲突图，存在基数冲突的智能体对之间连边；
+DG：两两依赖图，两智能体的MDD不存在无冲突联合路径时连边；
+WDG：加权依赖图，边权为两智能体子问题最优代价与当前代价之和的差值；
+h取（加权）最小顶点覆盖，均不会高估剩余代价"""
+class HighLevelHeuristic:
+    CG = "CG" # 冲突图
+    DG = "DG" # 两两依赖图
+    WDG = "WDG" # 加权依赖图
+    MODES = (CG, DG, WDG)
+    EXACT_LIMIT = 10 # 连通分量顶点数不超过该值时精确求解最小顶点覆盖
+    PAIR_NODE_LIMIT = 100 # WDG两智能体子问题的CT节点上限（超出时取下界）
+
+    def __init__(self, cbs, mode):
+        if mode not in self.MODES:
+            raise ValueError("未知的高层启发式: " + str(mode))
+        self.cbs = cbs # 所属CBS
+        self.mode = mode # 启发式类型
+        self.pair_cache = {} # (i, j, i的约束集, j的约束集) -> 边权（跨CT节点复用）
+        self.cache_hits = 0 # 缓存命中次数
+
+    # 计算CT节点的启发值
+    def compute(self, ctNode):
+        conflict_index = self.cbs.get_conflict_index(ctNode)
+        pairs = {} # (i, j) -> 该智能体对的冲突列表
+        for conflict in conflict_index.conflicts:
+            pairs.setdefault((conflict[1], conflict[2]), []).append(conflict)
+        if not pairs:
+            return 0
+
+        edges = {} # (i, j) -> 边权
+        for (i, j), conflicts in sorted(pairs.items()):
+            if len(ctNode.get_meta_agent(i)) > 1 or len(ctNode.get_meta_agent(j)) > 1: # 元智能体成员的路径不再单独最优，不计入下界
+                continue
+            weight = self.get_pair_weight(ctNode, i, j, conflicts)
+            if weight == float('inf'):
+                return float('inf')
+            if weight > 0:
+                edges[(i, j)] = weight
+        return self.min_vertex_cover(edges)
+
+    # 计算智能体对的边权（CG/DG为0或1，WDG为代价增量）
+    def get_pair_weight(self, ctNode, i, j, conflicts):
+        if self.mode == self.CG:
+            for conflict in sorted(conflicts):
+                if self.cbs.classify_conflict(ctNode, conflict) == self.cbs.CARDINAL:
+                    return 1
+            return 0
+
+        constraints_i = ctNode.get_agent_constraints(self.cbs.agents[i])
+        constraints_j = ctNode.get_agent_constraints(self.cbs.agents[j])
+        key = (i, j, frozenset(c.get_key() for c in constraints_i), frozenset(c.get_key() for c in constraints_j))
+        if key in self.pair_cache:
+            self.cache_hits += 1
+            return self.pair_cache[key]
+
+        # 两智能体是否相互依赖（存在基数冲突或MDD无联合路径）
+        dependent = any(self.cbs.classify_conflict(ctNode, c) == self.cbs.CARDINAL for c in conflicts) \
+            or not self.cbs.get_mdd(ctNode, i).has_joint_path(self.cbs.get_mdd(ctNode, j))
+        if not dependent:
+            weight = 0
+        elif self.mode == self.DG:
+            weight = 1
+        else:
+            paths = ctNode.solution.paths
+            pair_cost = self.cbs.solve_pair(i, j, constraints_i, constraints_j, self.PAIR_NODE_LIMIT)
+            weight = max(1, pair_cost - paths[i].get_cost() - paths[j].get_cost())
+        self.pair_cache[key] = weight
+        return weight
+
+    # 加权最小顶点覆盖：为每个顶点分配x_v>=0，使每条边满足x_i + x_j >= w_ij，最小化sum(x_v)
+    def min_vertex_cover(self, edges):
+        # 按连通分量分别求解
+        neighbors = {}
+        for (i, j) in edges:
+            neighbors.setdefault(i, set()).add(j)
+            neighbors.setdefault(j, set()).add(i)
+        visited = set()
+        total = 0
+        for vertex in sorted(neighbors):
+            if vertex in visited:
+                continue
+            component = []
+            stack = [vertex]
+            visited.add(vertex)
+            while stack:
+                v = stack.pop()
+                component.append(v)
+                for u in neighbors[v]:
+                    if u not in visited:
+                        visited.add(u)
+                        stack.append(u)
+            members = set(component)
+            component_edges = {e: w for e, w in edges.items() if e[0] in members}
+            if len(component) <= self.EXACT_LIMIT:
+                total += self.__exact_cover(sorted(component), component_edges)
+            else:
+                total += self.__matching_bound(component_edges)
+        return total
+
+    # 精确求解（分支定界）
+    def __exact_cover(self, vertices, edges):
+        max_weight = {v: 0 for v in vertices}
+        for (i, j), w in edges.items():
+            max_weight[i] = max(max_weight[i], w)
+            max_weight[j] = max(max_weight[j], w)
+        best = [sum(max_weight.values())]
+        values = {}
+
+        def assign(k, total):
+            if total >= best[0]:
+                return
+            if k == len(vertices):
+                best[0] = total
+                return
+            v = vertices[k]
+            # 满足与已赋值顶点之间的边所需的最小值
+            need = 0
+            for (i, j), w in edges.items():
+                if i == v and j in values:
+                    need = max(need, w - values[j])
+                elif j == v and i in values:
+                    need = max(need, w - values[i])
+            for value in range(need, max_weight[v] + 1):
+                values[v] = value
+                assign(k + 1, total + value)
+                del values[v]
+
+        assign(0, 0)
+        return best[0]
+
+    # 下界：贪心匹配的边权之和（匹配边两两不相邻，每条边至少贡献其权值）
+    def __matching_bound(self, edges):
+        matched = set()
+        total = 0
+        for (i, j), w in sorted(edges.items(), key=lambda item: -item[1]):
+            if i not in matched and j not in matched:
+                matched.add(i)
+                matched.add(j)
+                total += w
+        return total
@@ -0,0 +1,109 @@
+"""独立性检测（Independence Detection），将智能体划分为可独立求解的组"""
+from a_star import A_Star
+from entity import *
+from ct_node import CTNode
+from conflict_index import ConflictIndex
+from cbs import CBS, cbs_main
+
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+
+"""求解一个智能体组（在工作进程中执行，只返回路径点、求解状态与代价下界以减少进程间传输）"""
+def solve_group(agents, size, obstacles, options):
+    with contextlib.redirect_stdout(io.StringIO()): # 屏蔽进度输出，避免多个进程输出交错
+        node = cbs_main(agents, size, obstacles, **options)
+    if node is None:
+        return None
+    return [path.locations for path in node.solution.paths], node.status, node.lower_bound
+
+"""独立性检测主函数
+先为每个智能体单独规划，再反复合并路径冲突的组并对合并后的组运行CBS，直到各组之间无冲突；
+各组在进程池中并行求解，返回的CT节点按原智能体顺序组装解决方案（与cbs_main返回值兼容）；
+时间/节点预算（options中的time_limit、node_limit）分别作用于每次组求解，整体状态取各组中最差的状态，下界为各组下界之和"""
+def id_main(agents, size, obstacles, workers=None, **options):
+    if(not CBS(agents, size, obstacles).check_problem()): # 检查问题合理性
+        return None
+
+    # 每个智能体单独规划
+    a_star = A_Star(size, obstacles)
+    locations = [] # 每个智能体的路径点
+    for agent in agents:
+        path = a_star.search(agent, [])
+        if path is None:
+            print(str(agent.id)+"无解决方案")
+            return None
+        locations.append(path.locations)
+    group_of = list(range(len(agents))) # 智能体序号 -> 所在组（以组内最小序号标识）
+    group_results = {} # 组 -> (求解状态, 代价下界)（单独规划的智能体为最优，下界即路径代价）
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        while True:
+            # 检测组间冲突
+            paths = []
+            for i in range(len(agents)):
+                path = Path(agents[i])
+                path.locations = locations[i]
+                paths.append(path)
+            conflict_index = ConflictIndex.build(paths)
+            merges = {(group_of[c[1]], group_of[c[2]]) for c in conflict_index.conflicts if group_of[c[1]] != group_of[c[2]]}
+            if not merges:
+                break
+
+            # 合并冲突的组（并查集）
+            parent = {}
+            def find(g):
+                while parent.get(g, g) != g:
+                    g = parent[g]
+                return g
+            for g1, g2 in sorted(merges):
+                r1, r2 = find(g1), find(g2)
+                if r1 != r2:
+                    parent[max(r1, r2)] = min(r1, r2)
+            changed = {find(g) for pair in merges for g in pair} # 合并后需要重新求解的组
+            for i in range(len(agents)):
+                group_of[i] = find(group_of[i])
+
+            # 并行求解合并后的组
+            groups = {g: [i for i in range(len(agents)) if group_of[i] == g] for g in sorted(changed)}
+            print("合并为 "+str(len(groups))+" 个组: "+", ".join(str([agents[i].id for i in members]) for members in groups.values()))
+            if executor is None:
+                results = [solve_group([agents[i] for i in members], size, obstacles, options) for members in groups.values()]
+            else:
+                futures = [executor.submit(solve_group, [agents[i] for i in members], size, obstacles, options) for members in groups.values()]
+                results = [future.result() for future in futures]
+            for g, members, result in zip(groups, groups.values(), results):
+                if result is None:
+                    print("组"+str([agents[i].id for i in members])+"无解决方案")
+                    return None
+                group_locations, status, lower_bound = result
+                for i, agent_locations in zip(members, group_locations):
+                    locations[i] = agent_locations
+                group_results[g] = (status, lower_bound)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # 按原智能体顺序组装解决方案
+    solution = Solution()
+    for i in range(len(agents)):
+        path = Path(agents[i])
+        path.locations = locations[i]
+        solution.add_path(path)
+    node = CTNode([], None)
+    node.set_solution(solution)
+    statuses = [CBS.OPTIMAL, CBS.BOUNDED, CBS.FALLBACK] # 由好到差
+    node.status = CBS.OPTIMAL
+    node.lower_bound = 0
+    for g in set(group_of):
+        if g in group_results:
+            status, lower_bound = group_results[g]
+        else: # 单独规划的智能体
+            status, lower_bound = CBS.OPTIMAL, len(locations[g]) - 1
+        node.status = max(node.status, status, key=statuses.index)
+        node.lower_bound += lower_bound
+    node.suboptimality = node.cost / node.lower_bound if node.lower_bound > 0 else 1.0
+    group_count = len(set(group_of))
+    print("独立性检测完成，共 "+str(group_count)+" 个独立组，最大组含 "+str(max(group_of.count(g) for g in set(group_of)))+" 个智能体")
+    return node
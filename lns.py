@@ -0,0 +1,205 @@
+"""大邻域搜索（MAPF-LNS），在已有无冲突解的基础上持续改进总代价"""
+from entity import *
+from conflict_index import ConflictIndex
+from prioritized import prioritized_main, plan_with_reservations, get_reservation_constraints, ReservationTable
+from cbs import CBS, PLANNERS, cbs_search
+from pbs import pbs_main, create_result_node
+
+import contextlib
+import io
+import random
+import time
+
+"""LNS类
+每次迭代选择一个智能体邻域（随机/基于智能体/基于地图，自适应时按历史改进量加权选择），
+固定其余智能体的路径，只重新规划邻域内的智能体（优先级规划或CBS），总代价下降时接受新路径"""
+class LNS:
+    RANDOM = "random" # 随机邻域
+    AGENT = "agent" # 基于智能体：延迟最大的智能体及与其路径相交的智能体
+    MAP = "map" # 基于地图：某个路口附近经过的智能体
+    ADAPTIVE = "adaptive" # 按各邻域的历史改进量自适应选择
+    NEIGHBORHOODS = (RANDOM, AGENT, MAP)
+    PP = "pp" # 用优先级规划重新规划邻域
+    CBS = "cbs" # 用CBS重新规划邻域
+    REACTION = 0.1 # 自适应权重的更新系数
+    CBS_NODE_LIMIT = 100 # 重新规划邻域时CBS的扩展节点数上限
+    DEFAULT_ITERATIONS = 100 # 未指定时间预算与迭代次数上限时的迭代次数
+
+    def __init__(self, agents, size, obstacles, planner="astar", neighborhood=ADAPTIVE, neighborhood_size=8, replan=PP, seed=0):
+        if neighborhood not in self.NEIGHBORHOODS + (self.ADAPTIVE,):
+            raise ValueError("未知的LNS邻域: " + str(neighborhood))
+        if replan not in (self.PP, self.CBS):
+            raise ValueError("未知的LNS重新规划方法: " + str(replan))
+        if planner not in PLANNERS:
+            raise ValueError("未知的底层规划器: " + str(planner))
+        self.agents = agents # 智能体列表
+        self.size = size # 地图大小
+        self.obstacles = obstacles # 障碍物
+        self.planner = planner # 底层规划器名称
+        self.a_star = PLANNERS[planner](size, obstacles) # 底层规划器
+        self.neighborhood = neighborhood # 邻域选择方式
+        self.neighborhood_size = min(neighborhood_size, len(agents)) # 邻域智能体数
+        self.replan = replan # 重新规划方法
+        self.rng = random.Random(seed) # 随机数生成器（结果可复现）
+        self.weights = {name: 1.0 for name in self.NEIGHBORHOODS} # 自适应选择的邻域权重
+        self.distances = [self.a_star.get_heuristic_table(agent.goal)[agent.start[0]][agent.start[1]] for agent in agents] # 单独规划的代价
+        self.intersections = [(x, y) for x in range(size[0]) for y in range(size[1])
+                              if self.a_star.map[x][y] == 0 and len(self.get_free_neighbors((x, y))) >= 3] # 路口
+        self.iterations = 0 # 迭代次数
+        self.accepted = 0 # 接受的改进次数
+        self.trace = [] # 代价随时间的变化[(耗时秒数, 总代价), ...]
+
+    # 获取相邻的空位
+    def get_free_neighbors(self, location):
+        x, y = location
+        return [(nx, ny) for nx, ny in ((x-1, y), (x+1, y), (x, y-1), (x, y+1))
+                if 0 <= nx < self.size[0] and 0 <= ny < self.size[1] and self.a_star.map[nx][ny] == 0]
+
+    # 位置 -> 经过该位置的智能体序号集合
+    @staticmethod
+    def get_cell_agents(paths):
+        cell_agents = {}
+        for i, path in enumerate(paths):
+            for location in path.locations:
+                cell_agents.setdefault(location, set()).add(i)
+        return cell_agents
+
+    # 随机邻域
+    def get_random_neighborhood(self, paths):
+        return self.rng.sample(range(len(self.agents)), self.neighborhood_size)
+
+    # 基于智能体的邻域：延迟（代价减去单独规划的代价）最大的智能体，再逐层加入与已选智能体路径相交的智能体
+    def get_agent_neighborhood(self, paths):
+        delays = [paths[i].get_cost() - self.distances[i] for i in range(len(paths))]
+        max_delay = max(delays)
+        if max_delay == 0:
+            return self.get_random_neighborhood(paths)
+        cell_agents = self.get_cell_agents(paths)
+        neighborhood = [self.rng.choice([i for i in range(len(paths)) if delays[i] == max_delay])]
+        k = 0
+        while k < len(neighborhood) and len(neighborhood) < self.neighborhood_size:
+            crossing = sorted({j for location in paths[neighborhood[k]].locations for j in cell_agents[location]} - set(neighborhood))
+            self.rng.shuffle(crossing)
+            neighborhood.extend(crossing[:self.neighborhood_size - len(neighborhood)])
+            k += 1
+        return neighborhood
+
+    # 基于地图的邻域：从随机路口向外逐格扩展，加入经过这些位置的智能体
+    def get_map_neighborhood(self, paths):
+        if not self.intersections:
+            return self.get_random_neighborhood(paths)
+        cell_agents = self.get_cell_agents(paths)
+        start = self.rng.choice(self.intersections)
+        neighborhood = []
+        visited = {start}
+        queue = [start]
+        while queue and len(neighborhood) < self.neighborhood_size:
+            location = queue.pop(0)
+            crossing = sorted(cell_agents.get(location, set()) - set(neighborhood))
+            self.rng.shuffle(crossing)
+            neighborhood.extend(crossing[:self.neighborhood_size - len(neighborhood)])
+            for neighbor in self.get_free_neighbors(location):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    queue.append(neighbor)
+        return neighborhood
+
+    # 选择邻域，返回(邻域名称, 智能体序号列表)
+    def choose_neighborhood(self, paths):
+        name = self.neighborhood
+        if name == self.ADAPTIVE:
+            name = self.rng.choices(self.NEIGHBORHOODS, [self.weights[n] for n in self.NEIGHBORHOODS])[0]
+        if name == self.AGENT:
+            return name, self.get_agent_neighborhood(paths)
+        if name == self.MAP:
+            return name, self.get_map_neighborhood(paths)
+        return name, self.get_random_neighborhood(paths)
+
+    # 重新规划邻域内的智能体（其余路径固定），返回邻域智能体的新路径列表，失败时返回None
+    def replan_neighborhood(self, paths, neighborhood):
+        members = set(neighborhood)
+        fixed = [paths[i].locations for i in range(len(paths)) if i not in members]
+        if self.replan == self.PP:
+            order = list(neighborhood)
+            self.rng.shuffle(order)
+            table = ReservationTable(fixed) # 固定路径只加入一次，新规划的路径依次加入
+            new_paths = {}
+            for i in order:
+                path = plan_with_reservations(self.a_star, self.agents[i], table)
+                if path is None:
+                    return None
+                new_paths[i] = path
+                table.add_path(path.locations)
+            return [new_paths[i] for i in neighborhood]
+
+        # CBS：固定路径以预留约束施加在根节点上
+        horizon = max((len(locations) for locations in fixed), default=0) + self.size[0] + self.size[1]
+        agents = [self.agents[i] for i in neighborhood]
+        constraints = []
+        for agent in agents:
+            for locations in fixed:
+                constraints.extend(get_reservation_constraints(agent.id, locations, horizon))
+        cbs = CBS(agents, self.size, self.obstacles, path_cache_size=0, planner=self.planner)
+        cbs.a_star = self.a_star # 共享底层规划器（距离表缓存）
+        with contextlib.redirect_stdout(io.StringIO()): # 屏蔽进度输出
+            node = cbs_search(cbs, node_limit=self.CBS_NODE_LIMIT, root_constraints=constraints)
+        if node is None:
+            return None
+        return node.solution.paths
+
+    # 从初始解开始改进，time_limit为时间预算（秒），max_iterations为迭代次数上限（均为None时迭代DEFAULT_ITERATIONS次），返回改进后的路径列表
+    def improve(self, paths, time_limit=None, max_iterations=None):
+        if time_limit is None and max_iterations is None:
+            max_iterations = self.DEFAULT_ITERATIONS
+        paths = list(paths)
+        cost = sum(path.get_cost() for path in paths)
+        begin_time = time.perf_counter()
+        self.trace.append((0.0, cost))
+        print("LNS初始代价为 "+str(cost))
+        while True:
+            if time_limit is not None and time.perf_counter() - begin_time >= time_limit:
+                break
+            if max_iterations is not None and self.iterations >= max_iterations:
+                break
+            self.iterations += 1
+            name, neighborhood = self.choose_neighborhood(paths)
+            old_cost = sum(paths[i].get_cost() for i in neighborhood)
+            new_paths = self.replan_neighborhood(paths, neighborhood)
+            improvement = 0
+            if new_paths is not None:
+                new_cost = sum(path.get_cost() for path in new_paths)
+                if new_cost < old_cost:
+                    candidate = list(paths)
+                    for i, path in zip(neighborhood, new_paths):
+                        candidate[i] = path
+                    if not ConflictIndex.build(candidate).conflicts: # 超出停留约束时间上限后经过固定智能体的终点
+                        paths = candidate
+                        improvement = old_cost - new_cost
+                        cost -= improvement
+                        self.accepted += 1
+                        elapsed = time.perf_counter() - begin_time
+                        self.trace.append((elapsed, cost))
+                        print("LNS第 "+str(self.iterations)+" 次迭代（"+name+"邻域）代价降为 "+str(cost)+"，耗时 "+format(elapsed, ".2f")+" 秒")
+            self.weights[name] = self.REACTION * improvement + (1 - self.REACTION) * self.weights[name]
+            self.weights[name] = max(self.weights[name], 0.01) # 保留被选中的可能
+        self.trace.append((time.perf_counter() - begin_time, cost))
+        print("LNS共迭代 "+str(self.iterations)+" 次，接受改进 "+str(self.accepted)+" 次，最终代价为 "+str(cost))
+        return paths
+
+"""LNS主函数：solution为初始解（None时先用优先级规划，失败时用PBS求得），在time_limit秒内持续改进，
+返回与cbs_main兼容的解节点，stats中的trace为代价随时间的变化"""
+def lns_main(agents, size, obstacles, solution=None, planner="astar", neighborhood=LNS.ADAPTIVE, neighborhood_size=8,
+             replan=LNS.PP, seed=0, time_limit=None, max_iterations=None):
+    if(not CBS(agents, size, obstacles).check_problem()): # 检查问题合理性
+        return None
+    lns = LNS(agents, size, obstacles, planner, neighborhood, neighborhood_size, replan, seed)
+    if solution is None:
+        solution = prioritized_main(lns.a_star, agents)
+    if solution is None:
+        node = pbs_main(agents, size, obstacles, planner)
+        if node is None:
+            print("未找到LNS的初始解")
+            return None
+        solution = node.solution
+    paths = lns.improve(solution.paths, time_limit, max_iterations)
+    return create_result_node(lns.a_star, agents, paths, {"iterations": lns.iterations, "accepted": lns.accepted, "trace": lns.trace})
@@ -1,4 +1,9 @@
 from cbs import *
+from independence import id_main
+from pbs import pp_main, pbs_main
+from lns import LNS, lns_main
+from map_loader import CompiledMap, compile_obstacles, load_movingai
+from schedule_io import ScheduleWriter, load_schedule
 from a_star import *
 from visualize import *
 import yaml
@@ -12,36 +17,87 @@ def main():
 
     # 创建ArgumentParser对象，解析命令行参数
     parser = argparse.ArgumentParser() 
-    parser.add_argument("--input", help = "输入文件（包含地图、智能体、障碍物等信息）", default = input_file)
-    parser.add_argument("--output", help = "输出文件（解决方案，含规划的路径和总代价）", default = output_file)
+    parser.add_argument("--input", help = "输入文件（包含地图、智能体、障碍物等信息的YAML文件，或MovingAI场景文件.scen）", default = input_file)
+    parser.add_argument("--map", default = None, help = "MovingAI地图文件.map（缺省在场景文件所在目录查找场景中记录的地图）")
+    parser.add_argument("--agents", type = int, default = None, help = "从MovingAI场景中取的智能体数（缺省为全部）")
+    parser.add_argument("--buckets", type = int, nargs = "+", default = None, help = "只取MovingAI场景中这些桶的智能体（缺省为全部）")
+    parser.add_argument("--output", help = "输出文件（解决方案，含规划的路径和总代价；以.npz结尾时输出二进制列式格式，否则为YAML）", default = output_file)
+    parser.add_argument("--solver", choices = ["cbs", "pp", "pbs", "lns"], default = "cbs", help = "求解器（最优CBS，或不保证最优、求解更快的优先级规划PP/基于优先级的搜索PBS，或在初始解上持续改进的大邻域搜索LNS）")
+    parser.add_argument("--restarts", type = int, default = 0, help = "优先级规划的随机重启次数（随机打乱优先级顺序，保留代价最小的解）")
+    parser.add_argument("--lns-neighborhood", choices = list(LNS.NEIGHBORHOODS) + [LNS.ADAPTIVE], default = LNS.ADAPTIVE, help = "LNS的邻域选择方式")
+    parser.add_argument("--lns-size", type = int, default = 8, help = "LNS每次重新规划的智能体数")
+    parser.add_argument("--lns-replan", choices = [LNS.PP, LNS.CBS], default = LNS.PP, help = "LNS重新规划邻域的方法（优先级规划或CBS）")
+    parser.add_argument("--mdd", action = "store_true", help = "使用MDD对冲突分类，优先分裂基数冲突")
+    parser.add_argument("--w", type = float, default = None, help = "ECBS次优因子（如1.2，解的代价不超过最优代价的w倍；缺省为最优CBS）")
+    parser.add_argument("--id", action = "store_true", help = "先进行独立性检测，将智能体划分为可独立求解的组再分别执行CBS")
+    parser.add_argument("--workers", type = int, default = None, help = "并行进程数：配合--id时为并行求解各组的进程数（缺省为CPU核数），否则为CBS底层规划的进程数（缺省不并行）")
+    parser.add_argument("--expand-k", type = int, default = 1, help = "并行CBS每次投机扩展的CT节点数（需配合--workers）")
+    parser.add_argument("--heuristic", choices = ["CG", "DG", "WDG"], default = None, help = "CT节点的高层启发式（冲突图/依赖图/加权依赖图）")
+    parser.add_argument("--path-cache", type = int, default = CBS.PATH_CACHE_SIZE, help = "底层路径缓存（LRU）的最大项数，0为不缓存")
+    parser.add_argument("--reuse-paths", action = "store_true", help = "路径缓存未命中时，复用新增约束不影响的已缓存路径")
+    parser.add_argument("--planner", choices = ["astar", "sipp"], default = "astar", help = "底层规划器（时间扩展A*或安全区间路径规划SIPP；两者代价相同，但在等代价路径中选择的路径不同，CBS扩展的CT节点数可能相差较大。约束时刻远大于路径长度（如终点在到达后仍被占用）时SIPP更快，见benchmark.py --planners）")
+    parser.add_argument("--bypass", action = "store_true", help = "冲突绕行：子节点代价不变且冲突更少时父节点直接采用其路径，不再分裂")
+    parser.add_argument("--disjoint", action = "store_true", help = "不相交分裂：一个子节点加正约束（必须经过冲突位置），另一个加相同的负约束")
+    parser.add_argument("--symmetry", action = "store_true", help = "对称推理：矩形冲突与走廊冲突分别用屏障约束与时间段约束一次分裂解决")
+    parser.add_argument("--time-limit", type = float, default = None, help = "求解时间预算（秒），耗尽时返回已知最好的无冲突解（缺省不限）")
+    parser.add_argument("--node-limit", type = int, default = None, help = "扩展CT节点数预算，耗尽时返回已知最好的无冲突解（缺省不限）")
+    parser.add_argument("--merge-threshold", type = int, default = None, help = "MA-CBS合并阈值：两智能体之间的冲突数超过该值时合并为元智能体联合规划（缺省不合并）")
+    parser.add_argument("--max-meta-agent-size", type = int, default = CBS.MAX_META_AGENT_SIZE, help = "MA-CBS元智能体的最大成员数，合并后超过时按普通方式分裂")
     # 解析命令行参数
     args = parser.parse_args() 
 
     # 命令行读取输入文件
-    with open(args.input, 'r') as param_file: # 打开输入文件(只读)
-        try:
-            param = yaml.load(param_file, Loader=yaml.FullLoader) # 解析yaml文件
-        except yaml.YAMLError as exc:
-            print(exc)
+    if args.input.endswith(".scen"): # MovingAI场景（地图编译后缓存）
+        param = load_movingai(args.input, args.map, args.agents, args.buckets)
+    else:
+        with open(args.input, 'r') as param_file: # 打开输入文件(只读)
+            try:
+                param = yaml.load(param_file, Loader=yaml.FullLoader) # 解析yaml文件
+            except yaml.YAMLError as exc:
+                print(exc)
 
     # 提取参数
     dimension = param["map"]["dimensions"]
     obstacles = param["map"]["obstacles"]
+    if not isinstance(obstacles, CompiledMap): # YAML的障碍物列表只编译一次，之后各求解器以栅格哈希标识地图
+        obstacles = compile_obstacles(dimension, obstacles)
     agents_param = param['agents']
     agents = []
     for agent_param in agents_param:
         agents.append(Agent(agent_param['name'], agent_param['start'], agent_param['goal']))
 
     # 执行搜索
-    solution_node = cbs_main(agents,dimension,obstacles)
+    if args.solver == "pp":
+        solution_node = pp_main(agents,dimension,obstacles,args.planner,args.restarts,time_limit=args.time_limit)
+    elif args.solver == "lns": # 时间预算为LNS改进的时间（未指定时迭代固定次数）
+        solution_node = lns_main(agents,dimension,obstacles,planner=args.planner,neighborhood=args.lns_neighborhood,
+                                 neighborhood_size=args.lns_size,replan=args.lns_replan,time_limit=args.time_limit)
+    elif args.solver == "pbs":
+        solution_node = pbs_main(agents,dimension,obstacles,args.planner,args.time_limit,args.node_limit)
+    elif args.id:
+        solution_node = id_main(agents,dimension,obstacles,args.workers,use_mdd=args.mdd,heuristic=args.heuristic,w=args.w,
+                                path_cache_size=args.path_cache,reuse_paths=args.reuse_paths,planner=args.planner,
+                                merge_threshold=args.merge_threshold,bypass=args.bypass,disjoint=args.disjoint,
+                                symmetry=args.symmetry,time_limit=args.time_limit,node_limit=args.node_limit,
+                                max_meta_agent_size=args.max_meta_agent_size)
+    else:
+        solution_node = cbs_main(agents,dimension,obstacles,args.mdd,args.heuristic,args.w,args.workers,args.expand_k,
+                                 args.path_cache,args.reuse_paths,args.planner,args.merge_threshold,args.bypass,args.disjoint,
+                                 args.symmetry,args.time_limit,args.node_limit,args.max_meta_agent_size)
 
     if solution_node: # 有解
+        print("求解状态: "+str(solution_node.status)+"，代价为 "+str(solution_node.cost)+"，最优代价下界为 "+str(solution_node.lower_bound))
         # 写入输出文件
-        output = dict()
-        output["schedule"] = generate_plan(solution_node.solution)
-        output["cost"] = solution_node.cost
-        with open(args.output, 'w') as output_yaml:
-            yaml.safe_dump(output, output_yaml)
+        if args.output.endswith(".npz"): # 二进制列式格式（逐个智能体流式写入，不构建字典形式的路径计划，可视化直接内存映射读取）
+            write_binary_plan(solution_node, args.output)
+            output = load_schedule(args.output)
+        else:
+            output = dict()
+            output["schedule"] = generate_plan(solution_node.solution)
+            output["cost"] = solution_node.cost
+            output["status"] = solution_node.status # 最优/有界次优/回退解
+            with open(args.output, 'w') as output_yaml:
+                yaml.safe_dump(output, output_yaml)
         # 可视化
         animation = Animation(param, output)
         animation.show()
@@ -58,5 +114,12 @@ def generate_plan(solution):
             plan[path.agent.id] = path_dict_list
         return plan
 
+"""以二进制列式格式（.npz）写入路径计划"""
+def write_binary_plan(solution_node, file_name):
+        writer = ScheduleWriter(file_name)
+        for path in solution_node.solution.paths:
+            writer.add_path(path.agent.id, path.locations)
+        writer.close(solution_node.cost, solution_node.status)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
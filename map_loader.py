@@ -0,0 +1,131 @@
+"""MovingAI基准格式（.map地图 / .scen场景）的读取
+地图只解析一次并编译为二进制栅格（NumPy .npy，按文件内容的哈希缓存在磁盘上，之后以内存映射方式加载）；
+场景文件读入为整数数组，可按桶（bucket）和数量切片得到智能体集合，无需重新解析地图"""
+from entity import Agent
+
+import hashlib
+import numpy as np
+import os
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".map_cache") # 编译后地图的缓存目录
+PASSABLE = ".GS" # 可通行的地形字符（其余如@、O、T、W均视为障碍物）
+
+"""计算文件内容的哈希（缓存键，文件修改后自动重新编译）"""
+def get_file_hash(file_name):
+    digest = hashlib.sha1()
+    with open(file_name, 'rb') as map_file:
+        for block in iter(lambda: map_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+"""解析.map文件，返回栅格数组（形状为(width, height)，grid[x][y]为1表示障碍物，与A_Star的地图坐标一致）"""
+def parse_map(file_name):
+    with open(file_name, 'r') as map_file:
+        lines = map_file.read().splitlines()
+    header = {}
+    row = 0
+    while lines[row].strip() != "map": # 文件头：type / height / width，以"map"行结束
+        fields = lines[row].split()
+        if len(fields) == 2:
+            header[fields[0]] = fields[1]
+        row += 1
+    height, width = int(header["height"]), int(header["width"])
+    rows = [line[:width] for line in lines[row + 1:row + 1 + height]]
+    if len(rows) != height or any(len(line) != width for line in rows):
+        raise ValueError("地图文件尺寸与文件头不符: " + str(file_name))
+    terrain = np.array([list(line) for line in rows]) # 形状为(height, width)
+    return (~np.isin(terrain, list(PASSABLE))).T.astype(np.uint8)
+
+"""编译后的地图：栅格数组（形状为(width, height)，grid[x][y]为1表示障碍物）与其内容哈希
+可代替障碍物列表传给各求解器（HeuristicCache以哈希为地图标识，A*直接由栅格建图，不再转换为障碍物列表）；
+支持 位置 in 地图（是否为障碍物），迭代时得到障碍物坐标（供可视化等需要障碍物列表的场合）"""
+class CompiledMap:
+    def __init__(self, grid, key):
+        self.grid = grid # 栅格数组（MovingAI地图为对缓存文件的内存映射，只读）
+        self.key = key # 内容哈希（地图标识）
+
+    # 是否为障碍物（地图外的位置不算）
+    def __contains__(self, location):
+        x, y = location[0], location[1]
+        return 0 <= x < self.grid.shape[0] and 0 <= y < self.grid.shape[1] and self.grid[x, y] == 1
+
+    # 迭代障碍物坐标
+    def __iter__(self):
+        return (tuple(location) for location in np.argwhere(self.grid == 1).tolist())
+
+    # 障碍物数
+    def __len__(self):
+        return int(np.count_nonzero(self.grid))
+
+"""加载地图：首次加载时编译并写入缓存，之后以内存映射方式读取（只读），返回CompiledMap（哈希为.map文件内容的哈希）"""
+def load_map(file_name, cache_dir=CACHE_DIR):
+    file_hash = get_file_hash(file_name)
+    cache_file = os.path.join(cache_dir, file_hash + ".npy")
+    if not os.path.exists(cache_file):
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_file = cache_file + "." + str(os.getpid()) + ".tmp.npy" # 先写临时文件再重命名，并行加载时不会读到不完整的文件
+        np.save(temp_file, parse_map(file_name))
+        os.replace(temp_file, cache_file)
+    return CompiledMap(np.load(cache_file, mmap_mode='r'), file_hash)
+
+"""由YAML输入的地图尺寸与障碍物列表编译地图（哈希为栅格内容的哈希）"""
+def compile_obstacles(size, obstacles):
+    grid = np.zeros((size[0], size[1]), dtype=np.uint8)
+    coordinates = np.array([tuple(obstacle) for obstacle in obstacles], dtype=np.int64).reshape(-1, 2)
+    grid[coordinates[:, 0], coordinates[:, 1]] = 1
+    return CompiledMap(grid, hashlib.sha1(str(grid.shape).encode() + grid.tobytes()).hexdigest())
+
+"""场景类（.scen文件，每行为 桶 地图 宽 高 起点x 起点y 终点x 终点y 最优路径长度）"""
+class Scenario:
+    BUCKET, START_X, START_Y, GOAL_X, GOAL_Y = range(5) # entries的列
+
+    def __init__(self, file_name, map_file=None):
+        self.file_name = file_name # 场景文件
+        entries = []
+        map_name = None
+        with open(file_name, 'r') as scen_file:
+            for line in scen_file:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 9: # 版本行或空行
+                    continue
+                map_name = map_name or fields[1]
+                entries.append((int(fields[0]), int(fields[4]), int(fields[5]), int(fields[6]), int(fields[7])))
+        self.entries = np.array(entries, dtype=np.int32).reshape(-1, 5) # 每行为(桶, 起点x, 起点y, 终点x, 终点y)
+        self.map_file = map_file or self.__find_map_file(map_name) # 场景对应的地图文件
+
+    # 在场景文件所在目录查找地图文件（场景中记录的地图名可能带有子目录）
+    def __find_map_file(self, map_name):
+        if map_name is None:
+            return None
+        directory = os.path.dirname(os.path.abspath(self.file_name))
+        for candidate in (os.path.join(directory, map_name), os.path.join(directory, os.path.basename(map_name))):
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    # 获取全部桶编号
+    def get_buckets(self):
+        return [int(bucket) for bucket in np.unique(self.entries[:, self.BUCKET])]
+
+    # 切片得到场景行：buckets为要保留的桶编号（None为全部），之后跳过offset行并取count行（None为全部）
+    def slice(self, count=None, buckets=None, offset=0):
+        entries = self.entries
+        if buckets is not None:
+            entries = entries[np.isin(entries[:, self.BUCKET], list(buckets))]
+        return entries[offset:] if count is None else entries[offset:offset + count]
+
+    # 获取智能体集合（参数同slice）
+    def get_agents(self, count=None, buckets=None, offset=0):
+        return [Agent("agent" + str(i), [int(entry[self.START_X]), int(entry[self.START_Y])], [int(entry[self.GOAL_X]), int(entry[self.GOAL_Y])])
+                for i, entry in enumerate(self.slice(count, buckets, offset))]
+
+"""读取MovingAI实例，返回与YAML输入文件相同结构的参数字典（map.dimensions、map.obstacles、agents），可直接用于求解与可视化
+map.obstacles为编译后的地图（CompiledMap，带栅格与哈希），不展开为障碍物列表"""
+def load_movingai(scen_file, map_file=None, count=None, buckets=None, offset=0, cache_dir=CACHE_DIR):
+    scenario = Scenario(scen_file, map_file)
+    if scenario.map_file is None:
+        raise ValueError("找不到场景对应的地图文件: " + str(scen_file))
+    compiled_map = load_map(scenario.map_file, cache_dir)
+    dimension = [int(compiled_map.grid.shape[0]), int(compiled_map.grid.shape[1])]
+    agents = [{"name": agent.id, "start": agent.start, "goal": agent.goal} for agent in scenario.get_agents(count, buckets, offset)]
+    return {"map": {"dimensions": dimension, "obstacles": compiled_map}, "agents": agents}
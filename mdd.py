@@ -0,0 +1,84 @@
+"""多值决策图（Multi-valued Decision Diagram），用于CBS的冲突分类"""
+from entity import *
+
+"""MDD类
+记录智能体在给定约束下所有代价为cost的最优路径在每个时刻可能所在的位置，
+levels[t]为t时刻的位置集合；某时刻只有一个位置，说明所有最优路径在该时刻都必须经过此处"""
+class MDD:
+    def __init__(self, a_star, agent, constraints, cost):
+        self.agent = agent # 所属智能体
+        self.cost = cost # 最优路径代价
+        self.levels = [] # 每个时刻的位置集合
+        self.children = [] # 每个时刻的位置 -> 下一时刻可到达的位置列表
+        self.__build(a_star, ConstraintTable(constraints))
+
+    # 构建MDD：正向展开所有可在cost步内到达终点的状态，再从终点反向剪枝
+    def __build(self, a_star, constraint_table):
+        h_table = a_star.get_heuristic_table(self.agent.goal)
+        goal = (self.agent.goal[0], self.agent.goal[1])
+
+        # 正向展开
+        forward = [{(self.agent.start[0], self.agent.start[1])}]
+        for t in range(1, self.cost + 1):
+            level = set()
+            for x, y in forward[t-1]:
+                for nx, ny in ((x, y), (x-1, y), (x+1, y), (x, y-1), (x, y+1)):
+                    if nx < 0 or nx >= a_star.size[0] or ny < 0 or ny >= a_star.size[1] or a_star.map[nx][ny] == 1:
+                        continue
+                    if h_table[nx][ny] > self.cost - t: # 剩余步数不足以到达终点
+                        continue
+                    if constraint_table.is_constrained((x, y), (nx, ny), t):
+                        continue
+                    level.add((nx, ny))
+            forward.append(level)
+
+        # 反向剪枝
+        levels = [set() for t in range(self.cost + 1)]
+        children = [{} for t in range(self.cost)]
+        if goal in forward[self.cost]:
+            levels[self.cost].add(goal)
+        for t in range(self.cost - 1, -1, -1):
+            for x, y in forward[t]:
+                next_locations = [(nx, ny) for nx, ny in ((x, y), (x-1, y), (x+1, y), (x, y-1), (x, y+1))
+                                  if (nx, ny) in levels[t+1] and not constraint_table.is_constrained((x, y), (nx, ny), t+1)]
+                if next_locations:
+                    levels[t].add((x, y))
+                    children[t][(x, y)] = next_locations
+        self.levels = levels
+        self.children = children
+
+    # 获取t时刻的MDD宽度（到达终点后停留在终点，宽度为1）
+    def get_width(self, t):
+        if t > self.cost:
+            return 1
+        return len(self.levels[t])
+
+    # 检查t时刻是否必须位于location（所有最优路径都经过）
+    def is_singleton(self, location, t):
+        if t > self.cost:
+            return (location[0], location[1]) == (self.agent.goal[0], self.agent.goal[1])
+        return len(self.levels[t]) == 1 and (location[0], location[1]) in self.levels[t]
+
+    # 获取t时刻位于location时下一时刻可到达的位置（到达终点后停留在终点）
+    def get_children(self, location, t):
+        if t >= self.cost:
+            return [location]
+        return self.children[t].get(location, [])
+
+    # 检查与另一个智能体的MDD是否存在无冲突的联合路径（不存在则两者相互依赖）
+    def has_joint_path(self, other):
+        goal_time = max(self.cost, other.cost)
+        frontier = {((self.agent.start[0], self.agent.start[1]), (other.agent.start[0], other.agent.start[1]))}
+        for t in range(goal_time):
+            next_frontier = set()
+            for a, b in frontier:
+                for next_a in self.get_children(a, t):
+                    for next_b in other.get_children(b, t):
+                        # 顶点冲突或交换位置
+                        if next_a == next_b or (next_a == b and next_b == a):
+                            continue
+                        next_frontier.add((next_a, next_b))
+            if not next_frontier:
+                return False
+            frontier = next_frontier
+        return True
@@ -0,0 +1,193 @@
+"""基于优先级的搜索（Priority-Based Search）与优先级规划求解器，以牺牲最优性换取近线性的求解时间"""
+from entity import *
+from ct_node import CTNode
+from conflict_index import ConflictIndex
+from prioritized import prioritized_main, plan_with_reservations, ReservationTable
+from cbs import CBS, PLANNERS
+
+import sys
+import time
+
+"""PBS节点
+priorities为智能体之间的偏序（(高优先级智能体序号, 低优先级智能体序号)的集合），
+每个智能体的路径只避让比其优先级高（传递闭包）的智能体的路径"""
+class PBSNode:
+    __slots__ = ('priorities', 'paths', 'conflict_index', 'cost')
+
+    def __init__(self, priorities, paths, conflict_index):
+        self.priorities = priorities # 优先级偏序（frozenset）
+        self.paths = paths # 路径列表（与智能体顺序一致）
+        self.conflict_index = conflict_index # 路径的冲突索引
+        self.cost = sum(path.get_cost() for path in paths) # 成本
+
+"""PBS类
+深度优先搜索优先级偏序：每次取一个冲突(i, j)，分别规定i高于j和j高于i，重新规划优先级降低的智能体
+以及比它优先级更低且与更高优先级智能体冲突的智能体（按拓扑序），代价小的子节点先扩展；不完备也不保证最优"""
+class PBS:
+    def __init__(self, agents, size, obstacles, planner="astar"):
+        if planner not in PLANNERS:
+            raise ValueError("未知的底层规划器: " + str(planner))
+        self.agents = agents # 智能体列表
+        self.a_star = PLANNERS[planner](size, obstacles) # 底层规划器（A*或SIPP）
+        self.expanded_count = 0 # 扩展的PBS节点数
+        self.generated_count = 0 # 生成的PBS节点数
+
+    # 获取比智能体i优先级高的全部智能体（传递闭包）
+    @staticmethod
+    def get_higher(priorities, i):
+        higher = set()
+        stack = [i]
+        while stack:
+            k = stack.pop()
+            for high, low in priorities:
+                if low == k and high not in higher:
+                    higher.add(high)
+                    stack.append(high)
+        return higher
+
+    # 获取比智能体i优先级低的全部智能体（传递闭包）
+    @staticmethod
+    def get_lower(priorities, i):
+        lower = set()
+        stack = [i]
+        while stack:
+            k = stack.pop()
+            for high, low in priorities:
+                if high == k and low not in lower:
+                    lower.add(low)
+                    stack.append(low)
+        return lower
+
+    # 拓扑排序（优先级高者在前，同层按序号）
+    @staticmethod
+    def topological_sort(agents, priorities):
+        in_degree = {k: 0 for k in agents}
+        for high, low in priorities:
+            if high in in_degree and low in in_degree:
+                in_degree[low] += 1
+        order = []
+        ready = sorted(k for k in agents if in_degree[k] == 0)
+        while ready:
+            k = ready.pop(0)
+            order.append(k)
+            for high, low in sorted(priorities):
+                if high == k and low in in_degree:
+                    in_degree[low] -= 1
+                    if in_degree[low] == 0:
+                        ready.append(low)
+            ready.sort()
+        return order
+
+    # 检查智能体k是否与集合agents中的智能体冲突
+    @staticmethod
+    def has_conflict_with(conflict_index, k, agents):
+        for conflict in conflict_index.conflicts:
+            if (conflict[1] == k and conflict[2] in agents) or (conflict[2] == k and conflict[1] in agents):
+                return True
+        return False
+
+    # 在父节点上加入优先级(high, low)生成子节点，重新规划low及受影响的更低优先级智能体（无解时返回None）
+    def generate_child(self, node, high, low):
+        priorities = node.priorities | {(high, low)}
+        paths = list(node.paths)
+        conflict_index = ConflictIndex.build(paths)
+        for k in self.topological_sort({low} | self.get_lower(priorities, low), priorities):
+            higher = self.get_higher(priorities, k)
+            if k != low and not self.has_conflict_with(conflict_index, k, higher): # 未与更高优先级智能体冲突，无需重新规划
+                continue
+            path = plan_with_reservations(self.a_star, self.agents[k], ReservationTable(paths[h].locations for h in sorted(higher)))
+            if path is None:
+                return None
+            paths[k] = path
+            conflict_index.replace_path(k, path.locations)
+        self.generated_count += 1
+        return PBSNode(priorities, paths, conflict_index)
+
+    # 搜索（time_limit为时间预算（秒），node_limit为扩展节点数预算），返回无冲突的路径列表，失败或预算耗尽时返回None
+    def search(self, time_limit=None, node_limit=None):
+        begin_time = time.perf_counter()
+        paths = []
+        for agent in self.agents: # 根节点：各智能体单独规划
+            path = self.a_star.search_uncached(agent, [])
+            if path is None:
+                print(str(agent.id)+"无解决方案")
+                return None
+            paths.append(path)
+        self.generated_count += 1
+        stack = [PBSNode(frozenset(), paths, ConflictIndex.build(paths))]
+
+        while stack:
+            if (time_limit is not None and time.perf_counter() - begin_time >= time_limit) \
+                    or (node_limit is not None and self.expanded_count >= node_limit):
+                print()
+                print("PBS求解预算耗尽，共扩展了 "+str(self.expanded_count)+" 个节点")
+                return None
+            node = stack.pop()
+            self.expanded_count += 1
+            sys.stdout.write(f"\r————————————进度: 第{self.expanded_count}个节点————————————")
+            sys.stdout.flush()
+
+            conflict = node.conflict_index.get_first_conflict()
+            if conflict is None:
+                print()
+                print("PBS成功找到解决方案，共扩展了 "+str(self.expanded_count)+" 个节点，生成了 "+str(self.generated_count)+" 个节点")
+                return node.paths
+
+            # 两个子节点分别规定冲突双方的优先级（已有相反优先级时会形成环，已有相同优先级时无法消除该冲突，均跳过）
+            i, j = conflict[1], conflict[2]
+            children = []
+            for high, low in ((i, j), (j, i)):
+                if low in self.get_higher(node.priorities, high) or low in self.get_lower(node.priorities, high):
+                    continue
+                child = self.generate_child(node, high, low)
+                if child is not None:
+                    children.append(child)
+            children.sort(key=lambda child: -child.cost) # 代价小的子节点后入栈、先扩展
+            stack.extend(children)
+        print()
+        print("PBS未找到解决方案，共扩展了 "+str(self.expanded_count)+" 个节点")
+        return None
+
+"""生成求解器的解节点（与cbs_main返回值兼容）：下界为各智能体单独规划的代价之和，代价达到下界时为最优，否则为回退解"""
+def create_result_node(a_star, agents, paths, stats):
+    solution = Solution()
+    for path in paths:
+        solution.add_path(path)
+    node = CTNode([], None)
+    node.set_solution(solution)
+    node.lower_bound = sum(a_star.get_heuristic_table(agent.goal)[agent.start[0]][agent.start[1]] for agent in agents)
+    node.status = CBS.OPTIMAL if node.cost == node.lower_bound else CBS.FALLBACK
+    node.suboptimality = node.cost / node.lower_bound if node.lower_bound > 0 else 1.0
+    node.stats = dict(stats, status=node.status)
+    return node
+
+"""优先级规划求解器主函数（restarts为随机重启次数，time_limit为时间预算（秒），到达后返回已得到的最好的解）"""
+def pp_main(agents, size, obstacles, planner="astar", restarts=0, seed=0, time_limit=None):
+    if(not CBS(agents, size, obstacles).check_problem()): # 检查问题合理性
+        return None
+    if planner not in PLANNERS:
+        raise ValueError("未知的底层规划器: " + str(planner))
+    a_star = PLANNERS[planner](size, obstacles)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    solution = prioritized_main(a_star, agents, restarts, seed, deadline)
+    if solution is None:
+        print("优先级规划未找到解决方案")
+        return None
+    node = create_result_node(a_star, agents, solution.paths, {"restarts": restarts})
+    print("优先级规划成功找到解决方案，代价为 "+str(node.cost)+"，最优代价下界为 "+str(node.lower_bound))
+    return node
+
+"""PBS求解器主函数（预算耗尽或搜索失败时退回优先级规划）"""
+def pbs_main(agents, size, obstacles, planner="astar", time_limit=None, node_limit=None):
+    if(not CBS(agents, size, obstacles).check_problem()): # 检查问题合理性
+        return None
+    pbs = PBS(agents, size, obstacles, planner)
+    paths = pbs.search(time_limit, node_limit)
+    if paths is None:
+        solution = prioritized_main(pbs.a_star, agents)
+        if solution is None:
+            print("优先级规划未找到解决方案")
+            return None
+        print("退回优先级规划的解")
+        paths = solution.paths
+    return create_result_node(pbs.a_star, agents, paths, {"expanded": pbs.expanded_count, "generated": pbs.generated_count})
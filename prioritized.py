@@ -0,0 +1,100 @@
+"""优先级规划（Prioritized Planning），按优先级顺序逐个规划智能体，后规划的智能体避让先规划的路径"""
+from entity import *
+from a_star import SearchTimeout
+
+import random
+import time
+
+"""获取避让已规划路径的约束（以约束施加在CBS根节点上，如LNS用CBS重新规划邻域时）
+路径上每个时刻的位置为单时刻的时间段约束（只有位于自身终点时才推迟到达终点的时刻），到达终点后的停留为到horizon为止的时间段约束；
+沿路径反向移动为边约束"""
+def get_reservation_constraints(agent_id, locations, horizon):
+    constraints = []
+    for t in range(1, len(locations)):
+        if t < len(locations) - 1:
+            constraints.append(RangeConstraint(agent_id, locations[t], t, t))
+        constraints.append(EdgeConstraint(agent_id, locations[t], locations[t - 1], t))
+    constraints.append(RangeConstraint(agent_id, locations[-1], len(locations) - 1, max(horizon, len(locations) - 1)))
+    return constraints
+
+"""预留表类（优先级规划中已规划路径占用的时空位置，接口与约束表相同，可直接用于底层搜索）
+每条路径只加入一次：路径上每个时刻的位置为顶点预留（只有位于自身终点时才推迟到达终点的时刻），沿路径反向移动为边预留，
+到达终点后的停留为一项永久占用（从到达时刻起一直占用，不按时刻展开）"""
+class ReservationTable(ConstraintTable):
+    def __init__(self, reserved=()):
+        super().__init__()
+        for locations in reserved:
+            self.add_path(locations)
+
+    # 加入一条已规划的路径
+    def add_path(self, locations):
+        for t in range(1, len(locations)):
+            x, y = locations[t][0], locations[t][1]
+            if t < len(locations) - 1:
+                self.vertex_table.add((t, x, y))
+                self.cell_max_t[(x, y)] = max(self.cell_max_t.get((x, y), 0), t)
+            self.edge_table.add((t, x, y, locations[t - 1][0], locations[t - 1][1]))
+            self.times.add(t)
+        self.add_blocked_from(len(locations) - 1, locations[-1])
+
+"""在已规划路径的预留表（ReservationTable）下规划单个智能体（不使用路径缓存），无解时返回None"""
+def plan_with_reservations(a_star, agent, table):
+    return a_star.search_table(agent, table)
+
+"""按给定顺序逐个规划（所有智能体共用一张预留表，每条路径规划后加入一次），返回解决方案，失败时返回None"""
+def prioritized_plan(a_star, agents, order):
+    paths = [None] * len(agents)
+    table = ReservationTable() # 已规划路径的预留表
+    for i in order:
+        path = plan_with_reservations(a_star, agents[i], table)
+        if path is None:
+            return None
+        paths[i] = path
+        table.add_path(path.locations)
+    solution = Solution()
+    for path in paths:
+        solution.add_path(path)
+    return solution
+
+"""获取依次尝试的优先级顺序：原顺序、离终点远者优先、离终点近者优先"""
+def get_priority_orders(a_star, agents):
+    distances = [a_star.get_heuristic_table(agent.goal)[agent.start[0]][agent.start[1]] for agent in agents]
+    orders = [list(range(len(agents))),
+              sorted(range(len(agents)), key=lambda i: (-distances[i], i)),
+              sorted(range(len(agents)), key=lambda i: (distances[i], i))]
+    unique_orders = []
+    for order in orders:
+        if order not in unique_orders:
+            unique_orders.append(order)
+    return unique_orders
+
+"""优先级规划主函数
+依次尝试固定的优先级顺序直到得到无冲突的解决方案，之后再随机重启restarts次（随机打乱优先级顺序），保留代价最小的解；
+deadline为time.perf_counter()的截止时刻（同时作为底层搜索的截止时刻，到达后中止规划并返回已得到的最好的解），均失败时返回None"""
+def prioritized_main(a_star, agents, restarts=0, seed=0, deadline=None):
+    best = None
+    previous_deadline = a_star.deadline
+    a_star.deadline = deadline
+    try:
+        for order in get_priority_orders(a_star, agents):
+            best = prioritized_plan(a_star, agents, order)
+            if best is not None:
+                break
+        rng = random.Random(seed)
+        order = list(range(len(agents)))
+        for restart in range(restarts):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            rng.shuffle(order)
+            solution = prioritized_plan(a_star, agents, order)
+            if solution is not None and (best is None or get_solution_cost(solution) < get_solution_cost(best)):
+                best = solution
+    except SearchTimeout:
+        print("优先级规划超出时间预算" + ("，返回已得到的最好的解" if best is not None else ""))
+    finally:
+        a_star.deadline = previous_deadline
+    return best
+
+"""计算解决方案的总代价"""
+def get_solution_cost(solution):
+    return sum(path.get_cost() for path in solution.paths)
@@ -0,0 +1,114 @@
+"""二进制路径计划（.npz列式格式）的流式写入与零拷贝读取
+文件中包含：agent_ids（智能体ID，按写入顺序）、offsets（第i个智能体的路径点为x/y[offsets[i]:offsets[i+1]]）、
+x/y（所有路径点依次拼接的int16坐标，第k个路径点的时刻为k - offsets[i]）、cost（总代价）与status（求解状态）；
+各数组不压缩存储，读取时直接内存映射zip中的数据，不复制也不解析"""
+import numpy as np
+import os
+import shutil
+import struct
+import tempfile
+import yaml
+import zipfile
+
+"""流式写入类：每条路径确定后立即写入临时文件（内存中只保留智能体ID与偏移），close时打包为.npz"""
+class ScheduleWriter:
+    COORDINATE_TYPE = np.int16 # 坐标类型（地图边长不超过32767）
+
+    def __init__(self, file_name):
+        self.file_name = file_name # 输出文件
+        self.temp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(file_name))) # 临时目录（与输出文件同目录，便于最后重命名）
+        self.x_file = open(os.path.join(self.temp_dir, "x.bin"), 'wb') # x坐标流
+        self.y_file = open(os.path.join(self.temp_dir, "y.bin"), 'wb') # y坐标流
+        self.agent_ids = [] # 已写入的智能体ID
+        self.offsets = [0] # 路径点偏移
+
+    # 写入一个智能体的路径（locations为(x, y)序列）
+    def add_path(self, agent_id, locations):
+        coordinates = np.asarray(locations, dtype=self.COORDINATE_TYPE).reshape(-1, 2)
+        self.x_file.write(np.ascontiguousarray(coordinates[:, 0]).tobytes())
+        self.y_file.write(np.ascontiguousarray(coordinates[:, 1]).tobytes())
+        self.agent_ids.append(str(agent_id))
+        self.offsets.append(self.offsets[-1] + len(coordinates))
+
+    # 写入全部数组并关闭（先写入临时文件再重命名，不会留下不完整的输出文件）
+    def close(self, cost, status=None):
+        self.x_file.close()
+        self.y_file.close()
+        count = self.offsets[-1]
+        temp_file = os.path.join(self.temp_dir, "schedule.npz")
+        with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            self.__write_array(archive, "agent_ids", np.array(self.agent_ids, dtype=str))
+            self.__write_array(archive, "offsets", np.array(self.offsets, dtype=np.int64))
+            self.__write_array(archive, "cost", np.array(cost, dtype=np.int64))
+            self.__write_array(archive, "status", np.array("" if status is None else status, dtype=str))
+            for name, stream_file in (("x", self.x_file.name), ("y", self.y_file.name)):
+                with archive.open(name + ".npy", 'w', force_zip64=True) as member, open(stream_file, 'rb') as stream:
+                    np.lib.format.write_array_header_1_0(member, {"descr": np.lib.format.dtype_to_descr(np.dtype(self.COORDINATE_TYPE)),
+                                                                  "fortran_order": False, "shape": (count,)})
+                    shutil.copyfileobj(stream, member)
+        os.replace(temp_file, self.file_name)
+        shutil.rmtree(self.temp_dir)
+
+    # 写入一个小数组
+    @staticmethod
+    def __write_array(archive, name, array):
+        with archive.open(name + ".npy", 'w', force_zip64=True) as member:
+            np.lib.format.write_array(member, array, allow_pickle=False)
+
+"""二进制路径计划（只读，数组为对.npz文件的内存映射）"""
+class BinarySchedule:
+    def __init__(self, file_name):
+        self.file_name = file_name # 文件名
+        arrays = self.__map_arrays(file_name)
+        self.agent_ids = [str(agent_id) for agent_id in arrays["agent_ids"]] # 智能体ID列表
+        self.offsets = arrays["offsets"] # 路径点偏移
+        self.x = arrays["x"] # 所有路径点的x坐标
+        self.y = arrays["y"] # 所有路径点的y坐标
+        self.cost = int(arrays["cost"]) # 总代价
+        self.status = str(arrays["status"]) or None # 求解状态
+
+    # 内存映射.npz中的每个（未压缩的）数组：定位zip本地文件头之后的.npy数据，再跳过.npy头
+    @staticmethod
+    def __map_arrays(file_name):
+        arrays = {}
+        with zipfile.ZipFile(file_name) as archive, open(file_name, 'rb') as raw:
+            for info in archive.infolist():
+                name = info.filename[:-len(".npy")]
+                if info.compress_type != zipfile.ZIP_STORED: # 压缩的成员无法映射，退回正常读取
+                    with archive.open(info) as member:
+                        arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                    continue
+                raw.seek(info.header_offset)
+                header = raw.read(30) # zip本地文件头的固定部分
+                name_length, extra_length = struct.unpack("<HH", header[26:30])
+                raw.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(raw)
+                read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+                shape, fortran_order, dtype = read_header(raw)
+                if dtype.hasobject or int(np.prod(shape)) == 0: # 空数组无法映射
+                    raw.seek(info.header_offset + 30 + name_length + extra_length)
+                    arrays[name] = np.lib.format.read_array(raw, allow_pickle=False)
+                    continue
+                arrays[name] = np.memmap(file_name, dtype=dtype, mode='r', offset=raw.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+        return arrays
+
+    # 获取第i个智能体的路径点（形状为(长度, 2)的数组）
+    def get_locations(self, i):
+        begin, end = self.offsets[i], self.offsets[i + 1]
+        return np.stack([self.x[begin:end], self.y[begin:end]], axis=1)
+
+    # 转换为YAML输出格式的路径计划字典（{智能体ID: [{'t', 'x', 'y'}, ...]}）
+    def to_plan(self):
+        plan = {}
+        for i, agent_id in enumerate(self.agent_ids):
+            locations = self.get_locations(i).tolist()
+            plan[agent_id] = [{'t': t, 'x': x, 'y': y} for t, (x, y) in enumerate(locations)]
+        return plan
+
+"""读取路径计划文件：.npz返回内存映射的BinarySchedule（不转换为字典），其他为YAML输出字典（schedule、cost、status）"""
+def load_schedule(file_name):
+    if file_name.endswith(".npz"):
+        return BinarySchedule(file_name)
+    with open(file_name) as states_file:
+        return yaml.load(states_file, Loader=yaml.FullLoader)
@@ -0,0 +1,153 @@
+"""安全区间路径规划（Safe Interval Path Planning），可替代A*作为CBS的底层搜索"""
+from a_star import A_Star, Step
+from entity import *
+import heapq
+
+"""安全区间节点类（在Step的基础上记录所处的安全区间，time为到达该位置的时刻）"""
+class IntervalStep(Step):
+    def __init__(self, x, y, parent, time, interval):
+        super().__init__(x, y, parent, time)
+        self.interval = interval # 所处安全区间的序号
+
+    # 获取状态键(x, y, 安全区间序号)
+    def get_state(self):
+        return (self.x, self.y, self.interval)
+
+"""SIPP类
+由顶点约束计算每个位置的安全区间（不被约束的连续时刻），以(位置, 安全区间)为状态搜索，
+同一安全区间内的等待不再逐步展开，只记录最早到达时刻；边约束在生成后继时检查（受阻时推迟到达时刻）。
+接口与A_Star相同（search返回相同的Path对象，路径缓存、MDD与ECBS焦点搜索沿用A_Star的实现）"""
+class SIPP(A_Star):
+    INFINITY = float('inf') # 无上界的安全区间终点
+
+    # 由约束表计算安全区间：位置 -> [(开始时刻, 结束时刻), ...]（未被约束的位置不记录，其安全区间为[0, inf)；
+    # 被永久占用的位置只保留占用开始之前的安全区间）
+    @staticmethod
+    def build_safe_intervals(constraint_table):
+        unsafe_times = {} # 位置 -> 被顶点约束的时刻列表
+        for t, x, y in constraint_table.vertex_table:
+            if t > 0: # 0时刻只可能位于起点，与A*一致不检查
+                unsafe_times.setdefault((x, y), []).append(t)
+        for location in constraint_table.blocked_from:
+            unsafe_times.setdefault(location, [])
+        intervals = {}
+        for location, times in unsafe_times.items():
+            location_intervals = []
+            start = 0
+            for t in sorted(times):
+                if t > start:
+                    location_intervals.append((start, t - 1))
+                start = t + 1
+            location_intervals.append((start, SIPP.INFINITY))
+            if location in constraint_table.blocked_from:
+                blocked = max(constraint_table.blocked_from[location], 1)
+                location_intervals = [(begin, min(end, blocked - 1)) for begin, end in location_intervals if begin < blocked]
+            intervals[location] = location_intervals
+        return intervals
+
+    # 获取位置的安全区间
+    def get_intervals(self, location):
+        return self.safe_intervals.get(location, self.default_intervals)
+
+    # 获取后继节点：移动到相邻位置的每个可到达的安全区间（取最早到达时刻）
+    def get_interval_neighbors(self, current_step):
+        neighbors = []
+        x = current_step.x
+        y = current_step.y
+        interval_end = self.get_intervals((x, y))[current_step.interval][1] # 当前安全区间的结束时刻（最晚出发时刻）
+        for nx, ny in ((x-1, y), (x+1, y), (x, y-1), (x, y+1)):
+            if nx < 0 or nx >= self.size[0] or ny < 0 or ny >= self.size[1] or self.map[nx][ny] == 1:
+                continue
+            for index, (start, end) in enumerate(self.get_intervals((nx, ny))):
+                if start > interval_end + 1: # 之后的安全区间都无法在当前区间结束前出发到达
+                    break
+                if end < current_step.time + 1:
+                    continue
+                time = max(current_step.time + 1, start) # 最早到达时刻
+                # 边约束：推迟出发（在当前位置多等待）直到该移动不受约束
+                while time <= end and time - 1 <= interval_end and self.constraint_table.is_constrained((x, y), (nx, ny), time):
+                    time += 1
+                if time <= end and time - 1 <= interval_end:
+                    neighbors.append(IntervalStep(nx, ny, current_step, time, index))
+        return neighbors
+
+    # 构建完整路径（补全安全区间内的等待，到达终点后等待至end_time）
+    def build_complete_path(self, current_step, end_time=0):
+        steps = []
+        while current_step:
+            steps.append(current_step)
+            current_step = current_step.parent
+        steps.reverse()
+        path = []
+        for i in range(len(steps)):
+            leave_time = steps[i+1].time - 1 if i + 1 < len(steps) else max(steps[i].time, end_time) # 离开（或结束）时刻
+            for t in range(steps[i].time, leave_time + 1):
+                path.append((steps[i].x, steps[i].y))
+        return path
+
+    # SIPP搜索（不使用缓存）
+    def search_uncached(self, agent, constraints):
+        return self.search_table(agent, ConstraintTable(constraints))
+
+    # 在给定约束表下搜索
+    def search_table(self, agent, constraint_table):
+        self.check_deadline()
+        self.agent_id = agent.id
+        self.begin = agent.start
+        self.end = agent.goal
+        open_list = [] # 待遍历节点（堆元素为(f, -g, 入堆序号, IntervalStep)）
+        best_g = {} # 状态(x, y, 安全区间序号) -> 已发现的最早到达时刻
+        close_list = set() # 已遍历状态
+
+        self.h_table = self.get_heuristic_table(self.end)
+        if self.h_table[self.begin[0]][self.begin[1]] == float('inf'): # 终点不可达
+            return None
+
+        # 初始化安全区间（每次搜索只构建一次）
+        self.constraint_table = constraint_table
+        if self.constraint_table.positive_table: # 正约束（不相交分裂）使其他位置在该时刻都不安全，改用时间扩展A*
+            return A_Star.search_table(self, agent, constraint_table)
+        max_t = self.constraint_table.get_goal_time(self.end) # 最大时间(用于到达终点后仍被碰撞)
+        if max_t == float('inf'): # 终点被永久占用
+            return None
+        self.safe_intervals = self.build_safe_intervals(self.constraint_table)
+        self.default_intervals = [(0, self.INFINITY)]
+        goal = (self.end[0], self.end[1])
+        goal_interval = len(self.get_intervals(goal)) - 1 # 终点的最后一个安全区间（到达后可一直停留）
+
+        # 初始化起点
+        start = IntervalStep(self.begin[0], self.begin[1], None, 0, 0)
+        start.set_priority(0, self.h(start))
+        best_g[start.get_state()] = 0
+        push_count = 0 # 入堆序号（保证出堆顺序确定）
+        heapq.heappush(open_list, (start.priority, -start.g, push_count, start))
+
+        # 开始搜索
+        count = 0
+        while open_list:
+            count += 1
+            if count % self.DEADLINE_CHECK_INTERVAL == 0:
+                self.check_deadline()
+            current_step = heapq.heappop(open_list)[3] # 最高优先级节点
+            state = current_step.get_state()
+            # 惰性删除：已遍历或已被更早到达替代的过期堆元素
+            if state in close_list or current_step.g > best_g[state]:
+                continue
+            # 到达终点的最后一个安全区间（到达最早，之后在终点等待至max_t，总代价max(到达时刻, max_t)最小）
+            if (current_step.x, current_step.y) == goal and current_step.interval == goal_interval:
+                path = Path(agent)
+                path.set_locations(self.build_complete_path(current_step, max_t))
+                return path
+
+            close_list.add(state)
+            for neighbor in self.get_interval_neighbors(current_step):
+                neighbor_state = neighbor.get_state()
+                if neighbor_state in close_list:
+                    continue
+                g = neighbor.time # 代价即到达时刻
+                if g < best_g.get(neighbor_state, float('inf')):
+                    best_g[neighbor_state] = g
+                    neighbor.set_priority(g, self.h(neighbor)) # 启发值只能依赖状态（不能依赖到达时刻），保证首次出堆时到达最早
+                    push_count += 1
+                    heapq.heappush(open_list, (neighbor.priority, -g, push_count, neighbor))
+        return None
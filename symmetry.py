@@ -0,0 +1,189 @@
+"""对称推理（矩形冲突与走廊冲突），用一次分裂代替大量代价相同的CT节点"""
+from entity import *
+
+"""对称推理类
+矩形冲突：两智能体从起点出发沿曼哈顿最短路径在开阔区域交叉（一个从矩形左侧进入、一个从下侧进入），
+二者按最短时刻穿过矩形的路径必然相撞，因此分别禁止其按最短时刻经过矩形的对边（屏障约束）；
+走廊冲突：两智能体在一格宽的走廊中相向而行，必有一方等另一方通过，
+因此分别禁止其在对方最早通过走廊之前到达走廊另一端（时间段约束）。
+两种分裂都不会丢失无冲突的解，且每个子节点都排除了当前路径"""
+class SymmetryReasoning:
+    RECTANGLE = "rectangle" # 矩形冲突
+    CORRIDOR = "corridor" # 走廊冲突
+
+    def __init__(self, cbs):
+        self.cbs = cbs # 所属CBS
+        self.a_star = cbs.a_star # 底层规划器（地图与最早到达时刻）
+        self.corridors = {} # 位置 -> 所在走廊（有序位置元组，不在走廊中为None）
+        self.rectangle_count = 0 # 按矩形冲突分裂的次数
+        self.corridor_count = 0 # 按走廊冲突分裂的次数
+
+    # 识别对称冲突（矩形优先），返回SymmetryConflict，不是对称冲突时返回None
+    def find(self, ctNode, conflict):
+        symmetry_conflict = self.find_rectangle(ctNode, conflict)
+        if symmetry_conflict is not None:
+            self.rectangle_count += 1
+            return symmetry_conflict
+        symmetry_conflict = self.find_corridor(ctNode, conflict)
+        if symmetry_conflict is not None:
+            self.corridor_count += 1
+        return symmetry_conflict
+
+    # 获取t时刻的位置（到达终点后停留在终点）
+    @staticmethod
+    def get_location(locations, t):
+        return locations[min(t, len(locations) - 1)]
+
+    # 检查路径是否经过(时间, 位置)列表中的任一项
+    @staticmethod
+    def is_violated(locations, cells):
+        return any(SymmetryReasoning.get_location(locations, t) == (location[0], location[1]) for t, location in cells)
+
+    # 曼哈顿距离
+    @staticmethod
+    def manhattan(a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    # 路径从起点开始保持曼哈顿最短的最远位置
+    def get_manhattan_end(self, locations):
+        t = 0
+        while t + 1 < len(locations) and self.manhattan(locations[t + 1], locations[0]) == t + 1:
+            t += 1
+        return locations[t]
+
+    # 矩形冲突：两智能体到冲突顶点的路径都是从起点出发的曼哈顿最短路径，且从矩形相邻两边进入
+    def find_rectangle(self, ctNode, conflict):
+        if not isinstance(conflict, VertexConflict):
+            return None
+        i1, i2 = self.cbs.agent_index[conflict.agent1.id], self.cbs.agent_index[conflict.agent2.id]
+        paths = (ctNode.solution.paths[i1].locations, ctNode.solution.paths[i2].locations)
+        location = (conflict.location[0], conflict.location[1])
+        starts = (paths[0][0], paths[1][0])
+        if any(self.manhattan(start, location) != conflict.time for start in starts):
+            return None
+        goals = (self.get_manhattan_end(paths[0]), self.get_manhattan_end(paths[1]))
+
+        # 统一方向：将坐标翻转为两智能体都沿x、y增大的方向移动
+        signs = []
+        for axis in (0, 1):
+            directions = {(goal[axis] > start[axis]) - (goal[axis] < start[axis]) for start, goal in zip(starts, goals)} - {0}
+            if len(directions) > 1: # 两智能体在该方向上相向而行
+                return None
+            signs.append(directions.pop() if directions else 1)
+        flip = lambda p: (p[0] * signs[0], p[1] * signs[1]) # 翻转（自逆）
+        s1, s2 = flip(starts[0]), flip(starts[1])
+        g1, g2 = flip(goals[0]), flip(goals[1])
+        rs = (max(s1[0], s2[0]), max(s1[1], s2[1])) # 矩形起始角
+        rg = (min(g1[0], g2[0]), min(g1[1], g2[1])) # 矩形终止角
+        if rs[0] > rg[0] or rs[1] > rg[1] or rs == rg:
+            return None
+        # 水平进入者（起点与矩形下边同行）的屏障为矩形右边，竖直进入者（起点与矩形左边同列）的屏障为矩形上边
+        if s1[1] == rs[1] and s2[0] == rs[0]:
+            horizontal, vertical = 0, 1
+        elif s2[1] == rs[1] and s1[0] == rs[0]:
+            horizontal, vertical = 1, 0
+        else:
+            return None
+
+        barriers = [None, None]
+        begin = flip((rg[0], rs[1]))
+        barriers[horizontal] = BarrierConstraint(self.cbs.agents[(i1, i2)[horizontal]].id, begin, flip(rg),
+                                                 self.manhattan(begin, starts[horizontal]))
+        begin = flip((rs[0], rg[1]))
+        barriers[vertical] = BarrierConstraint(self.cbs.agents[(i1, i2)[vertical]].id, begin, flip(rg),
+                                               self.manhattan(begin, starts[vertical]))
+        # 两条当前路径都须违反各自的屏障（否则分裂不能消除当前冲突）
+        if not all(self.is_violated(paths[k], barriers[k].get_cells()) for k in (0, 1)):
+            return None
+        return SymmetryConflict(self.RECTANGLE, conflict.agent1, conflict.agent2, [barriers[0]], [barriers[1]])
+
+    # 获取位置所在的走廊：由两侧都只有两个相邻空位的位置连成的链，两端各有一个走廊外的相邻位置（环形或死胡同返回None）
+    def get_corridor(self, location):
+        if location in self.corridors:
+            return self.corridors[location]
+        corridor = None
+        neighbors = self.get_free_neighbors(location)
+        if len(neighbors) == 2:
+            sides = []
+            for neighbor in neighbors: # 向两侧延伸
+                side = []
+                previous, current = location, neighbor
+                while current != location and len(self.get_free_neighbors(current)) == 2:
+                    side.append(current)
+                    previous, current = current, [n for n in self.get_free_neighbors(current) if n != previous][0]
+                if current == location: # 环形
+                    side = None
+                    break
+                sides.append(side)
+            if len(sides) == 2:
+                corridor = tuple(sides[0][::-1]) + (location,) + tuple(sides[1])
+        self.corridors[location] = corridor
+        return corridor
+
+    # 获取相邻的空位
+    def get_free_neighbors(self, location):
+        x, y = location
+        return [(nx, ny) for nx, ny in ((x-1, y), (x+1, y), (x, y-1), (x, y+1))
+                if 0 <= nx < self.a_star.size[0] and 0 <= ny < self.a_star.size[1] and self.a_star.map[nx][ny] == 0]
+
+    # 获取智能体t时刻所在的一次穿行进入和离开走廊的一端（t时刻不在走廊内时返回None）
+    def get_traversal(self, locations, t, cells):
+        if self.get_location(locations, t) not in cells:
+            return None
+        enter = t
+        while enter >= 0 and locations[enter] in cells:
+            enter -= 1
+        leave = t
+        while leave < len(locations) and locations[leave] in cells:
+            leave += 1
+        if enter < 0 or leave >= len(locations):
+            return None
+        return locations[enter + 1], locations[leave - 1]
+
+    # 走廊冲突：冲突位于长度至少为2的走廊内，两智能体相向穿过走廊
+    def find_corridor(self, ctNode, conflict):
+        if isinstance(conflict, VertexConflict):
+            location = (conflict.location[0], conflict.location[1])
+            corridor = self.get_corridor(location)
+        else: # 边冲突的两端须位于同一走廊
+            location = (conflict.end[0], conflict.end[1])
+            corridor = self.get_corridor(location)
+            if corridor is None or (conflict.begin[0], conflict.begin[1]) not in corridor:
+                return None
+        if corridor is None or len(corridor) < 2:
+            return None
+        cells = set(corridor)
+        agents = (conflict.agent1, conflict.agent2)
+        indices = [self.cbs.agent_index[agent.id] for agent in agents]
+        paths = [ctNode.solution.paths[i].locations for i in indices]
+        traversals = []
+        for locations in paths:
+            if locations[0] in cells or locations[-1] in cells: # 起点或终点在走廊内
+                return None
+            traversal = self.get_traversal(locations, conflict.time, cells)
+            if traversal is None or traversal[0] == traversal[1]: # 未穿过走廊
+                return None
+            traversals.append(traversal)
+        e1, e2 = traversals[0] # agent1从e1进入、从e2离开
+        if traversals[1] != (e2, e1): # 不是相向而行
+            return None
+
+        # 最早到达时刻：经走廊到达另一端（当前约束下），以及不经走廊到达另一端（走廊其他位置视为障碍物，
+        # 只按距离计算：绕行途中可能进出走廊以避开约束，带约束的最早时刻不是其下界）
+        k = len(corridor) - 1 # 走廊两端的距离
+        constraints = [ctNode.get_agent_constraints(agent) for agent in agents]
+        t1 = self.a_star.get_earliest_arrival(paths[0][0], e2, constraints[0])
+        t2 = self.a_star.get_earliest_arrival(paths[1][0], e1, constraints[1])
+        t1_bypass = self.a_star.get_earliest_arrival(paths[0][0], e2, [], cells - {e2})
+        t2_bypass = self.a_star.get_earliest_arrival(paths[1][0], e1, [], cells - {e1})
+        # 一方先通过时，另一方到达对端的时刻晚于 先通过方最早到达时刻 + k
+        end1 = min(t1_bypass - 1, t2 + k)
+        end2 = min(t2_bypass - 1, t1 + k)
+        if end1 < t1 or end2 < t2:
+            return None
+        range1 = RangeConstraint(agents[0].id, e2, t1, end1)
+        range2 = RangeConstraint(agents[1].id, e1, t2, end2)
+        if not self.is_violated(paths[0], [(t, e2) for t in range(t1, end1 + 1)]) \
+                or not self.is_violated(paths[1], [(t, e1) for t in range(t2, end2 + 1)]):
+            return None
+        return SymmetryConflict(self.CORRIDOR, conflict.agent1, conflict.agent2, [range1], [range2])
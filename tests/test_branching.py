@@ -0,0 +1,83 @@
+"""不相交分裂的回归测试：随机小实例上与普通CBS的最优代价相同（A*与SIPP底层），且两种底层规划器都满足正约束"""
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from a_star import A_Star
+from sipp import SIPP
+from cbs import CBS, cbs_main
+from entity import *
+from test_ecbs import random_instance
+
+"""获取路径在t时刻的位置（到达终点后停在终点）"""
+def location_at(locations, t):
+    return tuple(locations[min(t, len(locations) - 1)])
+
+class TestDisjointSplitting(unittest.TestCase):
+    SEEDS = range(60) # 随机实例的种子
+    NODE_LIMIT = 3000 # 求最优代价的CT节点上限（普通CBS超出的实例跳过）
+
+    def check_same_cost(self, planner):
+        checked = 0
+        for seed in self.SEEDS:
+            agents, size, obstacles = random_instance(seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                optimal = cbs_main(agents, size, obstacles, node_limit=self.NODE_LIMIT)
+                if optimal is None or optimal.status != CBS.OPTIMAL:
+                    continue
+                disjoint = cbs_main(agents, size, obstacles, planner=planner, disjoint=True)
+            checked += 1
+            self.assertIsNotNone(disjoint, "seed " + str(seed))
+            self.assertEqual(disjoint.status, CBS.OPTIMAL, "seed " + str(seed))
+            self.assertEqual(disjoint.cost, optimal.cost, "seed " + str(seed))
+        self.assertGreater(checked, 0)
+
+    def test_same_cost_a_star(self):
+        self.check_same_cost("astar")
+
+    def test_same_cost_sipp(self):
+        self.check_same_cost("sipp")
+
+class TestPositiveConstraints(unittest.TestCase):
+    SEEDS = range(200) # 随机实例的种子
+
+    # 随机生成单智能体的正约束（正顶点约束或正边约束）与负约束，要求A*与SIPP的代价相同且路径满足全部约束
+    def test_honored_by_both_planners(self):
+        solved = 0
+        for seed in self.SEEDS:
+            rng = random.Random(seed)
+            agents, size, obstacles = random_instance(seed, size=7, agent_count=1)
+            agent = agents[0]
+            free = [(x, y) for x in range(size[0]) for y in range(size[1]) if (x, y) not in obstacles]
+            x, y = rng.choice(free)
+            time = rng.randint(1, 10)
+            if rng.random() < 0.5:
+                positive = PositiveVertexConstraint(agent.id, (x, y), time)
+            else:
+                positive = PositiveEdgeConstraint(agent.id, (x, y), rng.choice([(x+1, y), (x-1, y), (x, y+1), (x, y-1)]), time)
+            constraints = [positive] + [VertexConstraint(agent.id, rng.choice(free), rng.randint(1, 10)) for i in range(5)]
+            a_star_path = A_Star(size, obstacles).search(agent, constraints)
+            sipp_path = SIPP(size, obstacles).search(agent, constraints)
+            self.assertEqual(a_star_path is None, sipp_path is None, "seed " + str(seed))
+            if a_star_path is None:
+                continue
+            solved += 1
+            self.assertEqual(a_star_path.get_cost(), sipp_path.get_cost(), "seed " + str(seed))
+            for path in (a_star_path, sipp_path):
+                locations = path.locations
+                if isinstance(positive, PositiveVertexConstraint):
+                    self.assertEqual(location_at(locations, positive.time), tuple(positive.location), "seed " + str(seed))
+                else:
+                    self.assertEqual(location_at(locations, positive.time - 1), tuple(positive.begin), "seed " + str(seed))
+                    self.assertEqual(location_at(locations, positive.time), tuple(positive.end), "seed " + str(seed))
+                for constraint in constraints[1:]:
+                    self.assertNotEqual(location_at(locations, constraint.time), tuple(constraint.location), "seed " + str(seed))
+        self.assertGreater(solved, 0)
+
+if __name__ == "__main__":
+    unittest.main()
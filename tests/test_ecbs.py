@@ -0,0 +1,45 @@
+"""ECBS有界次优性的回归测试：随机小实例上ECBS解的代价不超过 w * 最优代价"""
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cbs import CBS, cbs_main
+from entity import Agent
+
+"""随机生成实例（size x size地图，按density随机放置障碍物，起点与终点各不相同）"""
+def random_instance(seed, size=6, agent_count=5, density=0.2):
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    obstacles = [cell for cell in cells if rng.random() < density]
+    free = [cell for cell in cells if cell not in obstacles]
+    starts = rng.sample(free, agent_count)
+    goals = rng.sample(free, agent_count)
+    agents = [Agent("agent" + str(i), list(start), list(goal)) for i, (start, goal) in enumerate(zip(starts, goals))]
+    return agents, [size, size], obstacles
+
+class TestECBSBound(unittest.TestCase):
+    W = 1.2 # 次优因子
+    SEEDS = range(120) # 随机实例的种子
+    OPTIMAL_NODE_LIMIT = 3000 # 求最优代价的CT节点上限（超出的实例跳过）
+
+    def test_cost_within_bound(self):
+        checked = 0
+        for seed in self.SEEDS:
+            agents, size, obstacles = random_instance(seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                optimal = cbs_main(agents, size, obstacles, node_limit=self.OPTIMAL_NODE_LIMIT)
+                if optimal is None or optimal.status != CBS.OPTIMAL:
+                    continue
+                bounded = cbs_main(agents, size, obstacles, w=self.W)
+            checked += 1
+            self.assertIsNotNone(bounded, "seed " + str(seed))
+            self.assertLessEqual(bounded.cost, self.W * optimal.cost + 1e-9, "seed " + str(seed))
+        self.assertGreater(checked, 0)
+
+if __name__ == "__main__":
+    unittest.main()
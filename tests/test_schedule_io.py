@@ -0,0 +1,66 @@
+"""二进制路径计划的回归测试：ScheduleWriter写入的.npz由load_schedule读取后路径、代价与状态不变"""
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_io import BinarySchedule, ScheduleWriter, load_schedule
+
+"""随机生成路径（每条路径为相邻位置组成的序列，长度至少为1）"""
+def random_paths(seed, agent_count=20, size=300):
+    rng = random.Random(seed)
+    paths = {}
+    for i in range(agent_count):
+        location = (rng.randrange(size), rng.randrange(size))
+        locations = [location]
+        for t in range(rng.randint(0, 60)):
+            dx, dy = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)])
+            location = (min(max(location[0] + dx, 0), size - 1), min(max(location[1] + dy, 0), size - 1))
+            locations.append(location)
+        paths["agent" + str(i)] = locations
+    return paths
+
+class TestScheduleRoundTrip(unittest.TestCase):
+    def write_and_load(self, directory, paths, cost, status):
+        file_name = os.path.join(directory, "schedule.npz")
+        writer = ScheduleWriter(file_name)
+        for agent_id, locations in paths.items():
+            writer.add_path(agent_id, locations)
+        writer.close(cost, status)
+        self.assertEqual(os.listdir(directory), ["schedule.npz"]) # 临时文件已清理
+        return load_schedule(file_name)
+
+    def test_round_trip(self):
+        for seed in range(5):
+            paths = random_paths(seed)
+            cost = sum(len(locations) - 1 for locations in paths.values())
+            with tempfile.TemporaryDirectory() as directory:
+                schedule = self.write_and_load(directory, paths, cost, "optimal")
+                self.assertIsInstance(schedule, BinarySchedule)
+                self.assertIsInstance(schedule.x, np.memmap) # 坐标数组为内存映射，不复制
+                self.assertEqual(schedule.agent_ids, list(paths.keys()))
+                self.assertEqual(schedule.cost, cost)
+                self.assertEqual(schedule.status, "optimal")
+                for i, locations in enumerate(paths.values()):
+                    self.assertEqual([tuple(location) for location in schedule.get_locations(i).tolist()], locations)
+                plan = schedule.to_plan()
+                for agent_id, locations in paths.items():
+                    self.assertEqual(plan[agent_id], [{'t': t, 'x': x, 'y': y} for t, (x, y) in enumerate(locations)])
+                del schedule, plan
+
+    def test_without_status(self):
+        with tempfile.TemporaryDirectory() as directory:
+            schedule = self.write_and_load(directory, {"agent0": [(0, 0)], "agent1": [(1, 0), (1, 1)]}, 1, None)
+            self.assertIsNone(schedule.status)
+            self.assertEqual(schedule.agent_ids, ["agent0", "agent1"])
+            self.assertEqual(schedule.offsets.tolist(), [0, 1, 3])
+            self.assertEqual(schedule.get_locations(0).tolist(), [[0, 0]])
+            del schedule
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""SIPP底层规划器的回归测试：随机顶点/边约束下与A*的路径代价相同，且返回的路径满足全部约束"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from a_star import A_Star
+from sipp import SIPP
+from entity import *
+
+"""随机生成单智能体实例与约束（size x size地图，约束时刻不超过horizon）"""
+def random_constraints(seed, size=8, constraint_count=30, horizon=20):
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    obstacles = [cell for cell in cells if rng.random() < 0.15]
+    free = [cell for cell in cells if cell not in obstacles]
+    start, goal = rng.sample(free, 2)
+    agent = Agent("agent0", list(start), list(goal))
+    constraints = []
+    for i in range(constraint_count):
+        x, y = rng.choice(free)
+        time = rng.randint(1, horizon)
+        if rng.random() < 0.6:
+            constraints.append(VertexConstraint(agent.id, (x, y), time))
+        else:
+            constraints.append(EdgeConstraint(agent.id, (x, y), rng.choice([(x+1, y), (x-1, y), (x, y+1), (x, y-1)]), time))
+    return agent, [size, size], obstacles, constraints
+
+"""检查路径是否满足顶点/边约束（到达终点后停在终点）"""
+def violates(locations, constraints):
+    def at(t):
+        return tuple(locations[min(t, len(locations) - 1)])
+    for constraint in constraints:
+        if isinstance(constraint, VertexConstraint) and at(constraint.time) == tuple(constraint.location):
+            return constraint
+        if isinstance(constraint, EdgeConstraint) and at(constraint.time - 1) == tuple(constraint.begin) \
+                and at(constraint.time) == tuple(constraint.end):
+            return constraint
+    return None
+
+class TestSIPP(unittest.TestCase):
+    SEEDS = range(300) # 随机实例的种子
+
+    def test_same_cost_as_a_star(self):
+        solved = 0
+        for seed in self.SEEDS:
+            agent, size, obstacles, constraints = random_constraints(seed)
+            a_star_path = A_Star(size, obstacles).search(agent, constraints)
+            sipp_path = SIPP(size, obstacles).search(agent, constraints)
+            self.assertEqual(a_star_path is None, sipp_path is None, "seed " + str(seed))
+            if sipp_path is None:
+                continue
+            solved += 1
+            self.assertEqual(sipp_path.get_cost(), a_star_path.get_cost(), "seed " + str(seed))
+            locations = sipp_path.locations
+            self.assertEqual(tuple(locations[0]), tuple(agent.start), "seed " + str(seed))
+            self.assertEqual(tuple(locations[-1]), tuple(agent.goal), "seed " + str(seed))
+            for t in range(1, len(locations)):
+                self.assertLessEqual(abs(locations[t][0] - locations[t-1][0]) + abs(locations[t][1] - locations[t-1][1]), 1)
+                self.assertNotIn(tuple(locations[t]), obstacles)
+            self.assertIsNone(violates(locations, constraints), "seed " + str(seed))
+        self.assertGreater(solved, 0)
+
+if __name__ == "__main__":
+    unittest.main()
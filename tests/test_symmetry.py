@@ -0,0 +1,116 @@
+"""对称推理的回归测试：随机小实例上与普通CBS的最优代价相同（A*与SIPP底层），且两种底层规划器都满足屏障约束与时间段约束"""
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from a_star import A_Star
+from sipp import SIPP
+from cbs import CBS, cbs_main
+from entity import *
+from test_ecbs import random_instance
+
+"""走廊实例：7x3地图中间一行为一格宽的走廊（两端各有一列开阔区域），两智能体相向穿过走廊"""
+def corridor_instance():
+    obstacles = [(x, y) for x in range(1, 6) for y in (0, 2)]
+    return [Agent("agent0", [0, 1], [6, 1]), Agent("agent1", [6, 1], [0, 1])], [7, 3], obstacles
+
+"""矩形实例：6x6空地图上两智能体沿曼哈顿最短路径交叉（一个竖直、一个水平穿过同一矩形）"""
+def rectangle_instance():
+    return [Agent("agent0", [2, 0], [3, 5]), Agent("agent1", [0, 2], [5, 3])], [6, 6], []
+
+class TestSymmetryReasoning(unittest.TestCase):
+    SEEDS = range(60) # 随机实例的种子
+    RANDOM_MAPS = ((6, 0.0), (7, 0.25)) # 随机实例的(地图边长, 障碍物密度)：开阔地图上的矩形冲突较多，障碍物较多时有走廊
+    NODE_LIMIT = 3000 # 求最优代价的CT节点上限（普通CBS超出的实例跳过）
+
+    # 与普通CBS的最优代价比较，返回对称推理的统计
+    def check_same_cost(self, agents, size, obstacles, planner, message):
+        with contextlib.redirect_stdout(io.StringIO()):
+            optimal = cbs_main(agents, size, obstacles, node_limit=self.NODE_LIMIT)
+            if optimal is None or optimal.status != CBS.OPTIMAL:
+                return None
+            symmetric = cbs_main(agents, size, obstacles, planner=planner, symmetry=True)
+        self.assertIsNotNone(symmetric, message)
+        self.assertEqual(symmetric.status, CBS.OPTIMAL, message)
+        self.assertEqual(symmetric.cost, optimal.cost, message)
+        return symmetric.stats
+
+    def check_random_instances(self, planner):
+        checked = 0
+        reasoned = 0 # 使用了矩形或走廊推理的实例数
+        for map_size, density in self.RANDOM_MAPS:
+            for seed in self.SEEDS:
+                agents, size, obstacles = random_instance(seed, size=map_size, density=density)
+                stats = self.check_same_cost(agents, size, obstacles, planner, "seed " + str(seed) + ", size " + str(map_size))
+                if stats is None:
+                    continue
+                checked += 1
+                if stats["rectangles"] + stats["corridors"] > 0:
+                    reasoned += 1
+        self.assertGreater(checked, 0)
+        self.assertGreater(reasoned, 0)
+
+    def test_random_a_star(self):
+        self.check_random_instances("astar")
+
+    def test_random_sipp(self):
+        self.check_random_instances("sipp")
+
+    def test_rectangle(self):
+        for planner in ("astar", "sipp"):
+            stats = self.check_same_cost(*rectangle_instance(), planner, planner)
+            self.assertGreater(stats["rectangles"], 0, planner)
+
+    def test_corridor(self):
+        for planner in ("astar", "sipp"):
+            stats = self.check_same_cost(*corridor_instance(), planner, planner)
+            self.assertGreater(stats["corridors"], 0, planner)
+
+class TestSymmetryConstraints(unittest.TestCase):
+    SEEDS = range(200) # 随机实例的种子
+
+    # 随机生成单智能体的屏障约束与时间段约束，要求A*与SIPP的代价相同且路径不经过任何被约束的(时刻, 位置)
+    def test_honored_by_both_planners(self):
+        solved = 0
+        for seed in self.SEEDS:
+            rng = random.Random(seed)
+            agents, size, obstacles = random_instance(seed, size=7, agent_count=1)
+            agent = agents[0]
+            free = [(x, y) for x in range(size[0]) for y in range(size[1]) if (x, y) not in obstacles]
+            constraints = []
+            for i in range(3):
+                x, y = rng.choice(free)
+                if rng.random() < 0.5:
+                    length = rng.randint(1, 3)
+                    end = rng.choice([(x + length, y), (x - length, y), (x, y + length), (x, y - length)])
+                    constraints.append(BarrierConstraint(agent.id, (x, y), end, rng.randint(1, 8)))
+                else:
+                    time = rng.randint(1, 8)
+                    constraints.append(RangeConstraint(agent.id, (x, y), time, time + rng.randint(0, 4)))
+            blocked = set() # 被约束的(时刻, 位置)
+            for constraint in constraints:
+                if isinstance(constraint, BarrierConstraint):
+                    blocked.update((time, tuple(location)) for time, location in constraint.get_cells())
+                else:
+                    blocked.update((time, tuple(constraint.location)) for time in range(constraint.time, constraint.end_time + 1))
+            a_star_path = A_Star(size, obstacles).search(agent, constraints)
+            sipp_path = SIPP(size, obstacles).search(agent, constraints)
+            self.assertEqual(a_star_path is None, sipp_path is None, "seed " + str(seed))
+            if a_star_path is None:
+                continue
+            solved += 1
+            self.assertEqual(a_star_path.get_cost(), sipp_path.get_cost(), "seed " + str(seed))
+            horizon = max(time for time, location in blocked) + 1
+            for path in (a_star_path, sipp_path):
+                for time in range(horizon):
+                    location = tuple(path.locations[min(time, len(path.locations) - 1)])
+                    self.assertNotIn((time, location), blocked, "seed " + str(seed))
+        self.assertGreater(solved, 0)
+
+if __name__ == "__main__":
+    unittest.main()
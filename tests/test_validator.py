@@ -0,0 +1,68 @@
+"""路径计划校验工具的回归测试：无冲突的计划通过校验，顶点冲突、边冲突、障碍物碰撞与不连续移动都被报告（YAML与二进制.npz两种格式）"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_io import ScheduleWriter, load_schedule
+from validator import validate
+
+"""构建输入参数字典（4x4地图，(3, 3)为障碍物；paths为{智能体名称: 路径点列表}，起点与终点取路径的首尾）"""
+def make_param(paths):
+    agents = [{"name": name, "start": list(locations[0]), "goal": list(locations[-1])} for name, locations in paths.items()]
+    return {"map": {"dimensions": [4, 4], "obstacles": [(3, 3)]}, "agents": agents}
+
+"""构建YAML输出格式的路径计划字典"""
+def make_schedule(paths):
+    plan = {name: [{'t': t, 'x': x, 'y': y} for t, (x, y) in enumerate(locations)] for name, locations in paths.items()}
+    return {"schedule": plan, "cost": sum(len(locations) - 1 for locations in paths.values())}
+
+class TestValidator(unittest.TestCase):
+    # 分别以YAML字典与二进制.npz校验，两种格式的报告应相同
+    def validate_both(self, paths):
+        yaml_report = validate(make_param(paths), make_schedule(paths))
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "schedule.npz")
+            writer = ScheduleWriter(file_name)
+            for name, locations in paths.items():
+                writer.add_path(name, locations)
+            writer.close(make_schedule(paths)["cost"])
+            binary_report = validate(make_param(paths), load_schedule(file_name))
+        for field in ("vertex_conflicts", "edge_conflicts", "obstacle_hits", "discontinuities"):
+            self.assertEqual(getattr(yaml_report, field), getattr(binary_report, field), field)
+        self.assertEqual(yaml_report.is_valid(), binary_report.is_valid())
+        return yaml_report
+
+    def test_valid_plan(self):
+        report = self.validate_both({"agent0": [(0, 0), (1, 0), (2, 0)], "agent1": [(0, 2), (1, 2), (2, 2), (2, 1)]})
+        self.assertTrue(report.is_valid())
+        self.assertEqual(report.sum_of_costs, 5)
+        self.assertEqual(report.makespan, 3)
+
+    def test_vertex_conflict(self):
+        report = self.validate_both({"agent0": [(0, 0), (1, 0), (2, 0)], "agent1": [(1, 1), (1, 0), (1, 1), (1, 2)]})
+        self.assertFalse(report.is_valid())
+        self.assertEqual(report.vertex_conflicts, [("agent0", "agent1", 1, 1, 0)])
+        self.assertEqual(report.edge_conflicts, [])
+
+    def test_edge_conflict(self):
+        report = self.validate_both({"agent0": [(0, 0), (1, 0), (2, 0)], "agent1": [(1, 0), (0, 0)]})
+        self.assertFalse(report.is_valid())
+        self.assertEqual(report.edge_conflicts, [("agent0", "agent1", 1, 0, 0, 1, 0)])
+        self.assertEqual(report.vertex_conflicts, [])
+
+    def test_obstacle_hit(self):
+        report = self.validate_both({"agent0": [(3, 2), (3, 3), (2, 3)], "agent1": [(0, 0), (-1, 0), (0, 0), (0, 1)]})
+        self.assertFalse(report.is_valid())
+        self.assertEqual(report.obstacle_hits, [("agent0", 1, 3, 3), ("agent1", 1, -1, 0)])
+
+    def test_jump(self):
+        report = self.validate_both({"agent0": [(0, 0), (2, 0), (2, 1)], "agent1": [(0, 3), (1, 3)]})
+        self.assertFalse(report.is_valid())
+        self.assertEqual(report.discontinuities, [("agent0", 1, 0, 0, 2, 0)])
+        self.assertEqual(report.vertex_conflicts + report.edge_conflicts + report.obstacle_hits, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""路径计划校验工具：把路径计划（YAML或二进制.npz，可来自任意求解器）补齐为完工时间长度的数组，
+一次向量化检查出全部顶点冲突、边冲突、障碍物碰撞与不连续移动，并统计总代价与完工时间"""
+from schedule_io import BinarySchedule, load_schedule
+from map_loader import CompiledMap, load_movingai
+
+import argparse
+import numpy as np
+import sys
+import yaml
+
+"""校验报告类（智能体均以名称表示）"""
+class ValidationReport:
+    def __init__(self):
+        self.vertex_conflicts = [] # 顶点冲突[(智能体1, 智能体2, t, x, y), ...]
+        self.edge_conflicts = [] # 边冲突[(智能体1, 智能体2, t, 起点x, 起点y, 终点x, 终点y), ...]（t为到达终点的时刻，起终点为智能体1的移动）
+        self.obstacle_hits = [] # 位于障碍物上或地图外[(智能体, t, x, y), ...]
+        self.discontinuities = [] # 不连续移动（一步移动超过一格）[(智能体, t, 起点x, 起点y, 终点x, 终点y), ...]
+        self.time_gaps = [] # 时间步不连续（仅YAML）[(智能体, 期望的t, 实际的t), ...]
+        self.endpoint_errors = [] # 起点或终点与输入不符[(智能体, "start"/"goal", 规划的位置, 输入的位置), ...]
+        self.missing_agents = [] # 输入中有但路径计划中没有（或路径为空）的智能体
+        self.sum_of_costs = 0 # 总代价（各智能体路径长度减一之和）
+        self.makespan = 0 # 完工时间（最长路径的长度减一）
+
+    # 是否通过校验
+    def is_valid(self):
+        return not (self.vertex_conflicts or self.edge_conflicts or self.obstacle_hits or self.discontinuities
+                    or self.time_gaps or self.endpoint_errors or self.missing_agents)
+
+    # 打印全部问题与统计
+    def print_report(self):
+        for agent in self.missing_agents:
+            print("缺少路径: " + str(agent))
+        for agent, kind, planned, expected in self.endpoint_errors:
+            print(("起点" if kind == "start" else "终点") + "不符: " + str(agent) + " 规划为 " + str(planned) + "，输入为 " + str(expected))
+        for agent, expected, actual in self.time_gaps:
+            print("时间步不连续: " + str(agent) + " 期望 t=" + str(expected) + "，实际为 t=" + str(actual))
+        for agent, t, x, y in self.obstacle_hits:
+            print("障碍物碰撞: " + str(agent) + " 在 " + str((x, y)) + "，时间 " + str(t))
+        for agent, t, x1, y1, x2, y2 in self.discontinuities:
+            print("不连续移动: " + str(agent) + " " + str((x1, y1)) + " -> " + str((x2, y2)) + "，时间 " + str(t))
+        for agent1, agent2, t, x, y in self.vertex_conflicts:
+            print("顶点冲突: " + str(agent1) + " 与 " + str(agent2) + " 在 " + str((x, y)) + "，时间 " + str(t))
+        for agent1, agent2, t, x1, y1, x2, y2 in self.edge_conflicts:
+            print("边冲突: " + str(agent1) + " " + str((x1, y1)) + " -> " + str((x2, y2)) + " 与 " + str(agent2) + " 对向交换，时间 " + str(t))
+        print("顶点冲突 " + str(len(self.vertex_conflicts)) + " 个，边冲突 " + str(len(self.edge_conflicts)) + " 个，障碍物碰撞 "
+              + str(len(self.obstacle_hits)) + " 次，不连续移动 " + str(len(self.discontinuities)) + " 次")
+        print("总代价: " + str(self.sum_of_costs) + "，完工时间: " + str(self.makespan))
+        print("校验通过" if self.is_valid() else "校验未通过")
+
+"""把路径计划转换为补齐到完工时间的数组，返回(智能体名称列表, 各路径长度, X, Y, YAML的时间步)
+X/Y形状为(智能体数, 完工时间+1)，到达终点后停在终点；二进制路径计划直接按偏移索引内存映射的坐标数组"""
+def get_padded_paths(schedule):
+    times = None
+    if isinstance(schedule, BinarySchedule):
+        names = list(schedule.agent_ids)
+        offsets = np.asarray(schedule.offsets, dtype=np.int64)
+        x, y = schedule.x, schedule.y
+    else:
+        plan = schedule["schedule"]
+        names = list(plan.keys())
+        offsets = np.concatenate([[0], np.cumsum([len(plan[name]) for name in names])]).astype(np.int64)
+        x = np.array([state["x"] for name in names for state in plan[name]], dtype=np.int64)
+        y = np.array([state["y"] for name in names for state in plan[name]], dtype=np.int64)
+        times = np.array([state["t"] for name in names for state in plan[name]], dtype=np.int64)
+    lengths = np.diff(offsets)
+    keep = lengths > 0 # 空路径按缺少路径处理
+    names = [name for name, kept in zip(names, keep.tolist()) if kept]
+    offsets, lengths = offsets[:-1][keep], lengths[keep]
+    horizon = int(lengths.max()) if len(lengths) else 0
+    index = offsets[:, None] + np.minimum(np.arange(horizon)[None, :], lengths[:, None] - 1)
+    return names, lengths, np.asarray(x, dtype=np.int64)[index], np.asarray(y, dtype=np.int64)[index], times
+
+"""校验路径计划（param为输入参数字典，schedule为YAML输出字典或BinarySchedule），返回ValidationReport"""
+def validate(param, schedule):
+    report = ValidationReport()
+    width, height = param["map"]["dimensions"]
+    names, lengths, X, Y, times = get_padded_paths(schedule)
+    agent_count, horizon = X.shape
+    real = np.arange(horizon)[None, :] < lengths[:, None] # 路径上真实存在的时间步（不含补齐部分）
+
+    # 缺少的路径、起点与终点
+    row_of = {name: i for i, name in enumerate(names)}
+    for agent in param["agents"]:
+        i = row_of.get(agent["name"])
+        if i is None:
+            report.missing_agents.append(agent["name"])
+            continue
+        start = (int(X[i, 0]), int(Y[i, 0]))
+        goal = (int(X[i, lengths[i] - 1]), int(Y[i, lengths[i] - 1]))
+        if start != tuple(agent["start"]):
+            report.endpoint_errors.append((agent["name"], "start", start, tuple(agent["start"])))
+        if goal != tuple(agent["goal"]):
+            report.endpoint_errors.append((agent["name"], "goal", goal, tuple(agent["goal"])))
+    if agent_count == 0 or horizon == 0:
+        return report
+    report.sum_of_costs = int(np.maximum(lengths - 1, 0).sum())
+    report.makespan = horizon - 1
+
+    # 时间步（YAML中每个智能体的第k个路径点的t应为k）
+    if times is not None:
+        ends = np.cumsum(lengths)
+        expected = np.arange(len(times)) - np.repeat(ends - lengths, lengths)
+        for k in np.flatnonzero(times != expected).tolist():
+            report.time_gaps.append((names[int(np.searchsorted(ends, k, side='right'))], int(expected[k]), int(times[k])))
+
+    # 障碍物与地图边界
+    if isinstance(param["map"]["obstacles"], CompiledMap): # MovingAI地图直接使用栅格
+        grid = np.asarray(param["map"]["obstacles"].grid) == 1
+    else:
+        grid = np.zeros((width, height), dtype=bool)
+        obstacles = np.array([tuple(o) for o in param["map"]["obstacles"]], dtype=np.int64).reshape(-1, 2)
+        grid[obstacles[:, 0], obstacles[:, 1]] = True
+    inside = (X >= 0) & (X < width) & (Y >= 0) & (Y < height)
+    blocked = ~inside
+    blocked[inside] = grid[X[inside], Y[inside]]
+    for i, t in zip(*np.nonzero(blocked & real)):
+        report.obstacle_hits.append((names[i], int(t), int(X[i, t]), int(Y[i, t])))
+
+    # 不连续移动（相邻时间步之间的曼哈顿距离大于1）
+    jump = (np.abs(np.diff(X, axis=1)) + np.abs(np.diff(Y, axis=1)) > 1) & real[:, 1:]
+    for i, t in zip(*np.nonzero(jump)):
+        report.discontinuities.append((names[i], int(t) + 1, int(X[i, t]), int(Y[i, t]), int(X[i, t + 1]), int(Y[i, t + 1])))
+
+    # 位置编码（按实际坐标范围，地图外的位置也互不相同）
+    x_min, y_min = int(X.min()), int(Y.min())
+    span = int(Y.max()) - y_min + 1
+    cell_count = (int(X.max()) - x_min + 1) * span
+    cells = (X - x_min) * span + (Y - y_min)
+    moments = np.arange(horizon, dtype=np.int64)[None, :]
+
+    # 顶点冲突：按(时刻, 位置)排序，相同的相邻项即为同一时刻位于同一位置
+    keys = (moments * cell_count + cells).ravel()
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    same = np.flatnonzero(sorted_keys[1:] == sorted_keys[:-1])
+    run_starts = same[np.concatenate([[True], same[1:] != same[:-1] + 1])] if len(same) else same
+    for begin in run_starts.tolist():
+        end = begin + 1
+        while end < len(sorted_keys) and sorted_keys[end] == sorted_keys[begin]:
+            end += 1
+        agents = sorted(order[begin:end] // horizon)
+        t = int(order[begin] % horizon)
+        for a in range(len(agents)):
+            for b in range(a + 1, len(agents)):
+                report.vertex_conflicts.append((names[agents[a]], names[agents[b]], t, int(X[agents[a], t]), int(Y[agents[a], t])))
+
+    # 边冲突：移动(t, 起点, 终点)与另一智能体的移动(t, 终点, 起点)相同即为对向交换
+    moving = cells[:, 1:] != cells[:, :-1]
+    rows, steps = np.nonzero(moving)
+    begins, ends = cells[rows, steps], cells[rows, steps + 1]
+    forward = (steps * cell_count + begins) * cell_count + ends
+    backward = (steps * cell_count + ends) * cell_count + begins
+    forward_order = np.argsort(forward, kind='stable')
+    sorted_forward = forward[forward_order]
+    position = np.minimum(np.searchsorted(sorted_forward, backward), max(len(sorted_forward) - 1, 0))
+    for k in np.flatnonzero(sorted_forward[position] == backward).tolist() if len(sorted_forward) else []:
+        p = int(position[k])
+        while p < len(sorted_forward) and sorted_forward[p] == backward[k]:
+            i, j, t = int(rows[k]), int(rows[forward_order[p]]), int(steps[k])
+            if i < j:
+                report.edge_conflicts.append((names[i], names[j], t + 1, int(X[i, t]), int(Y[i, t]), int(X[i, t + 1]), int(Y[i, t + 1])))
+            p += 1
+    report.vertex_conflicts.sort(key=lambda conflict: conflict[2])
+    report.edge_conflicts.sort(key=lambda conflict: conflict[2])
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    # 命令行参数
+    parser.add_argument("input", help = "输入文件（YAML文件，或MovingAI场景文件.scen）")
+    parser.add_argument("output", help = "路径计划文件（YAML或二进制.npz）")
+    parser.add_argument("--map", default = None, help = "MovingAI地图文件.map（缺省在场景文件所在目录查找）")
+    parser.add_argument("--agents", type = int, default = None, help = "从MovingAI场景中取的智能体数（需与求解时一致）")
+    parser.add_argument("--buckets", type = int, nargs = "+", default = None, help = "只取MovingAI场景中这些桶的智能体（需与求解时一致）")
+    # 解析命令行参数
+    args = parser.parse_args()
+
+    # 读取输入文件
+    if args.input.endswith(".scen"):
+        param = load_movingai(args.input, args.map, args.agents, args.buckets)
+    else:
+        with open(args.input) as param_file:
+            param = yaml.load(param_file, Loader=yaml.FullLoader)
+
+    report = validate(param, load_schedule(args.output))
+    report.print_report()
+    sys.exit(0 if report.is_valid() else 1)
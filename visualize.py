@@ -3,183 +3,297 @@
 import yaml
 import matplotlib
 from matplotlib.patches import Circle, Rectangle, Arrow
-from matplotlib.collections import PatchCollection
+from matplotlib.collections import PatchCollection, EllipseCollection
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import animation
 import matplotlib.animation as manimation
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import argparse
 import math
 import os
+import shutil
+import subprocess
+from schedule_io import BinarySchedule, load_schedule
 
 # 定义智能体的颜色
 Colors = ['yellow', 'skyblue', 'green']
 
-"""动画类，用于可视化路径规划结果"""
+"""创建图形和坐标轴（headless为True时不经过pyplot，直接使用Agg画布，无需显示设备）"""
+def create_figure(map, headless=False, dpi=None):
+    # 计算地图宽高比
+    aspect = map["map"]["dimensions"][0] / map["map"]["dimensions"][1]
+
+    # 创建图形和坐标轴
+    if headless:
+        fig = Figure(frameon=False, figsize=(4 * aspect, 4), dpi=dpi)
+        FigureCanvasAgg(fig)
+    else:
+        fig = plt.figure(frameon=False, figsize=(4 * aspect, 4), dpi=dpi)
+    ax = fig.add_subplot(111, aspect='equal')
+    ax.set_facecolor('ivory')  # 设置为象牙色背景
+    # 边距间距
+    fig.subplots_adjust(left=0,right=1,bottom=0,top=1, wspace=None, hspace=None)
+
+    # 设置坐标轴范围
+    ax.set_xlim(-0.5, map["map"]["dimensions"][0] - 0.5)
+    ax.set_ylim(-0.5, map["map"]["dimensions"][1] - 0.5)
+    return fig, ax
+
+"""绘制静态背景（边界、障碍物、目标位置）"""
+def draw_background(ax, map):
+    xmin = -0.5
+    ymin = -0.5
+    xmax = map["map"]["dimensions"][0] - 0.5
+    ymax = map["map"]["dimensions"][1] - 0.5
+    ax.add_patch(Rectangle((xmin, ymin), xmax - xmin, ymax - ymin, facecolor='none', edgecolor='gray', linewidth=10))
+    ax.add_collection(PatchCollection([Rectangle((o[0] - 0.5, o[1] - 0.5), 1, 1) for o in map["map"]["obstacles"]],
+                                      facecolor='gray', edgecolor='gray'))
+    ax.add_collection(PatchCollection([Rectangle((d["goal"][0] - 0.25, d["goal"][1] - 0.25), 0.5, 0.5) for d in map["agents"]],
+                                      facecolor=Colors[1], edgecolor='black', alpha=0.5))
+    for d in map["agents"]:
+        ax.text(d["goal"][0], d["goal"][1], d["name"].replace('agent', ''), alpha=0.7,  # 设置透明度使其不太突兀
+                horizontalalignment='center', verticalalignment='center')
+
+"""创建智能体图形（所有智能体为一个集合图元）与名称，返回(集合图元, 名称文本列表)"""
+def draw_agents(ax, names, positions, facecolors):
+    agent_collection = EllipseCollection(2 * Animation.AGENT_RADIUS, 2 * Animation.AGENT_RADIUS, 0, units='xy',
+                                         offsets=positions, offset_transform=ax.transData,
+                                         facecolors=facecolors, edgecolors='black')
+    ax.add_collection(agent_collection)
+    agent_names = [ax.text(x, y, name.replace('agent', ''), horizontalalignment='center', verticalalignment='center')
+                   for name, (x, y) in zip(names, positions)]
+    return agent_collection, agent_names
+
+"""动画类，用于可视化路径规划结果
+初始化时一次性预计算所有帧的插值位置（帧数 × 智能体数 × 2 的数组）、到达状态与碰撞，
+智能体用单个集合图元绘制，每帧只更新其位置与颜色"""
 class Animation:
+    FRAMES_PER_STEP = 10 # 每个时间步的帧数
+    AGENT_RADIUS = 0.3 # 智能体圆形的半径
+    COLLISION_DISTANCE = 0.7 # 中心距离小于该值的两个智能体视为碰撞
+    COLLISION_BATCH = 1 << 22 # 碰撞检测每批计算的距离数（帧数 × 智能体对数），限制内存占用
+    RENDER_CHUNK = 16 # 导出时每个渲染任务的帧数
+
     def __init__(self, map, schedule):
         self.map = map # 地图信息，包含尺寸、障碍物和智能体起始/目标位置
-        self.schedule = schedule # 调度信息，包含每个智能体的运动路径
-        self.combined_schedule = {} # 合并后的调度信息，包含所有智能体的运动路径
-        self.combined_schedule.update(self.schedule["schedule"]) # 合并调度信息
-
-        # 计算地图宽高比
-        aspect = map["map"]["dimensions"][0] / map["map"]["dimensions"][1]
-
-        # 创建图形和坐标轴
-        self.fig = plt.figure(frameon=False, figsize=(4 * aspect, 4))
-        self.ax = self.fig.add_subplot(111, aspect='equal')
-        self.ax.set_facecolor('ivory')  # 设置为象牙色背景
-        # 边距间距
-        self.fig.subplots_adjust(left=0,right=1,bottom=0,top=1, wspace=None, hspace=None)
-
-        # 初始化图形元素
-        self.patches = []
-        self.artists = []
-        self.agents = dict()
-        self.agent_names = dict()
-        
-        # 创建边界
-        xmin = -0.5
-        ymin = -0.5
-        xmax = map["map"]["dimensions"][0] - 0.5
-        ymax = map["map"]["dimensions"][1] - 0.5
-
-        # 设置坐标轴范围
-        plt.xlim(xmin, xmax)
-        plt.ylim(ymin, ymax)
-
-        # 添加边界矩形
-        self.patches.append(Rectangle((xmin, ymin), xmax - xmin, ymax - ymin, facecolor='none', edgecolor='gray', linewidth=10))
-        
-        # 添加障碍物
-        for o in map["map"]["obstacles"]:
-            x, y = o[0], o[1]
-            self.patches.append(Rectangle((x - 0.5, y - 0.5), 1, 1, facecolor='gray', edgecolor='gray'))
-
-        # 初始化时间步
-        self.T = 0
-        
-        # 先绘制目标位置
-        for d, i in zip(map["agents"], range(0, len(map["agents"]))):
-            self.patches.append(Rectangle((d["goal"][0] - 0.25, d["goal"][1] - 0.25), 0.5, 0.5, facecolor=Colors[1], edgecolor='black', alpha=0.5))
-            goal_text = self.ax.text(d["goal"][0], d["goal"][1], d["name"].replace('agent', ''), 
-                            alpha=0.7)  # 设置透明度使其不太突兀
-            goal_text.set_horizontalalignment('center')
-            goal_text.set_verticalalignment('center')
-            self.artists.append(goal_text)
-    
-        
-        # 创建智能体图形
-        for d, i in zip(map["agents"], range(0, len(map["agents"]))):
-            name = d["name"]
-            self.agents[name] = Circle((d["start"][0], d["start"][1]), 0.3, facecolor=Colors[0], edgecolor='black')
-            self.agents[name].original_face_color = Colors[0]
-            self.patches.append(self.agents[name])
-            self.T = max(self.T, schedule["schedule"][name][-1]["t"])
-            self.agent_names[name] = self.ax.text(d["start"][0], d["start"][1], name.replace('agent', ''))
-            self.agent_names[name].set_horizontalalignment('center')
-            self.agent_names[name].set_verticalalignment('center')
-            self.artists.append(self.agent_names[name])
+        self.schedule = schedule # 调度信息，包含每个智能体的运动路径（YAML输出字典，或内存映射的BinarySchedule）
+        self.names = [d["name"] for d in map["agents"]] # 智能体名称（与地图中的顺序一致）
+
+        # 预计算所有帧的状态
+        self.T = self.get_last_time() # 最后时间步
+        self.frame_count = int(self.T + 1) * self.FRAMES_PER_STEP # 帧数
+        self.positions, self.last_times = self.get_positions() # 插值位置(帧数, 智能体数, 2)与各智能体到达终点的时刻
+        self.arrived = self.get_frame_times()[:, None] >= self.last_times[None, :] # 是否已到达终点(帧数, 智能体数)
+        self.colliding, self.collisions = self.get_collisions() # 是否碰撞(帧数, 智能体数)与碰撞的智能体对
+        for (i, j), frame in sorted(self.collisions.items(), key=lambda item: item[1]):
+            print("碰撞! (智能体-智能体) ({}, {})，时间 {}".format(i, j, frame / self.FRAMES_PER_STEP))
+        # 每帧每个智能体的颜色序号（0为行进中，1为已到达终点，2为碰撞）
+        self.color_index = np.where(self.colliding, 2, self.arrived.astype(np.uint8)).astype(np.uint8)
+        self.palette = matplotlib.colors.to_rgba_array([Colors[0], Colors[1], 'red'])
+
+        # 创建图形、静态背景（直接加入坐标轴，不参与逐帧重绘）与智能体
+        self.fig, self.ax = create_figure(map)
+        draw_background(self.ax, map)
+        self.agent_collection, self.agent_names = draw_agents(self.ax, self.names, self.positions[0], self.palette[self.color_index[0]])
 
         # 创建动画
         self.anim = manimation.FuncAnimation(self.fig, self.animate_func,
                                init_func=self.init_func,
-                               frames=int(self.T+1) * 10, 
-                               interval=100, # 帧率10
+                               frames=self.frame_count,
+                               interval=1000 // self.FRAMES_PER_STEP, # 帧率10
                                blit=True)
 
-    """保存动画到文件"""
-    def save(self, file_name, speed):
+    """获取每帧对应的时刻"""
+    def get_frame_times(self):
+        return np.arange(self.frame_count) / self.FRAMES_PER_STEP
+
+    """获取最后时间步"""
+    def get_last_time(self):
+        if isinstance(self.schedule, BinarySchedule):
+            lengths = np.diff(np.asarray(self.schedule.offsets))
+            return int(lengths.max()) - 1 if len(lengths) else 0
+        return max((self.schedule["schedule"][name][-1]["t"] for name in self.names), default=0)
+
+    """预计算所有智能体在每帧的位置（在路径点之间线性插值，开始前与到达后停在起点与终点）"""
+    def get_positions(self):
+        if isinstance(self.schedule, BinarySchedule):
+            return self.get_binary_positions()
+        frame_times = self.get_frame_times()
+        positions = np.empty((self.frame_count, len(self.names), 2))
+        last_times = np.empty(len(self.names))
+        for k, name in enumerate(self.names):
+            states = self.schedule["schedule"][name]
+            times = np.array([state["t"] for state in states], dtype=float)
+            positions[:, k, 0] = np.interp(frame_times, times, [state["x"] for state in states])
+            positions[:, k, 1] = np.interp(frame_times, times, [state["y"] for state in states])
+            last_times[k] = times[-1]
+        return positions, last_times
+
+    """二进制路径计划的插值位置：第k个路径点的时刻为k - 偏移，按偏移直接从内存映射的x/y数组中取出每帧前后的路径点"""
+    def get_binary_positions(self):
+        row_of = {agent_id: i for i, agent_id in enumerate(self.schedule.agent_ids)}
+        rows = np.array([row_of[name] for name in self.names], dtype=np.int64)
+        offsets = np.asarray(self.schedule.offsets, dtype=np.int64)
+        begins, lengths = offsets[rows], offsets[rows + 1] - offsets[rows]
+        frame_times = self.get_frame_times()
+        steps = np.minimum(frame_times.astype(np.int64)[:, None], lengths[None, :] - 1) # 每帧之前的路径点（到达后停在终点）
+        fractions = frame_times[:, None] - steps
+        current = begins[None, :] + steps
+        following = begins[None, :] + np.minimum(steps + 1, lengths[None, :] - 1)
+        positions = np.empty((self.frame_count, len(self.names), 2))
+        for axis, coordinates in enumerate((self.schedule.x, self.schedule.y)):
+            begin_values = coordinates[current].astype(float)
+            positions[:, :, axis] = begin_values + (coordinates[following] - begin_values) * fractions
+        return positions, (lengths - 1).astype(float)
+
+    """一次性检测所有帧的碰撞（按帧分批计算所有智能体对的距离）
+    返回每帧每个智能体是否碰撞，以及 (智能体序号i, 智能体序号j) -> 首次碰撞的帧"""
+    def get_collisions(self):
+        frame_count, agent_count = self.positions.shape[:2]
+        colliding = np.zeros((frame_count, agent_count), dtype=bool)
+        collisions = {}
+        first, second = np.triu_indices(agent_count, 1)
+        if len(first) == 0:
+            return colliding, collisions
+        batch = max(1, self.COLLISION_BATCH // len(first))
+        for begin in range(0, frame_count, batch):
+            x = self.positions[begin:begin + batch, :, 0]
+            y = self.positions[begin:begin + batch, :, 1]
+            dx = x[:, first] - x[:, second]
+            dy = y[:, first] - y[:, second]
+            frames, pairs = np.nonzero(dx * dx + dy * dy < self.COLLISION_DISTANCE ** 2)
+            frames += begin
+            colliding[frames, first[pairs]] = True
+            colliding[frames, second[pairs]] = True
+            for pair, frame in zip(pairs.tolist(), frames.tolist()): # 按帧顺序，只保留首次碰撞
+                collisions.setdefault((int(first[pair]), int(second[pair])), frame)
+        return colliding, collisions
+
+    """无界面导出动画（GIF，或安装了ffmpeg时的MP4）
+    帧按批在多个进程中并行渲染（workers为进程数，缺省为CPU核数，1为不并行），按顺序流式写入编码器；
+    stride为抽帧间隔（每stride帧取一帧，帧率相应降低，播放速度不变）"""
+    def save(self, file_name, speed=1, dpi=200, stride=1, workers=None):
         # 获取文件扩展名
-        _, ext = os.path.splitext(file_name)
-        
-        # 如果文件扩展名不是.gif，则自动转换为.gif
-        if ext.lower() != '.gif':
+        base, ext = os.path.splitext(file_name)
+        ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+
+        # MP4需要ffmpeg，其余格式自动转换为.gif
+        if ext.lower() == '.mp4' and ffmpeg is None:
+            print("注意: 未找到ffmpeg，输出格式将从.mp4改为.gif")
+            file_name = base + '.gif'
+        elif ext.lower() not in ('.gif', '.mp4'):
             print(f"注意: 输出格式将从{ext}改为.gif，因为默认使用Pillow保存")
-            file_name = os.path.splitext(file_name)[0] + '.gif'
-            
-        # 使用Pillow保存为GIF
-        self.anim.save(file_name, writer='pillow', fps=10 * speed, dpi=200)
+            file_name = base + '.gif'
+        gif = file_name.lower().endswith('.gif')
+
+        frames = self.render_frames(np.arange(0, self.frame_count, stride), dpi, workers, gif)
+        fps = self.FRAMES_PER_STEP * speed / stride
+        if gif:
+            write_gif(file_name, frames, fps)
+        else:
+            write_mp4(file_name, frames, fps, ffmpeg)
         print(f"已保存动画到 {file_name}")
 
+    """按顺序逐帧生成渲染结果（GIF为调色板图像，否则为RGB数组），提交的渲染任务数不超过进程数的两倍"""
+    def render_frames(self, frames, dpi, workers, gif):
+        chunks = [frames[k:k + self.RENDER_CHUNK] for k in range(0, len(frames), self.RENDER_CHUNK)]
+        if workers == 1:
+            init_render_worker(self.map, self.palette, dpi)
+            for chunk in chunks:
+                yield from render_chunk(self.positions[chunk], self.color_index[chunk], gif)
+            return
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker,
+                                 initargs=(self.map, self.palette, dpi)) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(render_chunk, self.positions[chunk], self.color_index[chunk], gif))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
     """显示动画"""
     def show(self):
         plt.show()
 
     """动画初始化函数"""
     def init_func(self):
-        for p in self.patches:
-            self.ax.add_patch(p)
-        for a in self.artists:
-            self.ax.add_artist(a)
-        return self.patches + self.artists
+        return self.animate_func(0)
 
-    """动画更新函数"""
+    """动画更新函数（只更新智能体集合的位置、颜色与名称位置）"""
     def animate_func(self, i):
-        current_time = i / 10
-        # 更新每个智能体的位置
-        for agent_name, agent in self.combined_schedule.items():
-            pos = self.getState(current_time, agent)
-            p = (pos[0], pos[1])
-            self.agents[agent_name].center = p
-            self.agent_names[agent_name].set_position(p)
-
-            # 获取智能体路径的最后时间点
-            last_time = agent[-1]["t"]
-            
-            # 如果当前时间已经达到或超过最后时间点，表示已到达终点
-            if current_time >= last_time:
-                self.agents[agent_name].set_facecolor(Colors[1])  # 蓝色(Colors[1])
-            else:
-                self.agents[agent_name].set_facecolor(self.agents[agent_name].original_face_color)
-
-        # 重置所有智能体的颜色
-        # for _,agent in self.agents.items():
-        #     agent.set_facecolor(agent.original_face_color)
-
-        # 检查智能体之间的碰撞
-        agents_array = [agent for _,agent in self.agents.items()]
-        for i in range(0, len(agents_array)):
-            for j in range(i+1, len(agents_array)):
-                d1 = agents_array[i]
-                d2 = agents_array[j]
-                pos1 = np.array(d1.center)
-                pos2 = np.array(d2.center)
-                if np.linalg.norm(pos1 - pos2) < 0.7:
-                    d1.set_facecolor('red')
-                    d2.set_facecolor('red')
-                    print("碰撞! (智能体-智能体) ({}, {})".format(i, j))
-
-        return self.patches + self.artists
-
-    """获取智能体在时间t的状态"""
-    def getState(self, t, d):
-        # 找到时间t对应的索引位置
-        idx = 0
-        while idx < len(d) and d[idx]["t"] < t:
-            idx += 1
-        
-        # 如果时间t小于第一个时间点，返回初始位置
-        if idx == 0:
-            return np.array([float(d[0]["x"]), float(d[0]["y"])])
-        # 如果时间t在路径时间范围内，计算插值位置
-        elif idx < len(d):
-            # 获取前一个时间点的位置
-            posLast = np.array([float(d[idx-1]["x"]), float(d[idx-1]["y"])])
-            # 获取后一个时间点的位置
-            posNext = np.array([float(d[idx]["x"]), float(d[idx]["y"])])
-        # 如果时间t大于最后一个时间点，返回最终位置
-        else:
-            return np.array([float(d[-1]["x"]), float(d[-1]["y"])])
-        
-        # 计算时间插值系数(0~1之间)
-        dt = d[idx]["t"] - d[idx-1]["t"]
-        t = (t - d[idx-1]["t"]) / dt
-        
-        # 线性插值计算位置: pos = posLast + t * (posNext - posLast)
-        pos = (posNext - posLast) * t + posLast
-        return pos
+        positions = self.positions[i]
+        self.agent_collection.set_offsets(positions)
+        self.agent_collection.set_facecolor(self.palette[self.color_index[i]])
+        for text, position in zip(self.agent_names, positions):
+            text.set_position(position)
+        return [self.agent_collection] + self.agent_names
+
+"""无界面帧渲染器：静态背景只渲染一次并缓存，之后每帧恢复背景后只绘制智能体"""
+class FrameRenderer:
+    def __init__(self, map, palette, dpi):
+        self.palette = palette # 颜色序号对应的颜色
+        self.fig, self.ax = create_figure(map, headless=True, dpi=dpi)
+        draw_background(self.ax, map)
+        self.fig.canvas.draw()
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox) # 缓存的静态背景
+        names = [d["name"] for d in map["agents"]]
+        self.agent_collection, self.agent_names = draw_agents(self.ax, names, np.zeros((len(names), 2)), palette[np.zeros(len(names), dtype=np.uint8)])
+        # GIF的全局调色板：由智能体位于终点、分别取每种颜色的参考帧生成，之后每帧只需映射到最近的颜色（各进程结果相同）
+        goals = np.array([d["goal"] for d in map["agents"]], dtype=float).reshape(-1, 2)
+        reference = np.concatenate([self.render(goals, np.full(len(names), k, dtype=np.uint8)) for k in range(len(palette))])
+        self.gif_palette = Image.fromarray(reference).quantize(256)
+
+    # 渲染一帧（positions为各智能体的位置，color_index为颜色序号），返回RGB数组
+    def render(self, positions, color_index):
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        self.agent_collection.set_offsets(positions)
+        self.agent_collection.set_facecolor(self.palette[color_index])
+        self.ax.draw_artist(self.agent_collection)
+        for text, position in zip(self.agent_names, positions):
+            text.set_position(position)
+            self.ax.draw_artist(text)
+        return np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+
+    # 渲染一帧并转换为使用全局调色板的GIF帧
+    def render_gif(self, positions, color_index):
+        return Image.fromarray(self.render(positions, color_index)).quantize(palette=self.gif_palette, dither=Image.Dither.NONE)
+
+"""渲染进程的初始化（每个进程创建一个渲染器）"""
+def init_render_worker(map, palette, dpi):
+    global worker_renderer
+    worker_renderer = FrameRenderer(map, palette, dpi)
+
+"""在渲染进程中渲染一批帧（GIF帧在进程内转换为调色板图像，减少编码进程的工作与进程间传输）"""
+def render_chunk(positions, color_index, gif):
+    render = worker_renderer.render_gif if gif else worker_renderer.render
+    return [render(frame_positions, frame_colors) for frame_positions, frame_colors in zip(positions, color_index)]
+
+"""以Pillow写入GIF（帧为调色板图像的迭代器）"""
+def write_gif(file_name, frames, fps):
+    first = next(frames)
+    first.save(file_name, save_all=True, append_images=frames, duration=1000 / fps, loop=0, optimize=False)
+
+"""通过管道把RGB帧流式写入ffmpeg编码为MP4（宽高补齐为偶数）"""
+def write_mp4(file_name, frames, fps, ffmpeg):
+    first = next(frames)
+    height, width = first.shape[:2]
+    command = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+               '-r', str(fps), '-i', '-', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', file_name]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    process.stdin.write(first.tobytes())
+    for frame in frames:
+        process.stdin.write(frame.tobytes())
+    process.stdin.close()
+    if process.wait() != 0:
+        print("ffmpeg编码失败，返回码 " + str(process.returncode))
 
 """仅显示静态地图，包括障碍物、起点和终点"""
 def show_map_only(map_file):
@@ -236,10 +350,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     # 命令行参数
     parser.add_argument("input", help = "输入文件（包含地图、智能体、障碍物等信息）")
-    parser.add_argument("output", nargs="?", default=None, help = "输出文件（解决方案，含规划的路径和总代价）")
-    parser.add_argument('--save', dest='video', default=None, help="输出视频文件（默认为GIF格式，留空则在屏幕上显示）")
+    parser.add_argument("output", nargs="?", default=None, help = "输出文件（解决方案，含规划的路径和总代价；YAML或二进制.npz）")
+    parser.add_argument('--save', dest='video', default=None, help="输出视频文件（.gif，或安装了ffmpeg时的.mp4；无界面渲染，留空则在屏幕上显示）")
     parser.add_argument("--speed", type=int, default=1, help="播放速度倍数")
     parser.add_argument("--dpi", type=int, default=200, help="输出图像的DPI（分辨率）")
+    parser.add_argument("--stride", type=int, default=1, help="导出时的抽帧间隔（每stride帧取一帧，用于较长的路径计划）")
+    parser.add_argument("--workers", type=int, default=None, help="导出时并行渲染的进程数（缺省为CPU核数）")
     parser.add_argument("--showMap", action="store_true", help="只显示静态地图")
     # 解析命令行参数
     args = parser.parse_args()
@@ -251,14 +367,18 @@ if __name__ == "__main__":
     with open(args.input) as map_file:
         map = yaml.load(map_file, Loader=yaml.FullLoader)
 
-    # 读取调度文件
-    with open(args.output) as states_file:
-        schedule = yaml.load(states_file, Loader=yaml.FullLoader)
+    # 读取调度文件（.npz为内存映射读取的二进制格式）
+    schedule = load_schedule(args.output)
+
+    # 导出时不需要显示设备
+    if args.video:
+        plt.switch_backend("Agg")
 
     # 创建动画
     animation = Animation(map, schedule)
 
-    # 保存动画
+    # 保存或显示动画
     if args.video:
-        animation.save(args.video, args.speed)
-    animation.show() # 显示动画
\ No newline at end of file
+        animation.save(args.video, args.speed, args.dpi, args.stride, args.workers)
+    else:
+        animation.show() # 显示动画
\ No newline at end of file